@@ -279,6 +279,7 @@ class RemoAIChat {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          Accept: "text/event-stream",
         },
         body: JSON.stringify({
           message: message,
@@ -290,14 +291,18 @@ class RemoAIChat {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const result = await response.json();
+      // Older servers answer with a single JSON body
+      const contentType = response.headers.get("Content-Type") || "";
+      const result = contentType.includes("text/event-stream")
+        ? await this.readChatEventStream(response)
+        : await response.json();
 
       if (result.success) {
         // Display the complete response
         this.currentStreamingMessage.querySelector(
           ".message-content"
         ).textContent = result.message;
-        this.finalizeStreamingMessage();
+        this.finalizeStreamingMessage(result.interrupted);
       } else {
         this.currentStreamingMessage.querySelector(
           ".message-content"
@@ -313,6 +318,52 @@ class RemoAIChat {
     }
   }
 
+  async readChatEventStream(response) {
+    // Render "token" events as they arrive and resolve with the "done" payload,
+    // or with the partial text of a "cancelled" generation
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let result = { success: false, error: "Stream ended unexpectedly" };
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let eventName = "message";
+        let data = "";
+        for (const line of rawEvent.split("\n")) {
+          if (line.startsWith("event: ")) eventName = line.slice(7);
+          else if (line.startsWith("data: ")) data += line.slice(6);
+        }
+        if (!data) continue;
+
+        const payload = JSON.parse(data);
+        if (eventName === "token") {
+          this.handleStreamChunk(payload.text);
+        } else if (eventName === "done") {
+          result = payload;
+        } else if (eventName === "cancelled") {
+          result = {
+            success: true,
+            message: payload.partial_response,
+            interrupted: true,
+          };
+        } else if (eventName === "error") {
+          result = { success: false, error: payload.error };
+        }
+      }
+    }
+
+    return result;
+  }
+
   async sendRegularMessage(message) {
     try {
       // Use unified API instead of IPC
@@ -359,9 +410,12 @@ class RemoAIChat {
     }
   }
 
-  finalizeStreamingMessage() {
+  finalizeStreamingMessage(interrupted = false) {
     if (this.currentStreamingMessage) {
       this.currentStreamingMessage.classList.remove("streaming");
+      if (interrupted) {
+        this.currentStreamingMessage.classList.add("interrupted");
+      }
       this.addMessageTime(this.currentStreamingMessage);
     }
   }
@@ -389,6 +443,9 @@ class RemoAIChat {
     const messageTime = document.createElement("div");
     messageTime.className = "message-time";
     messageTime.textContent = new Date().toLocaleTimeString();
+    if (messageDiv.classList.contains("interrupted")) {
+      messageTime.textContent += " · interrupted";
+    }
     messageDiv.querySelector(".message-content").appendChild(messageTime);
   }
 
@@ -0,0 +1,224 @@
+"""
+Benchmark for NPUChatClient and the unified API against a local fake AnythingLLM
+
+Starts fake_anythingllm in-process with the given time to first token,
+generation speed, jitter and error rate (or replays a recorded cassette),
+then drives streamed and complete requests through NPUChatClient and
+through POST /chat (JSON and SSE) with the Flask test client. Reports
+throughput, time to first token, total time, the client's overhead on top
+of the configured time to first token, and the stream parsing cost. Also
+checks that AsyncNPUChatClient compacts its history with real summaries.
+
+Usage:
+    python llm/benchmarks/bench_chat_client.py [--requests 40] [--concurrency 4] [--ttft 0.2]
+        [--tokens-per-second 50] [--tokens 60] [--jitter 0.1] [--error-rate 0] [--no-sse]
+        [--replay cassette.jsonl] [--skip-api]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import yaml
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+LLM_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.append(os.path.join(LLM_DIR, 'src'))
+from fake_anythingllm import Cassette, add_profile_arguments, profile_from_args, sse_chunk, start_server
+
+PROMPTS = ["What's on my calendar today?", "Remind me to call the dentist at nine.",
+           "Summarize my unread notifications.", "How long is my commute right now?"]
+
+def write_config(directory: str, base_url: str, name: str = 'config.yaml', **overrides) -> str:
+    """Copy of config.yaml pointing at the fake server, with caches and warm-ups off"""
+    with open(os.path.join(LLM_DIR, 'config.yaml'), 'r', encoding='utf-8') as file:
+        config = yaml.safe_load(file)
+    config.update({
+        "model_server_base_url": base_url,
+        "model_servers": [],
+        "workspace_slug": "remo",
+        "response_cache": False,
+        "semantic_cache": False,
+        "history_store": "memory",
+        "history_summary": False,
+        "warmup": False,
+        "keepalive_interval": 0
+    })
+    config.update(overrides)
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as file:
+        yaml.safe_dump(config, file)
+    return path
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run(name: str, requests: int, concurrency: int, request: Callable[[int, str], Dict[str, Any]],
+        expected_ttft: float = None):
+    """Send requests from `concurrency` threads and print the latency summary"""
+    worker_ids = {}
+    lock = threading.Lock()
+
+    def one(index: int) -> Dict[str, Any]:
+        with lock:
+            worker = worker_ids.setdefault(threading.get_ident(), len(worker_ids))
+        return request(worker, PROMPTS[index % len(PROMPTS)])
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - start_time
+
+    succeeded = [result for result in results if result['text']]
+    ttfts = [result['ttft'] for result in succeeded]
+    totals = [result['total'] for result in succeeded]
+    print(f"{name}: {len(succeeded)}/{requests} ok in {elapsed:.2f} s, "
+          f"{len(succeeded) / elapsed:.1f} requests/s, "
+          f"{sum(len(result['text']) for result in succeeded) / elapsed:,.0f} chars/s")
+    if not succeeded:
+        return
+    print(f"  first chunk  p50 {1e3 * statistics.median(ttfts):7.1f} ms  p95 {1e3 * percentile(ttfts, 0.95):7.1f} ms")
+    print(f"  total        p50 {1e3 * statistics.median(totals):7.1f} ms  p95 {1e3 * percentile(totals, 0.95):7.1f} ms")
+    if expected_ttft is not None:
+        print(f"  overhead     p50 {1e3 * (statistics.median(ttfts) - expected_ttft):7.1f} ms "
+              f"on top of the server's {1e3 * expected_ttft:.0f} ms to first token")
+
+def bench_client(args, stream: bool, expected_ttft: float):
+    from chat_client import NPUChatClient
+    clients = {}
+
+    def request(worker: int, message: str) -> Dict[str, Any]:
+        # One client per thread, like one chat session each
+        client = clients.get(worker)
+        if client is None:
+            client = clients[worker] = NPUChatClient()
+        start_time = time.perf_counter()
+        first_chunk_time = None
+        text = ''
+        response = client.send_message(message, stream)
+        if stream:
+            for chunk in response or []:
+                if first_chunk_time is None:
+                    first_chunk_time = time.perf_counter()
+                text += chunk
+        else:
+            text = response or ''
+        end_time = time.perf_counter()
+        return {"text": text, "ttft": (first_chunk_time or end_time) - start_time, "total": end_time - start_time}
+
+    run(f"NPUChatClient ({'stream' if stream else 'complete'})", args.requests, args.concurrency,
+        request, expected_ttft)
+
+def bench_api(args, sse: bool, expected_ttft: float):
+    import unified_api
+    if unified_api.chat_client is None:
+        unified_api.init_chat()
+    app = unified_api.app
+
+    def request(worker: int, message: str) -> Dict[str, Any]:
+        client = app.test_client()
+        headers = {'X-Session-ID': f"bench-{worker}"}
+        start_time = time.perf_counter()
+        first_chunk_time = None
+        text = ''
+        if sse:
+            response = client.post('/chat', json={"message": message, "sse": True}, headers=headers, buffered=False)
+            for data in response.response:
+                for block in data.decode('utf-8').split('\n\n'):
+                    if block.startswith('event: token'):
+                        if first_chunk_time is None:
+                            first_chunk_time = time.perf_counter()
+                        text += json.loads(block.split('data: ', 1)[1])['text']
+            response.close()
+        else:
+            response = client.post('/chat', json={"message": message}, headers=headers)
+            text = (response.get_json() or {}).get('message') or ''
+        end_time = time.perf_counter()
+        return {"text": text, "ttft": (first_chunk_time or end_time) - start_time, "total": end_time - start_time}
+
+    run(f"POST /chat ({'SSE' if sse else 'JSON'})", args.requests, args.concurrency, request, expected_ttft)
+
+def bench_parsing(tokens: int):
+    """CPU cost of parsing one streamed response, without network waits"""
+    from stream_parser import iter_events, event_text
+    body = b''.join(sse_chunk(f"token{i} ", "bench") for i in range(tokens))
+    reads = [body[i:i + 512] for i in range(0, len(body), 512)]
+    repeat = 200
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        for event, _ in iter_events(reads):
+            event_text(event)
+    elapsed = (time.perf_counter() - start_time) / repeat
+    print(f"Parsing: {1e6 * elapsed / tokens:.2f} us/event, {1e3 * elapsed:.3f} ms per {tokens}-token response")
+
+def check_async_compaction(directory: str, base_url: str):
+    """Exit with an error unless the async client's history compactions are summarized by the server"""
+    import asyncio
+    from async_chat_client import AsyncNPUChatClient
+    from conversation_history import history_compactions
+    config_path = write_config(directory, base_url, 'config_summary.yaml', history_summary=True,
+                               history_max_tokens=100)
+    before = {result: history_compactions.get(result=result) for result in ('summarized', 'extracted')}
+
+    async def chat():
+        async with AsyncNPUChatClient(config_path) as client:
+            for prompt in PROMPTS:
+                await client.send_message(prompt, False)
+                client.conversation_history.wait_for_compaction(30)
+
+    asyncio.run(chat())
+    counts = {result: history_compactions.get(result=result) - count for result, count in before.items()}
+    print(f"Async history compaction: {counts['summarized']} summarized, {counts['extracted']} extracted")
+    if not counts['summarized'] or counts['extracted']:
+        sys.exit("Async history compaction fell back to the extract instead of a summary")
+
+def main():
+    parser = argparse.ArgumentParser(description='Chat client and API benchmark against a fake AnythingLLM')
+    parser.add_argument('--requests', type=int, default=40, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight')
+    add_profile_arguments(parser)
+    parser.set_defaults(ttft=0.2, tokens_per_second=50)
+    parser.add_argument('--replay', type=str, default=None, help='Replay this cassette instead of generating')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='Replay time scale (0 for no delays)')
+    parser.add_argument('--skip-api', action='store_true', help='Only benchmark NPUChatClient')
+    args = parser.parse_args()
+
+    cassette = Cassette(args.replay) if args.replay else None
+    server = start_server(profile=profile_from_args(args), cassette=cassette, replay_speed=args.replay_speed)
+    expected_ttft = args.ttft if cassette is None and not args.no_sse else None
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['REMO_CONFIG'] = write_config(directory, server.base_url)
+        # The chat client reads and writes persona.yaml in the working directory
+        shutil.copy(os.path.join(LLM_DIR, 'persona.yaml'), directory)
+        os.chdir(directory)
+        print(f"Fake AnythingLLM at {server.base_url}: "
+              + (f"replaying {args.replay}" if cassette is not None else
+                 f"{1e3 * args.ttft:.0f} ms to first token, {args.tokens_per_second:g} tokens/s, "
+                 f"{args.tokens} tokens, jitter {args.jitter:g}, error rate {args.error_rate:g}"
+                 + (", non-SSE" if args.no_sse else "")))
+
+        bench_client(args, True, expected_ttft)
+        bench_client(args, False, None)
+        if not args.skip_api:
+            try:
+                bench_api(args, False, None)
+                bench_api(args, True, expected_ttft)
+            except ImportError as e:
+                print(f"Skipping the API benchmark, unified_api could not be imported: {e}")
+        bench_parsing(args.tokens)
+        check_async_compaction(directory, server.base_url)
+        print(f"Server: {server.stats()}")
+        os.chdir(LLM_DIR)
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
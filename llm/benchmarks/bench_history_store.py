@@ -0,0 +1,93 @@
+"""
+Benchmark for the SQLite history store
+
+Measures append throughput (batched WAL commits), paged /history reads at
+the newest and oldest end of long sessions, and restoring a session after a
+restart, for sessions with 10k+ turns.
+
+Usage:
+    python llm/benchmarks/bench_history_store.py [--sessions 4] [--turns 10000] [--page 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from history_store import SQLiteHistoryStore
+
+MESSAGE = "Sure, I added a reminder to call the dentist tomorrow at nine. Anything else you need today?"
+
+def timed(fn, *args):
+    start_time = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start_time, result
+
+def bench_appends(store: SQLiteHistoryStore, sessions: int, turns: int) -> float:
+    """Append turns from one thread per session, like concurrent chat sessions"""
+    def run(session_index: int):
+        session_id = f"session-{session_index}"
+        for turn in range(turns):
+            store.append(session_id, 'user' if turn % 2 == 0 else 'assistant', f"{turn}: {MESSAGE}")
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(sessions)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.flush()
+    return time.perf_counter() - start_time
+
+def bench_pages(store: SQLiteHistoryStore, session_id: str, page: int, turns: int):
+    """Latency of the newest page and of a page deep in the session"""
+    newest = []
+    oldest = []
+    for _ in range(200):
+        elapsed, messages = timed(store.read, session_id, page)
+        newest.append(elapsed)
+        elapsed, messages = timed(store.read, session_id, page, messages[0]['id'] - turns + 2 * page)
+        oldest.append(elapsed)
+    return newest, oldest
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite history store benchmark')
+    parser.add_argument('--sessions', type=int, default=4, help='Sessions written concurrently')
+    parser.add_argument('--turns', type=int, default=10000, help='Messages per session')
+    parser.add_argument('--page', type=int, default=50, help='Messages per /history page')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'history.db')
+        store = SQLiteHistoryStore(path)
+
+        total = args.sessions * args.turns
+        elapsed = bench_appends(store, args.sessions, args.turns)
+        print(f"Appends: {total} messages in {elapsed:.2f} s, {total / elapsed:,.0f} messages/s, "
+              f"{store.batches} batches")
+
+        newest, oldest = bench_pages(store, 'session-0', args.page, args.turns)
+        for name, samples in (("newest page", newest), ("oldest page", oldest)):
+            print(f"  {name:<12} p50 {1e6 * statistics.median(samples):7.0f} us  "
+                  f"p95 {1e6 * percentile(samples, 0.95):7.0f} us")
+
+        store.save_summary('session-0', 'Earlier turns were about reminders.', args.turns - 40)
+        elapsed, stored = timed(store.load_session, 'session-0')
+        restore_time, messages = timed(store.recent, 'session-0', stored['messages'] - stored['summarized_count'])
+        print(f"  restore      {1e3 * (elapsed + restore_time):7.2f} ms for the summary and the "
+              f"{len(messages)} turns after it")
+
+        elapsed, messages = timed(store.recent, 'session-0', args.turns)
+        print(f"  full read    {1e3 * elapsed:7.2f} ms for {len(messages)} turns")
+        store.close()
+        print(f"Database size: {os.path.getsize(path) / (1024 * 1024):.1f} MB")
+
+if __name__ == '__main__':
+    main()
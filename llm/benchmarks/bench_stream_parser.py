@@ -0,0 +1,116 @@
+"""
+Microbenchmark for parsing AnythingLLM streaming responses
+
+Compares the previous line-by-line parsing (decode + json.loads per line,
+string concatenation) with the incremental StreamParser, and the number of
+chunks produced when a non-SSE body is pseudo-streamed.
+
+Usage:
+    python llm/benchmarks/bench_stream_parser.py [--chunks 20000] [--read-size 4096]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from stream_parser import iter_events, event_text, pseudo_stream
+
+def make_sse_body(chunks: int) -> bytes:
+    """SSE body shaped like AnythingLLM's, one token-sized chunk per event"""
+    words = ["Sure", "here", "is", "a", "summary", "of", "your", "day.", "You", "have", "three", "meetings"]
+    events = []
+    for i in range(chunks):
+        event = {
+            "uuid": "0f8fad5b-d9cb-469f-a165-70867728950e",
+            "type": "textResponseChunk",
+            "textResponse": words[i % len(words)] + " ",
+            "sources": [],
+            "close": False,
+            "error": False
+        }
+        events.append(f"data: {json.dumps(event)}\n\n")
+    return ''.join(events).encode('utf-8')
+
+def split_reads(body: bytes, read_size: int):
+    return [body[i:i + read_size] for i in range(0, len(body), read_size)]
+
+def iter_lines(reads):
+    """Line splitting of requests' Response.iter_lines, which the legacy loop ran on"""
+    pending = None
+    for chunk in reads:
+        if pending is not None:
+            chunk = pending + chunk
+        lines = chunk.splitlines()
+        if lines and lines[-1] and chunk and lines[-1][-1] == chunk[-1]:
+            pending = lines.pop()
+        else:
+            pending = None
+        yield from lines
+    if pending is not None:
+        yield pending
+
+def legacy_parse(reads) -> str:
+    """The parsing loop NPUChatClient used before StreamParser"""
+    full_response = ""
+    for line in iter_lines(reads):
+        if line:
+            line_str = line.decode('utf-8')
+            if line_str.startswith('data: '):
+                try:
+                    data = json.loads(line_str[6:])
+                    if 'text' in data:
+                        full_response += data['text']
+                    elif 'textResponse' in data:
+                        full_response += data['textResponse']
+                except json.JSONDecodeError:
+                    continue
+    return full_response
+
+def incremental_parse(reads) -> str:
+    response_chunks = []
+    for event, is_sse in iter_events(reads):
+        text = event_text(event)
+        if text:
+            response_chunks.append(text)
+    return ''.join(response_chunks)
+
+def best_of(repeat: int, fn, *args):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream parser microbenchmark')
+    parser.add_argument('--chunks', type=int, default=20000, help='Events in the synthetic response')
+    parser.add_argument('--read-size', type=int, default=4096, help='Bytes per network read')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    body = make_sse_body(args.chunks)
+    reads = split_reads(body, args.read_size)
+    megabytes = len(body) / (1024 * 1024)
+
+    legacy_time, legacy_text = best_of(args.repeat, legacy_parse, reads)
+    incremental_time, incremental_text = best_of(args.repeat, incremental_parse, reads)
+    assert legacy_text == incremental_text
+
+    print(f"Body: {args.chunks} events, {megabytes:.2f} MB, {len(reads)} reads of {args.read_size} bytes")
+    for name, elapsed in (("legacy", legacy_time), ("incremental", incremental_time)):
+        print(f"  {name:<12} {megabytes / elapsed:8.1f} MB/s  {1e6 * elapsed / args.chunks:6.2f} us/event")
+
+    # Pseudo-streaming a complete (non-SSE) response
+    text = incremental_text
+    for granularity in ('char', 'word', 'sentence'):
+        chunks = list(text) if granularity == 'char' else list(pseudo_stream(text, granularity))
+        elapsed, _ = best_of(args.repeat, lambda: sum(1 for _ in (iter(text) if granularity == 'char'
+                                                                    else pseudo_stream(text, granularity))))
+        print(f"  pseudo-stream by {granularity:<8} {len(chunks):8d} chunks  {1e3 * elapsed:7.2f} ms")
+
+if __name__ == '__main__':
+    main()
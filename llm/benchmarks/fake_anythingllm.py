@@ -0,0 +1,417 @@
+"""
+Local stand-in for the AnythingLLM developer API, for benchmarks and offline runs
+
+Serves GET .../workspaces and POST .../workspace/<slug>/chat under any base
+path. Chat responses are streamed as SSE chunks (or returned as one JSON
+body with --no-sse) at a configurable time to first token and tokens per
+second, with jitter, injected 5xx errors and a chosen response length.
+
+It can also record the responses of a real AnythingLLM server while
+proxying to it, and replay them later with their original chunking and
+timing, so runs are repeatable without the network or the NPU.
+
+Usage:
+    python llm/benchmarks/fake_anythingllm.py [--port 3001] [--ttft 0.3] [--tokens-per-second 20]
+        [--tokens 60] [--jitter 0.1] [--error-rate 0] [--no-sse]
+    python llm/benchmarks/fake_anythingllm.py --record cassette.jsonl --upstream http://localhost:3001/api/v1
+    python llm/benchmarks/fake_anythingllm.py --replay cassette.jsonl [--replay-speed 1.0]
+
+Then point model_server_base_url at http://127.0.0.1:<port>/api/v1.
+"""
+import argparse
+import base64
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+CHAT_PATH = re.compile(r'/workspace/([^/]+)/(stream-)?chat$')
+WORDS = ["Sure", "here", "is", "a", "summary", "of", "your", "day.", "You", "have", "three",
+         "meetings,", "a", "dentist", "appointment", "at", "nine", "and", "two", "reminders."]
+
+class FakeProfile:
+    def __init__(self, ttft: float = 0.3, tokens_per_second: float = 20, tokens: int = 60,
+                 jitter: float = 0.1, error_rate: float = 0.0, sse: bool = True,
+                 workspaces: List[str] = None, api_key: str = None, seed: int = None):
+        """
+        Behavior of the generated responses.
+
+        Args:
+            ttft: Seconds until the first chunk
+            tokens_per_second: Chunks per second after the first one (one token per chunk)
+            tokens: Tokens per response
+            jitter: Random variation of every delay, as a fraction (0.1 is +-10%)
+            error_rate: Share of chat requests answered with a 500
+            sse: Stream SSE chunks; otherwise answer stream requests with one JSON body
+            workspaces: Workspace slugs listed by /workspaces
+            api_key: Bearer token to require (any token is accepted when None)
+            seed: Random seed, for repeatable jitter and errors
+        """
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.sse = sse
+        self.workspaces = workspaces or ['remo']
+        self.api_key = api_key
+        self.random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def jittered(self, seconds: float) -> float:
+        with self._random_lock:
+            return max(0.0, seconds * (1 + self.jitter * (2 * self.random.random() - 1)))
+
+    def should_fail(self) -> bool:
+        with self._random_lock:
+            return self.random.random() < self.error_rate
+
+    def tokens_for(self, message: str) -> List[str]:
+        """Response tokens, the same for the same message"""
+        start = sum(map(ord, message or '')) % len(WORDS)
+        return [WORDS[(start + i) % len(WORDS)] + ' ' for i in range(self.tokens)]
+
+def sse_chunk(text: str, response_id: str, close: bool = False) -> bytes:
+    """One streaming event shaped like AnythingLLM's textResponseChunk"""
+    event = {
+        "uuid": response_id,
+        "type": "textResponseChunk" if not close else "finalizeResponseStream",
+        "textResponse": text,
+        "sources": [],
+        "close": close,
+        "error": False
+    }
+    return f"data: {json.dumps(event)}\n\n".encode('utf-8')
+
+def text_response(text: str, response_id: str) -> bytes:
+    """Complete (non-streamed) chat response body"""
+    return json.dumps({
+        "id": response_id,
+        "type": "textResponse",
+        "textResponse": text,
+        "sources": [],
+        "close": True,
+        "error": None
+    }).encode('utf-8')
+
+class Cassette:
+    def __init__(self, path: str, mode: str = 'replay'):
+        """
+        Recorded responses in a JSON lines file.
+
+        Each line holds the request (path, message, stream) and the response
+        status, content type and body chunks with their offsets in seconds.
+
+        Args:
+            path: Cassette file
+            mode: "record" to append new entries, "replay" to serve them
+        """
+        self.path = path
+        self.mode = mode
+        self.entries = []
+        self._lock = threading.Lock()
+        # (path, message, stream) -> iterator cycling over the matching entries
+        self._matches = {}
+        self._fallback = {}
+        if mode == 'replay':
+            with open(path, 'r', encoding='utf-8') as file:
+                self.entries = [json.loads(line) for line in file if line.strip()]
+            for key, group in itertools.groupby(sorted(self.entries, key=self._key), key=self._key):
+                self._matches[key] = itertools.cycle(list(group))
+            for stream in (True, False):
+                entries = [entry for entry in self.entries
+                           if CHAT_PATH.search(entry['path']) and bool(entry.get('stream')) == stream]
+                if entries:
+                    self._fallback[stream] = itertools.cycle(entries)
+
+    @staticmethod
+    def _key(entry: Dict[str, Any]) -> Tuple[str, str, bool]:
+        return entry['path'], entry.get('message') or '', bool(entry.get('stream'))
+
+    def record(self, entry: Dict[str, Any]):
+        with self._lock:
+            self.entries.append(entry)
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(entry) + '\n')
+
+    def match(self, path: str, message: str, stream: bool) -> Optional[Dict[str, Any]]:
+        """The recorded response for a request, or one of the same kind if the exact one is missing"""
+        with self._lock:
+            entries = self._matches.get((path, message or '', stream))
+            if entries is None and CHAT_PATH.search(path):
+                entries = self._fallback.get(stream)
+            return next(entries) if entries is not None else None
+
+class FakeAnythingLLM(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], profile: FakeProfile = None, cassette: Cassette = None,
+                 upstream: str = None, replay_speed: float = 1.0):
+        """
+        Fake AnythingLLM server.
+
+        Args:
+            address: (host, port) to listen on; port 0 picks a free one
+            profile: Generated response behavior
+            cassette: Cassette to record to (with upstream) or replay from
+            upstream: Base URL of a real AnythingLLM to proxy to while recording
+            replay_speed: Replay time scale (2.0 is twice as fast, 0 sends without delays)
+        """
+        super().__init__(address, FakeHandler)
+        self.profile = profile or FakeProfile()
+        self.cassette = cassette
+        self.upstream = upstream.rstrip('/') if upstream else None
+        self.replay_speed = replay_speed
+        self.requests = 0
+        self.errors = 0
+        self.disconnects = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def count(self, name: str):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "errors": self.errors, "disconnects": self.disconnects}
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Small chunks go out at once, as with AnythingLLM's Node server, instead of
+    # waiting on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.count('requests')
+        if not self._authorized():
+            return
+        if self.server.cassette is not None:
+            self._proxy_or_replay(None)
+            return
+        if self.path.rstrip('/').endswith('/workspaces'):
+            workspaces = [{"id": i + 1, "name": slug.title(), "slug": slug}
+                          for i, slug in enumerate(self.server.profile.workspaces)]
+            self._send_json(200, {"workspaces": workspaces})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        self.server.count('requests')
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = self.rfile.read(length)
+        if not self._authorized():
+            return
+        try:
+            payload = json.loads(self.body or b'{}')
+        except ValueError:
+            self._send_json(400, {"error": "Invalid JSON"})
+            return
+        if self.server.cassette is not None:
+            self._proxy_or_replay(payload)
+            return
+
+        match = CHAT_PATH.search(self.path)
+        if match is None:
+            self._send_json(404, {"error": "Not found"})
+            return
+        if match.group(1) not in self.server.profile.workspaces:
+            self._send_json(400, {"error": f"Workspace {match.group(1)} is not a valid workspace."})
+            return
+        self._generate(payload, stream=bool(payload.get('stream')) or match.group(2) is not None)
+
+    def _authorized(self) -> bool:
+        api_key = self.server.profile.api_key
+        if api_key is not None and self.headers.get('Authorization') != f"Bearer {api_key}":
+            self._send_json(403, {"error": "No valid api key found."})
+            return False
+        return True
+
+    def _generate(self, payload: Dict[str, Any], stream: bool):
+        profile = self.server.profile
+        if profile.should_fail():
+            self.server.count('errors')
+            self._send_json(500, {"error": "Injected failure"})
+            return
+
+        response_id = str(uuid.uuid4())
+        tokens = profile.tokens_for(payload.get('message'))
+        start_time = time.perf_counter()
+        # Deadlines are absolute so sleeping does not add up drift
+        deadlines = [profile.ttft + i / profile.tokens_per_second for i in range(len(tokens))]
+
+        if not stream or not profile.sse:
+            time.sleep(max(0.0, profile.jittered(deadlines[-1] if deadlines else profile.ttft)))
+            self._send_body(200, 'application/json', text_response(''.join(tokens), response_id))
+            return
+
+        try:
+            self._start_chunked(200, 'text/event-stream')
+            for token, deadline in zip(tokens, deadlines):
+                delay = start_time + profile.jittered(deadline) - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                self._write_chunk(sse_chunk(token, response_id))
+            self._write_chunk(sse_chunk('', response_id, close=True))
+            self._end_chunked()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away (cancelled); stop generating like the real server
+            self.server.count('disconnects')
+            self.close_connection = True
+
+    def _proxy_or_replay(self, payload: Optional[Dict[str, Any]]):
+        message = (payload or {}).get('message')
+        stream = bool((payload or {}).get('stream'))
+        if self.server.upstream is not None:
+            self._proxy(message, stream)
+            return
+
+        entry = self.server.cassette.match(self.path, message, stream)
+        if entry is None:
+            self._send_json(404, {"error": f"No recorded response for {self.path}"})
+            return
+        speed = self.server.replay_speed
+        start_time = time.perf_counter()
+        try:
+            self._start_chunked(entry['status'], entry.get('content_type') or 'application/json')
+            for offset, data in entry['chunks']:
+                if speed > 0:
+                    delay = start_time + offset / speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                self._write_chunk(base64.b64decode(data))
+            self._end_chunked()
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.count('disconnects')
+            self.close_connection = True
+
+    def _proxy(self, message: Optional[str], stream: bool):
+        # Forward to the real server, passing chunks through as they arrive and recording them
+        suffix = self.path[self.path.find('/workspace'):] if '/workspace' in self.path else self.path
+        url = self.server.upstream + suffix
+        headers = {'Authorization': self.headers.get('Authorization', ''), 'Content-Type': 'application/json'}
+        start_time = time.perf_counter()
+        try:
+            if self.command == 'GET':
+                upstream = requests.get(url, headers=headers, stream=True, timeout=120)
+            else:
+                upstream = requests.post(url, headers=headers, data=self.body, stream=True, timeout=120)
+        except requests.exceptions.RequestException as e:
+            self._send_json(502, {"error": f"Upstream error: {e}"})
+            return
+
+        chunks = []
+        content_type = upstream.headers.get('Content-Type', 'application/json')
+        try:
+            self._start_chunked(upstream.status_code, content_type)
+            for data in upstream.iter_content(chunk_size=None):
+                chunks.append([round(time.perf_counter() - start_time, 4), base64.b64encode(data).decode('ascii')])
+                self._write_chunk(data)
+            self._end_chunked()
+        finally:
+            upstream.close()
+        self.server.cassette.record({
+            "path": self.path,
+            "message": message,
+            "stream": stream,
+            "status": upstream.status_code,
+            "content_type": content_type,
+            "chunks": chunks
+        })
+
+    def _send_json(self, status: int, data: Dict[str, Any]):
+        self._send_body(status, 'application/json', json.dumps(data).encode('utf-8'))
+
+    def _send_body(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self, status: int, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes):
+        if data:
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+
+    def _end_chunked(self):
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+def start_server(port: int = 0, profile: FakeProfile = None, cassette: Cassette = None,
+                 upstream: str = None, replay_speed: float = 1.0, host: str = '127.0.0.1') -> FakeAnythingLLM:
+    """Start a fake server on a background thread; call shutdown() to stop it"""
+    server = FakeAnythingLLM((host, port), profile, cassette, upstream, replay_speed)
+    thread = threading.Thread(target=server.serve_forever, name='fake-anythingllm', daemon=True)
+    thread.start()
+    return server
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """Response behavior options, shared with the benchmark scripts"""
+    parser.add_argument('--ttft', type=float, default=0.3, help='Seconds until the first chunk')
+    parser.add_argument('--tokens-per-second', type=float, default=20, help='Generation speed')
+    parser.add_argument('--tokens', type=int, default=60, help='Tokens per response')
+    parser.add_argument('--jitter', type=float, default=0.1, help='Random delay variation (0.1 is +-10%%)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of chat requests failing with a 500')
+    parser.add_argument('--no-sse', action='store_true', help='Answer stream requests with one JSON body')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for jitter and errors')
+
+def profile_from_args(args: argparse.Namespace, workspaces: List[str] = None, api_key: str = None) -> FakeProfile:
+    return FakeProfile(ttft=args.ttft, tokens_per_second=args.tokens_per_second, tokens=args.tokens,
+                       jitter=args.jitter, error_rate=args.error_rate, sse=not args.no_sse,
+                       workspaces=workspaces, api_key=api_key, seed=args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the AnythingLLM API')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=3001, help='Port to listen on')
+    parser.add_argument('--workspace', action='append', default=None, help='Workspace slug (repeatable)')
+    parser.add_argument('--api-key', type=str, default=None, help='Require this API key')
+    add_profile_arguments(parser)
+    parser.add_argument('--record', type=str, default=None, help='Record upstream responses to this cassette')
+    parser.add_argument('--upstream', type=str, default=None, help='Real AnythingLLM base URL to record from')
+    parser.add_argument('--replay', type=str, default=None, help='Serve the responses of this cassette')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='Replay time scale (0 for no delays)')
+    args = parser.parse_args()
+
+    if args.record and not args.upstream:
+        parser.error('--record needs --upstream')
+    cassette = None
+    if args.record:
+        cassette = Cassette(args.record, mode='record')
+    elif args.replay:
+        cassette = Cassette(args.replay)
+
+    server = start_server(args.port, profile_from_args(args, args.workspace, args.api_key),
+                          cassette, args.upstream if args.record else None, args.replay_speed, args.host)
+    mode = "recording" if args.record else "replaying" if args.replay else "generating"
+    print(f"Fake AnythingLLM {mode} at {server.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"Stopped: {server.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+"""
+Load generator for a running unified API
+
+Replays a weighted mix of POST /chat, /transcribe, /speak-and-chat and
+/listening/process traffic, either closed-loop (a fixed number of users, each
+sending its next request when the previous one finished) or open-loop
+(Poisson arrivals at a target rate). Audio requests upload generated WAV
+fixtures: spoken prompts synthesized with eSpeak when it is installed,
+otherwise speech-like tones. Prints p50/p95/p99 latency, error rate and
+throughput per endpoint as JSON, and can compare them to an earlier run.
+
+In open-loop mode latency is measured from each request's scheduled start,
+so time spent waiting for a free connection counts when the server falls
+behind instead of hiding the slowdown.
+
+Usage:
+    python llm/benchmarks/load_test.py [--url http://localhost:8000] [--concurrency 4 | --rate 2]
+        [--duration 60 | --requests 200] [--mix chat=6,transcribe=2,speak-and-chat=1,listening=1]
+        [--audio file.wav ...] [--output results.json] [--baseline previous.json --tolerance 0.2]
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+PROMPTS = ["What's on my calendar today?", "Remind me to call the dentist at nine.",
+           "Summarize my unread notifications.", "How long is my commute right now?",
+           "I have a meeting with the design team tomorrow, remind me to bring the slides."]
+
+# Endpoint name in --mix -> path
+ENDPOINTS = {
+    "chat": "/chat",
+    "transcribe": "/transcribe",
+    "speak-and-chat": "/speak-and-chat",
+    "listening": "/listening/process"
+}
+DEFAULT_MIX = "chat=6,transcribe=2,speak-and-chat=1,listening=1"
+SAMPLE_RATE = 16000
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    Parse a traffic mix such as "chat=6,transcribe=2".
+
+    Raises:
+        ValueError: For unknown endpoints, bad weights or an all-zero mix
+    """
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' in mix, expected one of {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"Negative weight for '{name}' in mix")
+    if not any(mix.values()):
+        raise ValueError("The traffic mix has no endpoint with a positive weight")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+def write_tone(path: str, seconds: float, seed: int):
+    """Speech-like test signal: voiced bursts with a moving pitch and pauses between them"""
+    rng = random.Random(seed)
+    frames = bytearray()
+    phase = 0.0
+    for index in range(int(seconds * SAMPLE_RATE)):
+        t = index / SAMPLE_RATE
+        syllable = (t * 4) % 1
+        envelope = math.sin(math.pi * syllable) if syllable < 0.8 else 0.0
+        pitch = 140 + 30 * math.sin(2 * math.pi * 0.7 * t)
+        phase += 2 * math.pi * pitch / SAMPLE_RATE
+        sample = envelope * (0.6 * math.sin(phase) + 0.3 * math.sin(2 * phase) + 0.1 * math.sin(3 * phase))
+        sample += 0.02 * rng.uniform(-1, 1)
+        frames += struct.pack('<h', int(max(-1.0, min(1.0, sample)) * 20000))
+    with wave.open(path, 'wb') as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(SAMPLE_RATE)
+        file.writeframes(bytes(frames))
+
+def generate_fixtures(directory: str) -> List[str]:
+    """
+    Write one WAV fixture per prompt into directory.
+
+    Uses eSpeak (as the TTS service does) to speak the prompts so Whisper
+    has words to transcribe, and falls back to tones of 1 to 5 seconds
+    when eSpeak is not installed.
+    """
+    espeak = shutil.which('espeak') or shutil.which('espeak-ng')
+    paths = []
+    for index, prompt in enumerate(PROMPTS):
+        path = os.path.join(directory, f"prompt_{index}.wav")
+        if espeak is not None:
+            result = subprocess.run([espeak, '-w', path, prompt], capture_output=True, timeout=30)
+            if result.returncode == 0 and os.path.getsize(path) > 0:
+                paths.append(path)
+                continue
+        write_tone(path, 1 + index % 5, seed=index)
+        paths.append(path)
+    return paths
+
+def _read(path: str) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
+
+def percentile(samples: List[float], fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class LoadTest:
+    def __init__(self, base_url: str, mix: Dict[str, float], audio: List[str], timeout: float = 120,
+                 sse: bool = False, seed: int = None):
+        """
+        Traffic generator and result collector for one run.
+
+        Args:
+            base_url: Unified API URL, e.g. http://localhost:8000
+            mix: Relative weight of each endpoint
+            audio: WAV files uploaded by the audio endpoints
+            timeout: Per-request timeout in seconds
+            sse: Ask /chat for server-sent events and read the whole stream
+            seed: Random seed for the endpoint and prompt choice
+        """
+        self.base_url = base_url.rstrip('/')
+        self.mix = mix
+        self.audio = [(os.path.basename(path), _read(path)) for path in audio]
+        self.timeout = timeout
+        self.sse = sse
+        self.random = random.Random(seed)
+        # endpoint -> list of (latency seconds, status code or None, error)
+        self.results = {name: [] for name in mix}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._users = itertools.count()
+
+    def choose(self) -> Tuple[str, int]:
+        """Next endpoint to hit and the fixture or prompt index to use"""
+        with self._lock:
+            name = self.random.choices(list(self.mix), weights=list(self.mix.values()))[0]
+            return name, self.random.randrange(len(PROMPTS) if name == 'chat' else len(self.audio))
+
+    def _session(self) -> requests.Session:
+        # One HTTP session and chat session per thread, like one user each
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers['X-Session-ID'] = f"load-{next(self._users)}"
+        return session
+
+    def send(self, name: str, index: int, scheduled: float = None):
+        """Send one request and record its latency, measured from scheduled when given"""
+        session = self._session()
+        url = self.base_url + ENDPOINTS[name]
+        start_time = scheduled if scheduled is not None else time.perf_counter()
+        status = None
+        error = None
+        try:
+            if name == 'chat':
+                response = session.post(url, json={"message": PROMPTS[index], "sse": self.sse},
+                                        timeout=self.timeout, stream=self.sse)
+                # Read the whole body so streamed replies are timed to their last event
+                for _ in response.iter_content(chunk_size=None):
+                    pass
+            else:
+                filename, data = self.audio[index]
+                form = {"stream": "true"} if name == 'speak-and-chat' else {}
+                response = session.post(url, files={"audio": (filename, data, 'audio/wav')}, data=form,
+                                        timeout=self.timeout)
+            status = response.status_code
+            if status >= 400:
+                error = f"HTTP {status}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        latency = time.perf_counter() - start_time
+        with self._lock:
+            self.results[name].append((latency, status, error))
+
+    def run_closed(self, concurrency: int, duration: float = None, total: int = None):
+        """Closed loop: concurrency users, each sending as soon as its last request finished"""
+        deadline = time.perf_counter() + duration if duration else None
+        remaining = itertools.count()
+
+        def user():
+            while True:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                if total is not None and next(remaining) >= total:
+                    return
+                self.send(*self.choose())
+
+        threads = [threading.Thread(target=user, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open(self, rate: float, max_in_flight: int, duration: float = None, total: int = None):
+        """Open loop: Poisson arrivals at rate requests/s, whether or not earlier ones finished"""
+        start_time = time.perf_counter()
+        scheduled = start_time
+        sent = 0
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            while True:
+                scheduled += self.random.expovariate(rate)
+                if duration and scheduled - start_time >= duration:
+                    break
+                if total is not None and sent >= total:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.send, *self.choose(), scheduled)
+                sent += 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """Per-endpoint and overall latency percentiles, error rates and throughput"""
+        with self._lock:
+            results = {name: list(samples) for name, samples in self.results.items()}
+        endpoints = {name: _summarize(samples, elapsed) for name, samples in results.items() if samples}
+        overall = _summarize([sample for samples in results.values() for sample in samples], elapsed)
+        return {"elapsed_s": round(elapsed, 2), "endpoints": endpoints, "overall": overall}
+
+def _summarize(samples: List[Tuple[float, Optional[int], Optional[str]]], elapsed: float) -> Dict[str, Any]:
+    succeeded = [latency * 1000 for latency, _, error in samples if error is None]
+    errors = {}
+    for _, _, error in samples:
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+    return {
+        "requests": len(samples),
+        "ok": len(succeeded),
+        "error_rate": round((len(samples) - len(succeeded)) / len(samples), 4) if samples else 0.0,
+        "errors": errors,
+        "throughput_rps": round(len(succeeded) / elapsed, 3) if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": _round(percentile(succeeded, 0.5)),
+            "p95": _round(percentile(succeeded, 0.95)),
+            "p99": _round(percentile(succeeded, 0.99)),
+            "mean": _round(statistics.mean(succeeded)) if succeeded else None,
+            "max": _round(max(succeeded)) if succeeded else None
+        }
+    }
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Regressions against an earlier report: p95 latency or error rate worse
+    than the baseline by more than tolerance (a fraction).
+    """
+    regressions = []
+    for name, current in report['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None:
+            continue
+        before, after = previous['latency_ms']['p95'], current['latency_ms']['p95']
+        if before and after and after > before * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before:.0f} ms -> {after:.0f} ms")
+        if current['error_rate'] > previous['error_rate'] + tolerance * max(previous['error_rate'], 0.01):
+            regressions.append(f"{name}: error rate {previous['error_rate']:.2%} -> {current['error_rate']:.2%}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test a running unified API')
+    parser.add_argument('--url', type=str, default='http://localhost:8000', help='Unified API base URL')
+    parser.add_argument('--concurrency', type=int, default=4, help='Closed loop: concurrent users')
+    parser.add_argument('--rate', type=float, default=None, help='Open loop: arrivals per second')
+    parser.add_argument('--max-in-flight', type=int, default=64, help='Open loop: connection limit')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to run')
+    parser.add_argument('--requests', type=int, default=None, help='Stop after this many requests instead')
+    parser.add_argument('--mix', type=str, default=DEFAULT_MIX, help='Endpoint weights')
+    parser.add_argument('--audio', type=str, nargs='*', default=None, help='WAV files to upload instead of generated ones')
+    parser.add_argument('--sse', action='store_true', help='Stream /chat replies as server-sent events')
+    parser.add_argument('--timeout', type=float, default=120, help='Per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for a repeatable request sequence')
+    parser.add_argument('--output', type=str, default=None, help='Also write the JSON report to this file')
+    parser.add_argument('--baseline', type=str, default=None, help='Earlier report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 and error rate increase')
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    duration = None if args.requests is not None else args.duration
+
+    with tempfile.TemporaryDirectory() as directory:
+        audio = args.audio or generate_fixtures(directory)
+        test = LoadTest(args.url, mix, audio, timeout=args.timeout, sse=args.sse, seed=args.seed)
+
+    mode = f"{args.rate:g} requests/s open loop" if args.rate else f"{args.concurrency} users closed loop"
+    print(f"Load testing {args.url} at {mode} with mix {mix}", file=sys.stderr)
+    start_time = time.perf_counter()
+    if args.rate:
+        test.run_open(args.rate, args.max_in_flight, duration, args.requests)
+    else:
+        test.run_closed(args.concurrency, duration, args.requests)
+    report = test.report(time.perf_counter() - start_time)
+    report["config"] = {"url": args.url, "mode": "open" if args.rate else "closed",
+                        "concurrency": None if args.rate else args.concurrency, "rate": args.rate,
+                        "mix": mix, "sse": args.sse, "audio": [name for name, _ in test.audio]}
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -15,8 +15,8 @@ def main():
     args = parser.parse_args()
     
     try:
-        # Initialize chat client with correct config path
-        client = NPUChatClient('config.yaml')
+        # Initialize chat client with the shared config (llm/config.yaml)
+        client = NPUChatClient()
         
         if args.stream:
             # Send message with streaming
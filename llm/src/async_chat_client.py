@@ -0,0 +1,376 @@
+"""
+Asyncio chat client for AnythingLLM API with concurrent request fan-out
+"""
+import asyncio
+import time
+import uuid
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional, Sequence, Union
+
+import aiohttp
+
+from chat_client import NPUChatClient
+from endpoints import Endpoint, EndpointError, get_endpoint_pool
+from stream_parser import StreamParser, event_text, pseudo_stream
+from stream_deadlines import CONNECT, StreamDeadlineExceeded, StreamDeadlines
+
+class AsyncNPUChatClient(NPUChatClient):
+    """
+    NPUChatClient on asyncio.
+
+    Configuration, persona handling, conversation history and the response
+    caches are inherited. The methods that talk to AnythingLLM are
+    coroutines, so a generation waits on the event loop instead of holding
+    a thread.
+    """
+
+    def __init__(self, config_path: str = None, session: aiohttp.ClientSession = None, thread_id: str = None):
+        """
+        Initialize the chat client with configuration
+
+        Args:
+            config_path: Path to the YAML config (default: llm/config.yaml)
+            session: Shared aiohttp session; one is created on first use otherwise
+            thread_id: AnythingLLM chat thread (sessionId) to send the messages to
+        """
+        super().__init__(config_path)
+        self.thread_id = thread_id
+        self._session = session
+        self._owns_session = session is None
+
+    async def __aenter__(self) -> 'AsyncNPUChatClient':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Close the HTTP session if this client created it"""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.config.get('http_pool_size', 10)))
+        return self._session
+
+    def _timeout(self, stream: bool = False) -> aiohttp.ClientTimeout:
+        # Same meaning as the requests timeout: connect and per-read limits, no total limit.
+        # Streamed reads are bounded by the stream deadlines instead.
+        config = self.config
+        return aiohttp.ClientTimeout(total=None, sock_connect=config.get('connect_timeout', 5),
+                                     sock_read=None if stream else config.get('stream_timeout', 60))
+
+    async def preflight(self):
+        """Check that AnythingLLM is reachable, accepts the API key and has the workspace
+
+        Raises:
+            RuntimeError: If any of the checks fail on every configured server
+        """
+        endpoints = get_endpoint_pool(self.config).endpoints
+        errors = []
+        for endpoint in endpoints:
+            try:
+                await self._check_endpoint(endpoint)
+            except RuntimeError as e:
+                errors.append(e)
+                if len(endpoints) > 1:
+                    print(f"{endpoint.url}: {e}")
+        if len(errors) == len(endpoints):
+            raise errors[0]
+
+    async def _check_endpoint(self, endpoint: Endpoint):
+        """Preflight checks for a single AnythingLLM server"""
+        try:
+            async with self._get_session().get(
+                f"{endpoint.url}/workspaces",
+                headers=self._endpoint_headers(endpoint),
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"AnythingLLM rejected the API key: {response.status}")
+                data = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise RuntimeError(f"AnythingLLM is not reachable: {e}")
+
+        workspace_slugs = [w.get('slug', '') for w in data.get('workspaces', [])]
+        if self.config['workspace_slug'] not in workspace_slugs:
+            raise RuntimeError(f"Workspace '{self.config['workspace_slug']}' not found in AnythingLLM")
+
+    async def send_message(self, message: str, stream: bool = None) -> Union[AsyncGenerator[str, None], str, None]:
+        """
+        Send a message to the AnythingLLM API
+
+        Returns:
+            An async generator of chunks when streaming, otherwise the
+            complete response (None on failure)
+        """
+        if stream is None:
+            stream = self.config.get('stream', True)
+
+        # Answer repeated or paraphrased prompts from the response caches when they are enabled
+        cached_response, cache_key = self._cached_response(message)
+        if cached_response is not None:
+            self.conversation_history.append({"role": "user", "content": message})
+            self.conversation_history.append({"role": "assistant", "content": cached_response})
+            return _single_chunk(cached_response) if stream else cached_response
+
+        # Add user message to conversation history
+        self.conversation_history.append({"role": "user", "content": message})
+
+        payload = self._chat_payload(message, stream)
+
+        if stream:
+            return self._stream_response(payload, cache_key)
+        return await self._get_complete_response(payload, cache_key)
+
+    async def _post_chat(self, payload: Dict[str, Any], stream: bool = False):
+        """
+        Send a chat request to the healthiest AnythingLLM server, with
+        failover and hedging (see endpoints.EndpointPool).
+
+        Returns:
+            Tuple of (endpoint, response, first body chunk when streaming or
+            the parsed JSON body otherwise, stream deadlines of the attempt
+            that answered or None when not streaming)
+
+        Raises:
+            StreamDeadlineExceeded: If every server missed the connect or
+                first-token deadline of a streamed request
+        """
+        config = self.config
+
+        async def send(endpoint: Endpoint):
+            # Started per attempt, so a hedge or failover gets the full deadlines
+            deadlines = StreamDeadlines.from_config(config) if stream else None
+            post = self._get_session().post(
+                f"{endpoint.url}/workspace/{config['workspace_slug']}/chat",
+                headers=self._endpoint_headers(endpoint),
+                json=payload,
+                timeout=self._timeout(stream)
+            )
+            try:
+                response = await (asyncio.wait_for(post, deadlines.remaining()) if stream else post)
+            except aiohttp.ServerTimeoutError as e:
+                if deadlines is None:
+                    raise
+                raise deadlines.exceeded(CONNECT) from e
+            except asyncio.TimeoutError as e:
+                if deadlines is None:
+                    raise
+                raise deadlines.exceeded() from e
+            if response.status >= 500:
+                response.release()
+                raise EndpointError(f"{endpoint.url} returned {response.status}")
+            if response.status != 200:
+                return response, None, deadlines
+            if stream:
+                try:
+                    return response, await _read_chunk(response, deadlines), deadlines
+                except StreamDeadlineExceeded:
+                    response.close()
+                    raise
+            try:
+                return response, await response.json(content_type=None), None
+            finally:
+                response.release()
+
+        async def discard(result):
+            result[0].close()
+
+        endpoint, (response, body, deadlines) = await get_endpoint_pool(config).request_async(
+            send, discard, kind='stream' if stream else 'complete')
+        return endpoint, response, body, deadlines
+
+    async def _stream_response(self, payload: Dict[str, Any], cache_key: tuple = None) -> AsyncGenerator[str, None]:
+        """Stream response from AnythingLLM API"""
+        response_chunks = []
+        endpoint = response = None
+        try:
+            endpoint, response, data, deadlines = await self._post_chat(payload, stream=True)
+            if response.status != 200:
+                print(f"Error: {response.status}")
+                print(f"Response: {await response.text()}")
+                return
+
+            parser = StreamParser()
+            granularity = self.config.get('pseudo_stream_granularity', 'word')
+            finished = False
+            while data and not finished:
+                for event, is_sse in parser.feed(data):
+                    text = event_text(event)
+                    if not is_sse:
+                        # Non-SSE bodies carry the complete response at once
+                        if text is not None:
+                            response_chunks = [text]
+                            for chunk in pseudo_stream(text, granularity):
+                                yield chunk
+                            finished = True
+                            break
+                    elif text is not None:
+                        if text:
+                            response_chunks.append(text)
+                            deadlines.text_received()
+                            yield text
+                    elif 'error' in event:
+                        print(f"Error in stream: {event['error']}")
+                        cache_key = None
+                        finished = True
+                        break
+                if not finished:
+                    data = await _read_chunk(response, deadlines)
+
+            if not finished:
+                for event, is_sse in parser.close():
+                    text = event_text(event)
+                    if text:
+                        response_chunks.append(text)
+                        yield text
+
+        except StreamDeadlineExceeded as e:
+            e.partial_text = ''.join(response_chunks)
+            self.conversation_history.append({"role": "assistant", "content": e.partial_text, "interrupted": True})
+            if endpoint is not None:
+                # Connect and first-token misses before the stream started were recorded by the pool
+                endpoint.record_failure()
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, EndpointError) as e:
+            print(f"Streaming error: {e}")
+            if endpoint is not None:
+                # The stream broke after it started, which failover cannot repair
+                endpoint.record_failure()
+            return
+        finally:
+            if response is not None:
+                response.release()
+
+        # Add assistant response to conversation history
+        full_response = ''.join(response_chunks)
+        if full_response:
+            self.conversation_history.append({"role": "assistant", "content": full_response})
+            self._cache_response(cache_key, full_response)
+
+    async def _get_complete_response(self, payload: Dict[str, Any], cache_key: tuple = None) -> Optional[str]:
+        """Get complete response from AnythingLLM API"""
+        try:
+            endpoint, response, data, _ = await self._post_chat(payload)
+            if response.status != 200:
+                print(f"Error: {response.status}")
+                print(f"Response: {await response.text()}")
+                return None
+
+            if 'textResponse' in data:
+                assistant_message = data['textResponse']
+                self.conversation_history.append({"role": "assistant", "content": assistant_message})
+                self._cache_response(cache_key, assistant_message)
+                return assistant_message
+            else:
+                print(f"Unexpected response format: {data}")
+                return None
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, EndpointError, ValueError) as e:
+            print(f"Request error: {e}")
+            return None
+
+async def _single_chunk(text: str) -> AsyncGenerator[str, None]:
+    yield text
+
+async def _read_chunk(response: aiohttp.ClientResponse, deadlines: StreamDeadlines) -> bytes:
+    """Next body chunk of a streamed response, read within the time left before the current deadline"""
+    remaining = deadlines.remaining()
+    if remaining <= 0:
+        raise deadlines.exceeded()
+    try:
+        return await asyncio.wait_for(response.content.readany(), remaining)
+    except asyncio.TimeoutError as e:
+        raise deadlines.exceeded() from e
+
+async def iter_many(prompts: Iterable[str], concurrency: int = 4, persona: str = None,
+                    config_path: str = None) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Send independent prompts to AnythingLLM concurrently, yielding each
+    result as soon as it is ready.
+
+    Every prompt gets its own conversation, in its own AnythingLLM thread
+    so no prompt sees another's turns, and `concurrency` workers take
+    prompts from the iterable as they free up, so a large batch is never
+    held in memory as pending tasks.
+
+    Args:
+        prompts: Messages to send
+        concurrency: Maximum number of requests in flight
+        persona: Persona to use instead of the default one
+        config_path: Path to the YAML config (default: llm/config.yaml)
+
+    Yields:
+        Dictionaries with the prompt's index, the response (None on
+        failure), an error message and the latency in milliseconds
+    """
+    concurrency = max(1, concurrency)
+    numbered_prompts = enumerate(prompts)
+    batch_id = uuid.uuid4().hex[:12]
+    results = asyncio.Queue()
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def worker():
+            try:
+                # The workers share the iterator; next() never awaits, so no prompt is taken twice
+                for index, prompt in numbered_prompts:
+                    start_time = time.perf_counter()
+                    response = error = None
+                    try:
+                        client = AsyncNPUChatClient(config_path, session=session,
+                                                    thread_id=f"remo-batch-{batch_id}-{index}")
+                        if persona:
+                            client.set_persona(persona, save=False)
+                        response = await client.send_message(prompt, False)
+                        if response is None:
+                            error = "No response from AnythingLLM"
+                    except Exception as e:
+                        error = str(e)
+                    await results.put({
+                        "index": index,
+                        "response": response,
+                        "error": error,
+                        "latency_ms": round(1000 * (time.perf_counter() - start_time), 1)
+                    })
+            finally:
+                await results.put(None)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+        running = len(workers)
+        try:
+            while running:
+                result = await results.get()
+                if result is None:
+                    running -= 1
+                else:
+                    yield result
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+async def send_many(prompts: Sequence[str], concurrency: int = 4, persona: str = None,
+                    config_path: str = None) -> List[Optional[str]]:
+    """
+    Send independent prompts to AnythingLLM concurrently.
+
+    Every prompt gets its own conversation, and at most `concurrency`
+    generations run at once over one shared connection pool.
+
+    Args:
+        prompts: Messages to send
+        concurrency: Maximum number of requests in flight
+        persona: Persona to use instead of the default one
+        config_path: Path to the YAML config (default: llm/config.yaml)
+
+    Returns:
+        Complete response (or None on failure) for each prompt, in order
+    """
+    responses = [None] * len(prompts)
+    async for result in iter_many(prompts, concurrency, persona, config_path):
+        responses[result["index"]] = result["response"]
+    return responses
@@ -4,13 +4,14 @@ Authentication module for AnythingLLM API
 import requests
 import yaml
 import sys
+from config_loader import load_config as load_shared_config
+from http_session import get_session
 from typing import Dict, Any
 
 def load_config() -> Dict[str, Any]:
     """Load configuration from config.yaml"""
     try:
-        with open('config.yaml', 'r') as file:
-            return yaml.safe_load(file)
+        return load_shared_config()
     except FileNotFoundError:
         print("Error: config.yaml not found. Please create it with your API key and settings.")
         sys.exit(1)
@@ -34,7 +35,7 @@ def test_auth() -> bool:
     # Test authentication by getting workspaces (this is a reliable endpoint)
     try:
         print(f"Testing workspaces endpoint...")
-        response = requests.get(
+        response = get_session().get(
             f"{config['model_server_base_url']}/workspaces",
             headers=headers,
             timeout=10
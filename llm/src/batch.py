@@ -0,0 +1,186 @@
+"""
+Batch prompt processing for offline jobs (transcript digests, re-scoring notifications)
+"""
+import argparse
+import asyncio
+import json
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from async_chat_client import iter_many
+
+BatchItem = Union[str, Dict[str, Any]]
+
+_DONE = object()
+
+def normalize_items(items: Iterable[BatchItem]) -> List[Tuple[Any, str]]:
+    """
+    (id, message) for every batch item.
+
+    Items are plain strings, or objects with a "message" and an optional
+    "id" that is echoed back in the result (the position is used otherwise).
+
+    Raises:
+        ValueError: If an item has no message
+    """
+    normalized = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            normalized.append((index, item))
+        elif isinstance(item, dict) and isinstance(item.get('message'), str):
+            normalized.append((item.get('id', index), item['message']))
+        else:
+            raise ValueError(f"Item {index} needs a message")
+    return normalized
+
+class BatchStats:
+    def __init__(self):
+        """Per-item latencies and overall throughput of a batch"""
+        self.start_time = time.perf_counter()
+        self.latencies_ms = []
+        self.succeeded = 0
+        self.failed = 0
+
+    def add(self, result: Dict[str, Any]):
+        self.latencies_ms.append(result['latency_ms'])
+        if result.get('error') is None:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts, throughput and latency percentiles so far"""
+        elapsed = time.perf_counter() - self.start_time
+        latencies = sorted(self.latencies_ms)
+        count = len(latencies)
+
+        def percentile(fraction: float) -> Optional[float]:
+            return latencies[min(count - 1, int(count * fraction))] if count else None
+
+        return {
+            "count": count,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "prompts_per_second": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": latencies[-1] if count else None
+            }
+        }
+
+def run_batch(items: Iterable[BatchItem], concurrency: int = 4, persona: str = None,
+              config_path: str = None) -> Iterator[Dict[str, Any]]:
+    """
+    Run prompts concurrently and yield each result as it finishes.
+
+    The requests run on an asyncio loop in a background thread, so this can
+    be consumed from synchronous code such as a Flask response. Closing the
+    generator early cancels the prompts that have not finished.
+
+    Args:
+        items: Prompts, as strings or {"id", "message"} objects
+        concurrency: Maximum number of requests in flight
+        persona: Persona to use instead of the default one
+        config_path: Path to the YAML config (default: llm/config.yaml)
+
+    Yields:
+        Dictionaries with index, id, response, error and latency_ms
+
+    Raises:
+        ValueError: If an item has no message
+    """
+    normalized = normalize_items(items)
+    results = queue.Queue()
+    loop = asyncio.new_event_loop()
+
+    async def produce():
+        async for result in iter_many((message for _, message in normalized), concurrency, persona, config_path):
+            result["id"] = normalized[result["index"]][0]
+            results.put(result)
+
+    task = loop.create_task(produce())
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            results.put(e)
+        finally:
+            loop.close()
+            results.put(_DONE)
+
+    thread = threading.Thread(target=run, name='batch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            result = results.get()
+            if result is _DONE:
+                break
+            if isinstance(result, Exception):
+                raise result
+            yield result
+    finally:
+        if thread.is_alive():
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                # The loop finished in the meantime
+                pass
+
+def run_batch_ndjson(items: Iterable[BatchItem], concurrency: int = 4, persona: str = None,
+                     config_path: str = None) -> Iterator[str]:
+    """
+    run_batch() as newline-delimited JSON: one "result" line per prompt as
+    it finishes, then a "summary" line with throughput and latency percentiles.
+    """
+    stats = BatchStats()
+    for result in run_batch(items, concurrency, persona, config_path):
+        stats.add(result)
+        yield json.dumps({"type": "result", **result}) + '\n'
+    yield json.dumps({"type": "summary", **stats.summary()}) + '\n'
+
+def read_items(path: str) -> List[BatchItem]:
+    """Prompts from a file: a JSON array, JSON lines, or one plain prompt per line"""
+    with open(path, 'r', encoding='utf-8') if path != '-' else sys.stdin as file:
+        text = file.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        items.append(json.loads(line) if line.startswith('{') else line)
+    return items
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a batch of prompts through AnythingLLM')
+    parser.add_argument('input', help='Prompt file (JSON array, JSON lines or plain lines; - for stdin)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight')
+    parser.add_argument('--persona', type=str, default=None, help='Persona to use')
+    parser.add_argument('--output', type=str, default=None, help='NDJSON output file (default: stdout)')
+    args = parser.parse_args()
+
+    try:
+        items = read_items(args.input)
+        output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            for line in run_batch_ndjson(items, args.concurrency, args.persona):
+                output.write(line)
+                output.flush()
+        finally:
+            if args.output:
+                output.close()
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,71 @@
 """
 Chat client for AnythingLLM API with NPU acceleration
 """
+import threading
+import uuid
 import requests
 import yaml
 import json
 import sys
-from typing import Dict, Any, Generator, Optional
+from typing import Dict, Any, Generator, List, Optional
 from persona import PersonaManager
+from config_loader import load_config, DEFAULT_CONFIG_PATH
+from response_cache import get_shared_cache, is_time_sensitive
+from semantic_cache import get_shared_semantic_cache
+from http_session import get_session, abort_response
+from stream_parser import iter_events, event_text, pseudo_stream
+from conversation_history import ConversationHistory
+from history_store import get_history_store
+from endpoints import Endpoint, EndpointError, RequestCancelled, get_endpoint_pool
+from generation_stats import GenerationTimer, WARMUP_PERSONA, get_generation_stats
+from stream_deadlines import CONNECT, DeadlineStream, StreamDeadlineExceeded, StreamDeadlines
+import metrics
+
+generations_interrupted = metrics.registry.counter(
+    'remo_llm_generations_interrupted_total', 'Streamed generations stopped before they finished', ['reason'])
 
 class NPUChatClient:
-    def __init__(self, config_path: str = 'config.yaml'):
-        """Initialize the chat client with configuration"""
-        self.config = self._load_config(config_path)
-        self.headers = {
+    def __init__(self, config_path: str = None, session_id: str = None):
+        """
+        Initialize the chat client with configuration
+        
+        Args:
+            config_path: Path to the YAML config (default: llm/config.yaml)
+            session_id: Session to persist the history under when history_store is set
+        """
+        self.config_path = config_path or DEFAULT_CONFIG_PATH
+        self._load_config(self.config_path)
+        self.session_id = session_id
+        # AnythingLLM chat thread (sessionId) of the requests; None uses the workspace's shared thread
+        self.thread_id = session_id
+        self.history_store = get_history_store(self.config, self.config_path) if session_id else None
+        self.conversation_history = self._new_history()
+        self.persona_manager = PersonaManager()
+        # Timing of the last generated response (None after a cache hit)
+        self.last_timing = None
+        # Cancel event of each streamed generation in flight -> its upstream responses
+        self._generations = {}
+        self._generations_lock = threading.Lock()
+        self._restore_session()
+        self._initialize_conversation()
+    
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Current configuration, reloaded when the config file changes"""
+        return load_config(self.config_path)
+    
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Request headers for the AnythingLLM API"""
+        return {
             'Authorization': f"Bearer {self.config['api_key']}",
             'Content-Type': 'application/json'
         }
-        self.conversation_history = []
-        self.persona_manager = PersonaManager()
-        self._initialize_conversation()
     
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from YAML file"""
         try:
-            with open(config_path, 'r') as file:
-                return yaml.safe_load(file)
+            return load_config(config_path)
         except FileNotFoundError:
             print(f"Error: {config_path} not found. Please create it with your API key and settings.")
             sys.exit(1)
@@ -32,6 +73,39 @@ class NPUChatClient:
             print(f"Error parsing {config_path}: {e}")
             sys.exit(1)
     
+    def _new_history(self) -> ConversationHistory:
+        """Empty history bounded by the token budget in the config"""
+        config = self.config
+        return ConversationHistory(
+            max_tokens=config.get('history_max_tokens', 4000),
+            summary_max_tokens=config.get('history_summary_max_tokens', 300),
+            chars_per_token=config.get('history_chars_per_token', 4.0),
+            summarize=self._summarize_history,
+            store=self.history_store,
+            session_id=self.session_id
+        )
+    
+    def _restore_session(self):
+        """Load the persona, summary and recent messages stored for this session"""
+        if self.history_store is None:
+            return
+        
+        stored = self.history_store.load_session(self.session_id)
+        if stored is None:
+            self.history_store.save_persona(self.session_id, self.get_current_persona())
+            return
+        
+        # Set directly, set_persona would clear the history and rewrite persona.yaml
+        if stored['persona'] in self.persona_manager.personas:
+            self.persona_manager.current_persona = stored['persona']
+        # The system prompt goes first, it is only added to an empty history
+        self._initialize_conversation()
+        self.conversation_history.load(
+            stored['summary'],
+            stored['summarized_count'],
+            self.history_store.recent(self.session_id, stored['messages'] - stored['summarized_count'])
+        )
+    
     def _initialize_conversation(self):
         """Initialize conversation with persona system prompt"""
         system_prompt = self.persona_manager.get_system_prompt()
@@ -41,12 +115,14 @@ class NPUChatClient:
                 "content": system_prompt
             })
     
-    def set_persona(self, persona_name: str) -> bool:
-        """Change the current persona"""
-        if self.persona_manager.set_persona(persona_name):
+    def set_persona(self, persona_name: str, save: bool = True) -> bool:
+        """Change the current persona (save=False leaves the default in persona.yaml alone)"""
+        if self.persona_manager.set_persona(persona_name, save):
             # Clear history and reinitialize with new persona
-            self.conversation_history = []
+            self.conversation_history.clear()
             self._initialize_conversation()
+            if self.history_store is not None:
+                self.history_store.save_persona(self.session_id, persona_name)
             return True
         return False
     
@@ -58,110 +134,383 @@ class NPUChatClient:
         """Get available personas"""
         return self.persona_manager.get_available_personas()
     
-    def send_message(self, message: str, stream: bool = None) -> Optional[Generator[str, None, None]]:
-        """Send a message to the AnythingLLM API"""
+    def preflight(self):
+        """Check that AnythingLLM is reachable, accepts the API key and has the workspace
+
+        Raises:
+            RuntimeError: If any of the checks fail
+        """
+        errors = []
+        endpoints = get_endpoint_pool(self.config).endpoints
+        for endpoint in endpoints:
+            try:
+                self._check_endpoint(endpoint)
+            except RuntimeError as e:
+                errors.append(e)
+                if len(endpoints) > 1:
+                    print(f"{endpoint.url}: {e}")
+        
+        # One working server is enough, requests fail over to it
+        if len(errors) == len(endpoints):
+            raise errors[0]
+    
+    def _check_endpoint(self, endpoint: Endpoint):
+        """Preflight checks for a single AnythingLLM server"""
+        try:
+            response = get_session().get(
+                f"{endpoint.url}/workspaces",
+                headers=self._endpoint_headers(endpoint),
+                timeout=10
+            )
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"AnythingLLM is not reachable: {e}")
+
+        if response.status_code != 200:
+            raise RuntimeError(f"AnythingLLM rejected the API key: {response.status_code}")
+
+        workspace_slugs = [w.get('slug', '') for w in response.json().get('workspaces', [])]
+        if self.config['workspace_slug'] not in workspace_slugs:
+            raise RuntimeError(f"Workspace '{self.config['workspace_slug']}' not found in AnythingLLM")
+    
+    def _endpoint_headers(self, endpoint: Endpoint) -> Dict[str, str]:
+        """Request headers for one AnythingLLM server"""
+        return {
+            'Authorization': f"Bearer {endpoint.api_key}",
+            'Content-Type': 'application/json'
+        }
+    
+    def warm_up(self, prompt: str = "Reply with OK.") -> List[Dict[str, Any]]:
+        """
+        Send a tiny generation to every AnythingLLM server so the model is
+        loaded before the next chat needs it.
+        
+        Every warm-up uses a new AnythingLLM thread, so the ping stays tiny
+        instead of carrying a growing thread history, and the conversation
+        history is left alone. Its timing is recorded under the "warmup" persona,
+        so cold and warm first-token latency show up in the generation stats.
+        
+        Returns:
+            Timing of the warm-up on each server that answered
+        """
+        config = self.config
+        payload = {
+            "message": prompt,
+            "workspaceSlug": config['workspace_slug'],
+            "mode": "chat",
+            "stream": True,
+            "sessionId": f"remo-warmup-{uuid.uuid4().hex[:12]}"
+        }
+        stats = get_generation_stats(config)
+        timings = []
+        # Every server, not just the fastest, so failover never lands on a cold model
+        for endpoint in get_endpoint_pool(config).endpoints:
+            timer = GenerationTimer(config.get('history_chars_per_token', 4.0))
+            try:
+                response = get_session().post(
+                    f"{endpoint.url}/workspace/{config['workspace_slug']}/chat",
+                    headers=self._endpoint_headers(endpoint),
+                    json=payload,
+                    stream=True,
+                    timeout=(config.get('connect_timeout', 5), config.get('stream_timeout', 60))
+                )
+            except requests.exceptions.RequestException as e:
+                print(f"Warm-up error for {endpoint.url}: {e}")
+                continue
+            
+            try:
+                if response.status_code != 200:
+                    print(f"Warm-up error for {endpoint.url}: {response.status_code}")
+                    continue
+                timer.response(endpoint.url, response.elapsed.total_seconds())
+                for event, _ in iter_events(response.iter_content(chunk_size=None)):
+                    text = event_text(event)
+                    if text:
+                        timer.chunk(text)
+            except requests.exceptions.RequestException as e:
+                print(f"Warm-up error for {endpoint.url}: {e}")
+                continue
+            finally:
+                response.close()
+            
+            timing = timer.finish()
+            if stats is not None:
+                stats.record(config['workspace_slug'], WARMUP_PERSONA, timing)
+            timings.append(timing)
+        return timings
+    
+    def cancel(self) -> int:
+        """
+        Stop every streamed generation of this client that is still running.
+        
+        The upstream connections are shut down, so AnythingLLM stops
+        generating and the NPU is free for the next request. The turns are
+        kept in the history, marked as interrupted.
+        
+        Returns:
+            Number of generations cancelled
+        """
+        with self._generations_lock:
+            generations = [(cancelled, list(responses)) for cancelled, responses in self._generations.items()]
+        for cancelled, responses in generations:
+            cancelled.set()
+            for response in responses:
+                abort_response(response)
+        return len(generations)
+    
+    def _attach_response(self, cancelled: threading.Event, response: requests.Response):
+        """Register an upstream response of a generation, so cancel() can shut it down"""
+        with self._generations_lock:
+            responses = self._generations.get(cancelled)
+            if responses is not None:
+                responses.append(response)
+        # Cancelled before the response arrived
+        if cancelled.is_set():
+            abort_response(response)
+    
+    def _post_chat(self, payload: Dict[str, Any], stream: bool = False, cancelled: threading.Event = None):
+        """
+        Send a chat request to the healthiest AnythingLLM server.
+        
+        Fails over to the next server when one cannot be reached or answers
+        with a 5xx, and hedges to a second server when the first is slower
+        than usual (see endpoints.EndpointPool).
+        
+        Args:
+            payload: Chat request body
+            stream: Whether to stream the response
+            cancelled: Cancel event of a streamed generation registered with cancel()
+        
+        Returns:
+            Tuple of (endpoint, response, body chunks). When streaming, the
+            chunks are a DeadlineStream whose first chunk has already been
+            read, so a stalled stream counts as slow.
+        
+        Raises:
+            RequestCancelled: If the generation was cancelled before its first chunk
+            StreamDeadlineExceeded: If every server missed the connect or
+                first-token deadline of a streamed request
+        """
+        config = self.config
+        timeout = (config.get('connect_timeout', 5), config.get('stream_timeout', 60))
+        
+        def send(endpoint: Endpoint):
+            if cancelled is not None and cancelled.is_set():
+                raise RequestCancelled("Generation cancelled")
+            # Started per attempt, so a hedge or failover gets the full deadlines
+            deadlines = StreamDeadlines.from_config(config) if stream else None
+            try:
+                response = get_session().post(
+                    f"{endpoint.url}/workspace/{config['workspace_slug']}/chat",
+                    headers=self._endpoint_headers(endpoint),
+                    json=payload,
+                    stream=stream,
+                    timeout=deadlines.request_timeout() if stream else timeout
+                )
+            except requests.exceptions.ConnectTimeout as e:
+                if deadlines is None:
+                    raise
+                raise deadlines.exceeded(CONNECT) from e
+            except requests.exceptions.ReadTimeout as e:
+                if deadlines is None:
+                    raise
+                raise deadlines.exceeded() from e
+            if response.status_code >= 500:
+                response.close()
+                raise EndpointError(f"{endpoint.url} returned {response.status_code}")
+            chunks = iter(())
+            if stream and response.status_code == 200:
+                if cancelled is not None:
+                    self._attach_response(cancelled, response)
+                chunks = DeadlineStream(response, deadlines)
+                try:
+                    chunks.read_first()
+                except Exception:
+                    response.close()
+                    # The read failed because cancel() shut the connection down
+                    if cancelled is not None and cancelled.is_set():
+                        raise RequestCancelled("Generation cancelled")
+                    raise
+            return response, chunks
+        
+        endpoint, (response, chunks) = get_endpoint_pool(config).request(
+            send, discard=lambda result: result[0].close(), kind='stream' if stream else 'complete')
+        return endpoint, response, chunks
+
+    def send_message(self, message: str, stream: bool = None,
+                     cancelled: threading.Event = None) -> Optional[Generator[str, None, None]]:
+        """
+        Send a message to the AnythingLLM API
+        
+        Args:
+            message: User message
+            stream: Whether to stream the response (default: stream in the config)
+            cancelled: Event that stops a streamed generation when set; cancel()
+                stops it too. Closing the returned generator early also stops it.
+        
+        A streamed response that misses its connect, first-token or
+        chunk-idle deadline (connect_timeout, first_token_timeout and
+        chunk_idle_timeout in the config) ends by raising
+        StreamDeadlineExceeded, which carries the text received so far.
+        """
         if stream is None:
             stream = self.config.get('stream', True)
         
+        # Answer repeated or paraphrased prompts from the response caches when they are enabled.
+        # A cached answer never reaches AnythingLLM, so the exchange is missing from the
+        # thread the model answers from; later answers in the session will not know about it
+        cached_response, cache_key = self._cached_response(message)
+        if cached_response is not None:
+            self.last_timing = None
+            self.conversation_history.append({"role": "user", "content": message})
+            self.conversation_history.append({"role": "assistant", "content": cached_response})
+            return iter([cached_response]) if stream else cached_response
+        
         # Add user message to conversation history
         self.conversation_history.append({"role": "user", "content": message})
         
-        payload = {
-            "message": message,
-            "workspaceSlug": self.config['workspace_slug'],
-            "mode": "chat",
-            "stream": stream
-        }
+        payload = self._chat_payload(message, stream)
         
+        timer = GenerationTimer(self.config.get('history_chars_per_token', 4.0))
         try:
             if stream:
-                return self._stream_response(payload)
+                return self._stream_response(payload, cache_key, timer, cancelled)
             else:
-                return self._get_complete_response(payload)
+                return self._get_complete_response(payload, cache_key, timer)
         except requests.exceptions.RequestException as e:
             print(f"Error sending message: {e}")
             return None
     
-    def _stream_response(self, payload: Dict[str, Any]) -> Generator[str, None, None]:
-        """Stream response from AnythingLLM API"""
+    def _chat_payload(self, message: str, stream: bool) -> Dict[str, Any]:
+        """Chat request body, in this client's own AnythingLLM thread so sessions never see each other's turns"""
+        payload = {
+            "message": message,
+            "workspaceSlug": self.config['workspace_slug'],
+            "mode": "chat",
+            "stream": stream
+        }
+        if self.thread_id:
+            payload["sessionId"] = self.thread_id
+        return payload
+    
+    def _stream_response(self, payload: Dict[str, Any], cache_key: tuple = None,
+                         timer: GenerationTimer = None,
+                         cancelled: threading.Event = None) -> Generator[str, None, None]:
+        """Stream response from AnythingLLM API, stopping early when cancelled"""
+        endpoint = response = None
+        timer = timer or GenerationTimer()
+        cancelled = cancelled or threading.Event()
+        response_chunks = []
+        with self._generations_lock:
+            self._generations[cancelled] = []
         try:
-            response = requests.post(
-                f"{self.config['model_server_base_url']}/workspace/{self.config['workspace_slug']}/chat",
-                headers=self.headers,
-                json=payload,
-                stream=True,
-                timeout=self.config.get('stream_timeout', 60)
-            )
+            endpoint, response, chunks = self._post_chat(payload, stream=True, cancelled=cancelled)
+            timer.response(endpoint.url, response.elapsed.total_seconds())
             
             if response.status_code != 200:
                 print(f"Error: {response.status_code}")
                 print(f"Response: {response.text}")
                 return
             
-            # Process streaming response
-            full_response = ""
-            for line in response.iter_lines():
-                if line:
-                    line_str = line.decode('utf-8')
-                    # Handle different streaming formats
-                    if line_str.startswith('data: '):
-                        try:
-                            data = json.loads(line_str[6:])
-                            if 'text' in data:
-                                chunk = data['text']
-                                full_response += chunk
-                                yield chunk
-                            elif 'textResponse' in data:
-                                chunk = data['textResponse']
-                                full_response += chunk
-                                yield chunk
-                            elif 'error' in data:
-                                print(f"Error in stream: {data['error']}")
-                                break
-                        except json.JSONDecodeError:
-                            continue
-                    elif line_str.strip():  # Handle non-SSE format
-                        try:
-                            data = json.loads(line_str)
-                            if 'textResponse' in data:
-                                # Simulate streaming by yielding the response character by character
-                                text_response = data['textResponse']
-                                full_response = text_response
-                                for char in text_response:
-                                    yield char
-                                break  # Exit after processing the complete response
-                            elif 'text' in data:
-                                text_response = data['text']
-                                full_response = text_response
-                                for char in text_response:
-                                    yield char
-                                break
-                        except json.JSONDecodeError:
-                            continue
+            # Parse events as bytes arrive, collecting chunks in a list
+            granularity = self.config.get('pseudo_stream_granularity', 'word')
+            for event, is_sse in iter_events(chunks):
+                if cancelled.is_set():
+                    break
+                text = event_text(event)
+                if not is_sse:
+                    # Non-SSE bodies carry the complete response at once
+                    if text is not None:
+                        response_chunks = [text]
+                        timer.chunk(text)
+                        yield from pseudo_stream(text, granularity)
+                        break
+                elif text is not None:
+                    if text:
+                        response_chunks.append(text)
+                        timer.chunk(text)
+                        chunks.deadlines.text_received()
+                        yield text
+                elif 'error' in event:
+                    print(f"Error in stream: {event['error']}")
+                    cache_key = None
+                    break
+            
+            if cancelled.is_set():
+                self._interrupt(response_chunks, timer, 'cancelled')
+                return
             
             # Add assistant response to conversation history
+            full_response = ''.join(response_chunks)
             if full_response:
-                self.conversation_history.append({"role": "assistant", "content": full_response})
-                
+                self.conversation_history.append({
+                    "role": "assistant",
+                    "content": full_response,
+                    "timing": self._record_timing(timer)
+                })
+                self._cache_response(cache_key, full_response)
+        
+        except GeneratorExit:
+            # The caller stopped reading, for example because its HTTP client went away
+            self._interrupt(response_chunks, timer, 'closed')
+            raise
+        except StreamDeadlineExceeded as e:
+            if cancelled.is_set():
+                self._interrupt(response_chunks, timer, 'cancelled')
+                return
+            e.partial_text = ''.join(response_chunks)
+            self._interrupt(response_chunks, timer, 'deadline')
+            if endpoint is not None:
+                # Connect and first-token misses before the stream started were recorded by the pool
+                endpoint.record_failure()
+            raise
         except Exception as e:
+            if cancelled.is_set():
+                # The read failed because cancel() shut the connection down
+                self._interrupt(response_chunks, timer, 'cancelled')
+                return
             print(f"Streaming error: {e}")
+            if endpoint is not None:
+                # The stream broke after it started, which failover cannot repair
+                endpoint.record_failure()
             return
+        finally:
+            with self._generations_lock:
+                self._generations.pop(cancelled, None)
+            # Hand the connection back to the pool (or drop it if the stream was cut short,
+            # which also tells AnythingLLM to stop generating)
+            if response is not None:
+                response.close()
     
-    def _get_complete_response(self, payload: Dict[str, Any]) -> Optional[str]:
+    def _interrupt(self, response_chunks: List[str], timer: GenerationTimer, reason: str):
+        """Keep a generation that was stopped early in the history, marked as interrupted"""
+        generations_interrupted.inc(reason=reason)
+        self.last_timing = timer.finish()
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": ''.join(response_chunks),
+            "interrupted": True,
+            "timing": self.last_timing
+        })
+    
+    def _get_complete_response(self, payload: Dict[str, Any], cache_key: tuple = None,
+                               timer: GenerationTimer = None) -> Optional[str]:
         """Get complete response from AnythingLLM API"""
+        timer = timer or GenerationTimer()
         try:
-            response = requests.post(
-                f"{self.config['model_server_base_url']}/workspace/{self.config['workspace_slug']}/chat",
-                headers=self.headers,
-                json=payload,
-                timeout=self.config.get('stream_timeout', 60)
-            )
+            endpoint, response, _ = self._post_chat(payload)
+            timer.response(endpoint.url, response.elapsed.total_seconds())
             
             if response.status_code == 200:
                 data = response.json()
                 if 'textResponse' in data:
                     assistant_message = data['textResponse']
-                    self.conversation_history.append({"role": "assistant", "content": assistant_message})
+                    timer.chunk(assistant_message or '')
+                    self.conversation_history.append({
+                        "role": "assistant",
+                        "content": assistant_message,
+                        "timing": self._record_timing(timer)
+                    })
+                    self._cache_response(cache_key, assistant_message)
                     return assistant_message
                 else:
                     print(f"Unexpected response format: {data}")
@@ -175,10 +524,138 @@ class NPUChatClient:
             print(f"Request error: {e}")
             return None
     
+    def _record_timing(self, timer: GenerationTimer) -> Dict[str, Any]:
+        """Finish a generation's timing and add it to the rolling stats of the workspace and persona"""
+        timing = timer.finish()
+        self.last_timing = timing
+        config = self.config
+        stats = get_generation_stats(config)
+        if stats is not None:
+            stats.record(config['workspace_slug'], self.get_current_persona(), timing)
+        return timing
+    
+    def _cached_response(self, message: str):
+        """
+        Look a prompt up in the exact cache, then in the semantic cache.
+        
+        Answers to time-sensitive prompts ("what time is it") are only kept
+        for response_cache_time_sensitive_ttl seconds.
+        
+        Returns:
+            Tuple of (cached response or None, key to store the new response under)
+        """
+        config = self.config
+        exact_cache = get_shared_cache(config)
+        semantic_cache = get_shared_semantic_cache(config)
+        if exact_cache is None and semantic_cache is None:
+            return None, None
+        
+        workspace = config['workspace_slug']
+        persona = self.get_current_persona()
+        exact_key = semantic_key = None
+        ttl_seconds = config.get('response_cache_time_sensitive_ttl', 60) if is_time_sensitive(message) else None
+        
+        if exact_cache is not None:
+            exact_key = exact_cache.make_key(workspace, persona, message, self.conversation_history)
+            response = exact_cache.get(exact_key)
+            if response is not None:
+                return response, None
+        
+        if semantic_cache is not None:
+            semantic_key = (message, semantic_cache.context_key(workspace, persona, message,
+                                                                self.conversation_history))
+            response = semantic_cache.get(*semantic_key)
+            if response is not None:
+                if exact_key is not None:
+                    # The next identical prompt can skip the similarity search
+                    exact_cache.put(exact_key, response, ttl_seconds)
+                return response, None
+        
+        return None, (exact_key, semantic_key, ttl_seconds)
+    
+    def _cache_response(self, cache_key, response: str):
+        """Store a complete response under the keys computed before it was requested"""
+        if cache_key is None:
+            return
+        exact_key, semantic_key, ttl_seconds = cache_key
+        exact_cache = get_shared_cache(self.config)
+        if exact_cache is not None and exact_key is not None:
+            exact_cache.put(exact_key, response, ttl_seconds)
+        semantic_cache = get_shared_semantic_cache(self.config)
+        if semantic_cache is not None and semantic_key is not None:
+            message, context = semantic_key
+            semantic_cache.put(message, context, response, ttl_seconds)
+    
+    def _summarize_history(self, summary: str, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Ask AnythingLLM to fold older messages into the running summary.
+        
+        Off unless history_summary is set: AnythingLLM answers from its own
+        thread history, so the summary is only shown by /history, and each
+        one costs a background generation on the shared endpoints.
+        
+        Runs on the history compaction thread. Every request gets a fresh
+        AnythingLLM thread, so the summary prompt does not show up in the
+        conversation and never sees other sessions' transcripts or earlier
+        summary prompts (the summary so far is part of the prompt).
+        
+        Returns:
+            The new summary, or None to fall back to an extract of the messages
+        """
+        config = self.config
+        if not config.get('history_summary', False):
+            return None
+        
+        transcript = '\n'.join(f"{message['role']}: {message['content']}" for message in messages)
+        prompt = ("Summarize the conversation below in a few sentences. Keep names, facts, "
+                  "preferences and open requests the assistant needs to remember.\n\n")
+        if summary:
+            prompt += f"Summary so far: {summary}\n\n"
+        prompt += transcript
+        
+        # Always the blocking request: this runs on the compaction thread, and
+        # AsyncNPUChatClient overrides _post_chat with a coroutine
+        endpoint, response, _ = NPUChatClient._post_chat(self, {
+            "message": prompt,
+            "workspaceSlug": config['workspace_slug'],
+            "mode": "chat",
+            "stream": False,
+            "sessionId": f"remo-summary-{self.thread_id or 'default'}-{uuid.uuid4().hex[:12]}"
+        })
+        if response.status_code != 200:
+            print(f"History summary error: {response.status_code}")
+            return None
+        return response.json().get('textResponse')
+    
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.conversation_history.clear()
     
     def get_history(self) -> list:
-        """Get conversation history"""
-        return self.conversation_history.copy()
+        """Get conversation history, with compacted turns replaced by their summary"""
+        return self.conversation_history.messages()
+    
+    def get_history_page(self, limit: int = 50, before: int = None) -> Dict[str, Any]:
+        """
+        Get a page of the conversation, newest page first.
+        
+        With a history store the pages cover the whole conversation,
+        including turns that were compacted out of memory.
+        
+        Args:
+            limit: Maximum number of messages
+            before: Cursor returned as next_before by the previous page
+        
+        Returns:
+            Dictionary with the messages (oldest first) and next_before,
+            None on the last page
+        """
+        if self.history_store is not None:
+            messages = self.history_store.read(self.session_id, limit, before)
+            next_before = messages[0]['id'] if len(messages) == limit else None
+            return {"history": messages, "next_before": next_before}
+        
+        messages = self.conversation_history.messages()
+        end = len(messages) if before is None else min(before, len(messages))
+        start = max(0, end - limit)
+        return {"history": messages[start:end], "next_before": start if start > 0 else None}
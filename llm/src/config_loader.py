@@ -0,0 +1,97 @@
+"""
+Shared configuration loader with mtime-based caching and environment overrides
+"""
+import logging
+import os
+import threading
+from typing import Any, Dict
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# llm/config.yaml, independent of the working directory
+DEFAULT_CONFIG_PATH = os.environ.get(
+    'REMO_CONFIG',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.yaml')
+)
+
+# Environment variables starting with this prefix override config keys,
+# e.g. REMO_MODEL_SERVER_BASE_URL overrides model_server_base_url
+ENV_PREFIX = 'REMO_'
+
+_cache = {}
+_lock = threading.Lock()
+
+def load_config(config_path: str = None) -> Dict[str, Any]:
+    """
+    Load configuration, parsing the YAML file only when it has changed.
+
+    The file's modification time is checked on every call, so edits are
+    picked up without a restart. If the file later becomes unreadable or
+    invalid, the last good configuration keeps being served.
+
+    The returned dictionary is shared between callers and must not be modified.
+
+    Args:
+        config_path: Path to the YAML file (default: llm/config.yaml)
+
+    Returns:
+        Configuration dictionary with environment overrides applied
+
+    Raises:
+        FileNotFoundError: If the file does not exist and was never loaded
+        yaml.YAMLError: If the file is invalid and was never loaded
+    """
+    path = os.path.abspath(config_path or DEFAULT_CONFIG_PATH)
+    cached = _cache.get(path)
+
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        if cached is not None:
+            logger.warning(f"{path} is no longer readable, keeping the last loaded configuration")
+            return cached[1]
+        raise FileNotFoundError(f"{path} not found")
+
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with open(path, 'r') as file:
+                config = yaml.safe_load(file) or {}
+        except (OSError, yaml.YAMLError) as e:
+            if cached is not None:
+                logger.warning(f"Could not reload {path}, keeping the last loaded configuration: {e}")
+                # Don't parse the broken file again until it changes
+                _cache[path] = (mtime, cached[1])
+                return cached[1]
+            raise
+
+        config = apply_env_overrides(config)
+        _cache[path] = (mtime, config)
+        if cached is not None:
+            logger.info(f"Reloaded configuration from {path}")
+        return config
+
+def apply_env_overrides(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Override config keys from REMO_* environment variables.
+
+    Values are parsed as YAML scalars, so "false" and "30" become a bool and an int.
+    """
+    overridden = dict(config)
+    for name, value in os.environ.items():
+        if not name.startswith(ENV_PREFIX) or name == 'REMO_CONFIG':
+            continue
+        key = name[len(ENV_PREFIX):].lower()
+        try:
+            overridden[key] = yaml.safe_load(value)
+        except yaml.YAMLError:
+            overridden[key] = value
+    return overridden
@@ -0,0 +1,247 @@
+"""
+Token-budgeted conversation history with background compaction
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import metrics
+
+history_compactions = metrics.registry.counter(
+    'remo_history_compactions_total', 'Conversation history compactions', ['result'])
+
+# Overhead of the role and separators around each message, in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+# Compaction brings the live turns down to this share of the budget, so it
+# does not run again on the very next message
+COMPACT_TARGET = 0.75
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+Summarizer = Callable[[str, List[Dict[str, str]]], Optional[str]]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _compaction_executor() -> ThreadPoolExecutor:
+    # One worker shared by every session, so compaction never competes with replies for threads
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history-compaction')
+        return _executor
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Rough token count of a text, without loading a tokenizer"""
+    return int(len(text or '') / chars_per_token) + MESSAGE_OVERHEAD_TOKENS
+
+class ConversationHistory:
+    def __init__(self, max_tokens: int = 4000, summary_max_tokens: int = 300,
+                 chars_per_token: float = 4.0, summarize: Summarizer = None,
+                 store=None, session_id: str = None):
+        """
+        Initialize the conversation history.
+
+        System messages are kept as they are. Once the other messages go over
+        max_tokens, the oldest ones are taken out and folded into a summary by
+        `summarize` on a background thread, so the reply that triggered it is
+        not delayed. If summarizing fails, a shortened extract of the messages
+        is used instead.
+
+        With a store, every message and summary is also written to it, so
+        the full conversation survives restarts while memory stays bounded.
+
+        The history behaves like the list it replaces: append, len, iteration,
+        indexing and copy() work as before.
+
+        Args:
+            max_tokens: Budget for the messages after the system prompt (0 disables the limit)
+            summary_max_tokens: Budget for the summary of compacted messages
+            chars_per_token: Characters per token used to estimate message sizes
+            summarize: Callable taking (previous summary, messages) and returning a new summary or None
+            store: History store the session is persisted to (optional)
+            session_id: Session the history belongs to in the store
+        """
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.chars_per_token = chars_per_token
+        self.summarize = summarize
+        self.store = store if session_id is not None else None
+        self.session_id = session_id
+        self.summary = ''
+        # Number of messages folded into the summary, counted from the start of the session
+        self.summarized_count = 0
+        self.compactions = 0
+        self._system = []
+        # (message, estimated tokens), oldest first
+        self._turns = deque()
+        self._turn_tokens = 0
+        # Messages taken out of the live history but not yet in the summary
+        self._pending = []
+        self._future = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> int:
+        """Estimated size of the history, summary included"""
+        with self._lock:
+            return self._turn_tokens + self._summary_tokens()
+
+    def append(self, message: Dict[str, str]):
+        """Add a message, compacting older ones in the background when over budget"""
+        with self._lock:
+            if message.get('role') == 'system':
+                self._system.append(message)
+                return
+            if self.store is not None:
+                self.store.append(self.session_id, message.get('role'), message.get('content'))
+            self._add_turn(message)
+
+    def load(self, summary: str, summarized_count: int, messages: List[Dict[str, str]]):
+        """
+        Restore a stored session without writing it back to the store.
+
+        Args:
+            summary: Stored summary of the first summarized_count messages
+            summarized_count: Number of messages the summary covers
+            messages: The messages after those, oldest first
+        """
+        with self._lock:
+            self.summary = summary or ''
+            self.summarized_count = summarized_count
+            for message in messages:
+                self._add_turn(message)
+
+    def clear(self):
+        """Drop every message, the system prompt and the summary"""
+        with self._lock:
+            self._system = []
+            self._turns.clear()
+            self._turn_tokens = 0
+            self._pending = []
+            self.summary = ''
+            self.summarized_count = 0
+            if self.store is not None:
+                self.store.clear(self.session_id)
+            # A compaction still running belongs to the old conversation
+            self._generation += 1
+            self._future = None
+
+    def messages(self) -> List[Dict[str, str]]:
+        """System messages, the summary of compacted turns, then the recent turns"""
+        with self._lock:
+            messages = list(self._system)
+            if self.summary:
+                messages.append({"role": "system", "content": SUMMARY_PREFIX + self.summary})
+            messages.extend(message for message, _ in self._turns)
+            return messages
+
+    def copy(self) -> List[Dict[str, str]]:
+        return self.messages()
+
+    def wait_for_compaction(self, timeout: float = None) -> bool:
+        """Block until a running compaction finishes; False on timeout"""
+        while True:
+            with self._lock:
+                future = self._future
+            if future is None:
+                return True
+            try:
+                future.result(timeout)
+            except Exception:
+                return False
+            with self._lock:
+                if self._future is future:
+                    return True
+
+    def stats(self) -> Dict[str, Any]:
+        """History size counters for the API"""
+        with self._lock:
+            return {
+                "messages": len(self._system) + len(self._turns),
+                "tokens": self._turn_tokens + self._summary_tokens(),
+                "max_tokens": self.max_tokens,
+                "summary_tokens": self._summary_tokens(),
+                "pending_messages": len(self._pending),
+                "compactions": self.compactions
+            }
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return iter(self.messages())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._system) + (1 if self.summary else 0) + len(self._turns)
+
+    def __getitem__(self, index):
+        return self.messages()[index]
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def _summary_tokens(self) -> int:
+        return estimate_tokens(self.summary, self.chars_per_token) if self.summary else 0
+
+    def _add_turn(self, message: Dict[str, str]):
+        tokens = estimate_tokens(message.get('content'), self.chars_per_token)
+        self._turns.append((message, tokens))
+        self._turn_tokens += tokens
+        if self.max_tokens and self._turn_tokens > self.max_tokens:
+            self._take_oldest_turns()
+            self._schedule_compaction()
+
+    def _take_oldest_turns(self):
+        # The newest exchange always stays, however large it is
+        target = self.max_tokens * COMPACT_TARGET
+        while len(self._turns) > 2 and self._turn_tokens > target:
+            message, tokens = self._turns.popleft()
+            self._turn_tokens -= tokens
+            self._pending.append(message)
+
+    def _schedule_compaction(self):
+        if self._future is not None or not self._pending:
+            return
+        messages, self._pending = self._pending, []
+        self._future = _compaction_executor().submit(
+            self._compact, self.summary, messages, self._generation)
+
+    def _compact(self, summary: str, messages: List[Dict[str, str]], generation: int):
+        new_summary = None
+        if self.summarize is not None:
+            try:
+                new_summary = self.summarize(summary, messages)
+            except Exception as e:
+                print(f"History summary error: {e}")
+        if new_summary:
+            history_compactions.inc(result='summarized')
+        else:
+            new_summary = self._extract(summary, messages)
+            history_compactions.inc(result='extracted')
+
+        limit = int(self.summary_max_tokens * self.chars_per_token)
+        new_summary = new_summary.strip()
+        if len(new_summary) > limit:
+            # Keep the end, it describes the most recent of the compacted turns
+            new_summary = '...' + new_summary[-limit:]
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            self.summary = new_summary
+            self.summarized_count += len(messages)
+            self.compactions += 1
+            if self.store is not None:
+                self.store.save_summary(self.session_id, new_summary, self.summarized_count)
+            self._future = None
+            # Turns that went over budget while this one ran
+            self._schedule_compaction()
+
+    def _extract(self, summary: str, messages: List[Dict[str, str]]) -> str:
+        # First sentence of each message, when no summary could be generated
+        parts = [summary] if summary else []
+        for message in messages:
+            content = ' '.join((message.get('content') or '').split())
+            first_sentence = content.split('. ')[0][:160]
+            parts.append(f"{message.get('role')}: {first_sentence}")
+        return ' | '.join(parts)
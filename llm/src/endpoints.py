@@ -0,0 +1,455 @@
+"""
+LLM endpoint pool with health scoring, circuit breakers, failover and hedged requests
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import metrics
+
+endpoint_requests = metrics.registry.counter(
+    'remo_llm_endpoint_requests_total', 'Requests sent to each LLM endpoint', ['endpoint', 'result'])
+hedged_requests = metrics.registry.counter(
+    'remo_llm_hedged_requests_total', 'Requests duplicated to a second LLM endpoint', ['winner'])
+circuit_open = metrics.registry.gauge(
+    'remo_llm_circuit_open', 'Whether the circuit breaker of an LLM endpoint is open', ['endpoint'])
+request_queue_wait = metrics.registry.histogram(
+    'remo_llm_request_queue_seconds', 'Time hedged requests waited for a request thread')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Latencies kept per endpoint and request kind for the hedging percentile
+LATENCY_WINDOW = 200
+# Below this many samples the percentile means little, DEFAULT_HEDGE_DELAY is used
+MIN_LATENCY_SAMPLES = 10
+DEFAULT_HEDGE_DELAY = 2.0
+# Default threads for hedged requests; a request holds one only until its response starts
+HEDGE_THREADS = 32
+
+T = TypeVar('T')
+
+class EndpointError(Exception):
+    """An endpoint failed in a way another endpoint may not, such as a 5xx response"""
+
+class RequestCancelled(Exception):
+    """The caller gave up on the request, which says nothing about the endpoint"""
+
+class Endpoint:
+    def __init__(self, url: str, api_key: str, failure_threshold: int = 3, reset_timeout: float = 30):
+        """
+        An AnythingLLM server and the health of its recent requests.
+
+        The circuit opens after failure_threshold consecutive failures, and
+        the endpoint gets no traffic. After reset_timeout one probe request
+        is let through (half open); its result closes or reopens the circuit.
+
+        Args:
+            url: API base URL, e.g. http://localhost:3001/api/v1
+            api_key: API key for this server
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe
+        """
+        self.url = url.rstrip('/')
+        self.api_key = api_key
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        parts = urlsplit(self.url)
+        self.name = parts.netloc or self.url
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        # Request kind -> recent latencies in seconds
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def available(self) -> bool:
+        """Whether a request may be sent now"""
+        with self._lock:
+            state = self._state()
+            return state == CLOSED or (state == HALF_OPEN and not self._probing)
+
+    def begin(self):
+        """Mark a request as sent, so a half-open endpoint gets a single probe"""
+        with self._lock:
+            if self._state() == HALF_OPEN:
+                self._probing = True
+
+    def release(self):
+        """End a request without a verdict (the caller cancelled it), freeing a half-open probe"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self, latency: float, kind: str = 'complete'):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._probing = False
+            self._latencies.setdefault(kind, deque(maxlen=LATENCY_WINDOW)).append(latency)
+        circuit_open.set(0, endpoint=self.name)
+        endpoint_requests.inc(endpoint=self.name, result='success')
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self._state() == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+            opened = self.opened_at is not None
+        circuit_open.set(1 if opened else 0, endpoint=self.name)
+        endpoint_requests.inc(endpoint=self.name, result='failure')
+
+    def latencies(self, kind: str = 'complete') -> List[float]:
+        """Recent latencies of a request kind, in seconds"""
+        with self._lock:
+            return list(self._latencies.get(kind, ()))
+
+    def latency_percentile(self, percentile: float, kind: str = 'complete') -> Optional[float]:
+        """Latency at the given percentile (0-100), or None without enough samples"""
+        return _percentile(self.latencies(kind), percentile)
+
+    def score(self, kind: str = 'complete') -> Optional[float]:
+        """Lower is better: median latency, scaled up by recent failures; None until measured"""
+        median = self.latency_percentile(50, kind)
+        if median is None:
+            return None
+        return median * (1 + self.consecutive_failures)
+
+    def stats(self) -> Dict[str, Any]:
+        """Endpoint health for the API"""
+        return {
+            "url": self.url,
+            "state": self.state,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "p50_seconds": {kind: self.latency_percentile(50, kind) for kind in list(self._latencies)},
+            "p95_seconds": {kind: self.latency_percentile(95, kind) for kind in list(self._latencies)}
+        }
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+class EndpointPool:
+    def __init__(self, endpoints: List[Endpoint], hedge: bool = True, hedge_percentile: float = 95,
+                 hedge_min_delay: float = 0.5, hedge_threads: int = HEDGE_THREADS):
+        """
+        Spread requests over LLM endpoints, healthiest first.
+
+        A request goes to the best available endpoint. If it fails before
+        producing a response, the next endpoint is tried. If it is still
+        running after the hedge_percentile latency of recent requests, the same
+        request is also sent to the next endpoint and the first response
+        wins; the other is closed when it arrives.
+
+        Hedged requests run on hedge_threads request threads. Without
+        hedging, or with a single endpoint, requests run on the caller's
+        thread, so they never queue behind each other.
+
+        Args:
+            endpoints: Endpoints in order of preference
+            hedge: Whether to send slow requests to a second endpoint
+            hedge_percentile: Latency percentile (0-100) after which a request is hedged
+            hedge_min_delay: Shortest wait before hedging, in seconds
+            hedge_threads: Hedged requests that can wait for a response at once
+        """
+        self.endpoints = endpoints
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self._executor = ThreadPoolExecutor(max_workers=hedge_threads, thread_name_prefix='llm-request')
+
+    def ordered(self, kind: str = 'complete') -> List[Endpoint]:
+        """
+        Endpoints that may take a request now, in the order to try them.
+
+        A half-open endpoint comes first so it gets its probe. Measured
+        endpoints follow by score, then unmeasured ones, keeping the
+        configured order between equals; a fallback server is measured
+        through hedges and failovers before it can take over.
+        """
+        def key(endpoint: Endpoint):
+            score = endpoint.score(kind)
+            return endpoint.state != HALF_OPEN, score is None, score or 0.0
+
+        return sorted((endpoint for endpoint in self.endpoints if endpoint.available()), key=key)
+
+    def hedge_delay(self, kind: str = 'complete') -> float:
+        """
+        How long to wait for a response before hedging.
+
+        The percentile is taken over every endpoint's samples: a server that
+        only recently started taking traffic has too few of its own, and a
+        single stall among them would push its percentile to the stall.
+        """
+        samples = [latency for endpoint in self.endpoints for latency in endpoint.latencies(kind)]
+        latency = _percentile(samples, self.hedge_percentile)
+        return max(self.hedge_min_delay, DEFAULT_HEDGE_DELAY if latency is None else latency)
+
+    def request(self, send: Callable[[Endpoint], T], discard: Callable[[T], None] = None,
+                kind: str = 'complete') -> Tuple[Endpoint, T]:
+        """
+        Send a request with failover and hedging.
+
+        Args:
+            send: Sends the request to an endpoint and returns once the
+                response has started; raises on failure
+            discard: Releases the result of a request that lost a hedge
+            kind: Latency class of the request ("stream" measures the first
+                chunk, "complete" the whole response)
+
+        Returns:
+            Tuple of (endpoint that answered, result of send)
+
+        Raises:
+            EndpointError: If no endpoint is available
+            RequestCancelled: If send raised it, without failing over
+            Exception: The last failure, when every endpoint tried failed
+        """
+        candidates = self.ordered(kind)
+        if not candidates:
+            raise EndpointError("All LLM endpoints are unavailable (circuit open)")
+        if not self.hedge or len(candidates) == 1:
+            return self._request_inline(candidates, send, kind)
+
+        pending = {}
+        started = {}
+        launched = 0
+        hedged = False
+        last_error = None
+
+        def launch():
+            nonlocal launched
+            endpoint = candidates[launched]
+            launched += 1
+            endpoint.begin()
+            attempt_started = threading.Event()
+            future = self._executor.submit(self._attempt, endpoint, send, kind, time.perf_counter(), attempt_started)
+            pending[future] = endpoint
+            started[future] = attempt_started
+
+        launch()
+        while pending:
+            timeout = None
+            if not hedged and launched < len(candidates):
+                timeout = self.hedge_delay(kind)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if not any(started[future].is_set() for future in pending):
+                    # Still queued for a request thread, a hedge would only queue behind it
+                    continue
+                hedged = True
+                launch()
+                continue
+
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    result = future.result()
+                except RequestCancelled:
+                    for other in pending:
+                        other.add_done_callback(lambda f: _discard(f, discard))
+                    raise
+                except Exception as e:
+                    last_error = e
+                    continue
+                if hedged:
+                    hedged_requests.inc(winner='primary' if endpoint is candidates[0] else 'hedge')
+                for loser in pending:
+                    loser.add_done_callback(lambda f: _discard(f, discard))
+                return endpoint, result
+
+            if not pending and launched < len(candidates):
+                # Fail over to the next endpoint
+                launch()
+
+        raise last_error
+
+    def _request_inline(self, candidates: List[Endpoint], send: Callable[[Endpoint], T],
+                        kind: str) -> Tuple[Endpoint, T]:
+        """Failover without hedging, on the caller's thread"""
+        last_error = None
+        for endpoint in candidates:
+            endpoint.begin()
+            try:
+                return endpoint, self._attempt(endpoint, send, kind)
+            except RequestCancelled:
+                raise
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    async def request_async(self, send: Callable[[Endpoint], Awaitable[T]],
+                            discard: Callable[[T], Awaitable[None]] = None,
+                            kind: str = 'complete') -> Tuple[Endpoint, T]:
+        """Asyncio version of request(), with send and discard as coroutine functions"""
+        candidates = self.ordered(kind)
+        if not candidates:
+            raise EndpointError("All LLM endpoints are unavailable (circuit open)")
+
+        pending = {}
+        launched = 0
+        hedged = False
+        last_error = None
+
+        def launch():
+            nonlocal launched
+            endpoint = candidates[launched]
+            launched += 1
+            endpoint.begin()
+            pending[asyncio.ensure_future(self._attempt_async(endpoint, send, kind))] = endpoint
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and not hedged and launched < len(candidates):
+                    timeout = self.hedge_delay(kind)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    launch()
+                    continue
+
+                for task in done:
+                    endpoint = pending.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    if hedged:
+                        hedged_requests.inc(winner='primary' if endpoint is candidates[0] else 'hedge')
+                    for loser in pending:
+                        loser.add_done_callback(lambda t: _discard_async(t, discard))
+                    pending.clear()
+                    return endpoint, task.result()
+
+                if not pending and launched < len(candidates):
+                    launch()
+        finally:
+            # Only left over when the caller was cancelled
+            for task in pending:
+                task.cancel()
+
+        raise last_error
+
+    def stats(self) -> Dict[str, Any]:
+        """Health of every endpoint for the API"""
+        return {
+            "hedge": self.hedge,
+            "hedge_percentile": self.hedge_percentile,
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints]
+        }
+
+    def close(self):
+        """Stop the request threads once the running requests finish"""
+        self._executor.shutdown(wait=False)
+
+    def _attempt(self, endpoint: Endpoint, send: Callable[[Endpoint], T], kind: str,
+                 submitted: float = None, started: threading.Event = None) -> T:
+        start_time = time.perf_counter()
+        if submitted is not None:
+            # Measured separately, so waiting for a thread never counts as endpoint latency
+            request_queue_wait.observe(start_time - submitted)
+        if started is not None:
+            started.set()
+        try:
+            result = send(endpoint)
+        except RequestCancelled:
+            endpoint.release()
+            raise
+        except Exception:
+            endpoint.record_failure()
+            raise
+        # Hedge losers are measured too, so a slow endpoint's percentile stays honest
+        endpoint.record_success(time.perf_counter() - start_time, kind)
+        return result
+
+    async def _attempt_async(self, endpoint: Endpoint, send: Callable[[Endpoint], Awaitable[T]], kind: str) -> T:
+        start_time = time.perf_counter()
+        try:
+            result = await send(endpoint)
+        except Exception:
+            endpoint.record_failure()
+            raise
+        endpoint.record_success(time.perf_counter() - start_time, kind)
+        return result
+
+def _percentile(samples: List[float], percentile: float) -> Optional[float]:
+    if len(samples) < MIN_LATENCY_SAMPLES:
+        return None
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+def _discard(future, discard):
+    if discard is not None and not future.cancelled() and future.exception() is None:
+        discard(future.result())
+
+def _discard_async(task, discard):
+    if discard is not None and not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(discard(task.result()))
+
+def endpoint_settings(config: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """
+    (url, api_key) of every configured endpoint.
+
+    model_servers lists the servers, as URLs or as {url, api_key} entries
+    (api_key defaults to the top-level one). Without it, model_server_base_url
+    is the only endpoint.
+    """
+    servers = config.get('model_servers') or [config['model_server_base_url']]
+    settings = []
+    for server in servers:
+        if isinstance(server, dict):
+            settings.append((server['url'], server.get('api_key', config['api_key'])))
+        else:
+            settings.append((server, config['api_key']))
+    return settings
+
+_shared_pool = None
+_shared_key = None
+_shared_lock = threading.Lock()
+
+def get_endpoint_pool(config: Dict[str, Any]) -> EndpointPool:
+    """Process-wide endpoint pool, rebuilt when the endpoint settings change"""
+    global _shared_pool, _shared_key
+    key = (
+        tuple(endpoint_settings(config)),
+        config.get('circuit_failure_threshold', 3),
+        config.get('circuit_reset_timeout', 30),
+        config.get('hedge_requests', True),
+        config.get('hedge_percentile', 95),
+        config.get('hedge_min_delay', 0.5),
+        config.get('hedge_threads', HEDGE_THREADS)
+    )
+    with _shared_lock:
+        if _shared_pool is None or key != _shared_key:
+            settings, failure_threshold, reset_timeout, hedge, hedge_percentile, hedge_min_delay, hedge_threads = key
+            if _shared_pool is not None:
+                _shared_pool.close()
+            _shared_pool = EndpointPool(
+                [Endpoint(url, api_key, failure_threshold, reset_timeout) for url, api_key in settings],
+                hedge=hedge,
+                hedge_percentile=hedge_percentile,
+                hedge_min_delay=hedge_min_delay,
+                hedge_threads=hedge_threads
+            )
+            _shared_key = key
+        return _shared_pool
@@ -0,0 +1,189 @@
+"""
+Generation speed telemetry: time to first token, tokens per second and rolling percentiles
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import metrics
+
+time_to_first_token = metrics.registry.histogram(
+    'remo_llm_time_to_first_token_seconds', 'Time from sending a chat request to its first text chunk',
+    ['workspace', 'persona', 'start'])
+tokens_per_second = metrics.registry.histogram(
+    'remo_llm_tokens_per_second', 'Estimated generation speed after the first chunk',
+    ['workspace', 'persona'], buckets=(1, 2, 5, 10, 15, 20, 30, 50, 100, 200))
+
+# Timing fields summarized by GenerationStats
+PERCENTILE_FIELDS = ('request_ms', 'ttft_ms', 'total_ms', 'tokens_per_second')
+# Persona that warm-up and keep-alive generations are recorded under
+WARMUP_PERSONA = 'warmup'
+
+class GenerationTimer:
+    def __init__(self, chars_per_token: float = 4.0):
+        """
+        Timestamps of one generation, started when the request is sent.
+
+        Args:
+            chars_per_token: Characters per token used to estimate token counts
+        """
+        self.chars_per_token = chars_per_token
+        self.start_time = time.perf_counter()
+        self.request_seconds = None
+        self.first_chunk_time = None
+        self.last_chunk_time = None
+        self.chunks = 0
+        self.chars = 0
+        self.endpoint = None
+
+    def response(self, endpoint_url: str, elapsed: float):
+        """Note the server that answered and the time until its response headers arrived"""
+        self.endpoint = endpoint_url
+        self.request_seconds = elapsed
+
+    def chunk(self, text: str):
+        """Note a text chunk as it arrives from the server"""
+        now = time.perf_counter()
+        if self.first_chunk_time is None:
+            self.first_chunk_time = now
+        self.last_chunk_time = now
+        self.chunks += 1
+        self.chars += len(text)
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Timing of the generation.
+
+        request_ms covers sending the request until the response headers
+        (network and queueing), ttft_ms and total_ms are measured from the
+        start of the request, failover included. tokens_per_second is the
+        speed between the first and last chunk, so it is None for responses
+        that arrived in one piece.
+        """
+        end_time = self.last_chunk_time or time.perf_counter()
+        tokens = round(self.chars / self.chars_per_token)
+        generation_seconds = end_time - self.first_chunk_time if self.first_chunk_time is not None else 0
+        return {
+            "endpoint": self.endpoint,
+            "request_ms": _ms(self.request_seconds),
+            "ttft_ms": _ms(self.first_chunk_time - self.start_time) if self.first_chunk_time is not None else None,
+            "total_ms": _ms(end_time - self.start_time),
+            "chunks": self.chunks,
+            "chars": self.chars,
+            "tokens": tokens,
+            "tokens_per_second": (round(tokens / generation_seconds, 1)
+                                  if self.chunks > 1 and generation_seconds > 0 else None)
+        }
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(1000 * seconds, 1) if seconds is not None else None
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class GenerationStats:
+    def __init__(self, window: int = 500, cold_after: float = 300):
+        """
+        Rolling generation timings per workspace and persona.
+
+        A generation counts as cold when the workspace's model had been idle
+        for more than cold_after seconds (or never ran in this process)
+        before it started, since the model may have been paged out.
+
+        Args:
+            window: Number of most recent generations kept per workspace and persona
+            cold_after: Idle seconds after which a generation counts as cold
+        """
+        self.window = window
+        self.cold_after = cold_after
+        # (workspace, persona) -> recent timings, oldest first
+        self._timings = {}
+        # workspace -> time.time() the last generation finished
+        self._last_activity = {}
+        self._lock = threading.Lock()
+
+    def idle_seconds(self, workspace: str) -> Optional[float]:
+        """Seconds since a generation for the workspace last finished, None if none has"""
+        with self._lock:
+            last_activity = self._last_activity.get(workspace or '')
+        return time.time() - last_activity if last_activity is not None else None
+
+    def record(self, workspace: str, persona: str, timing: Dict[str, Any]):
+        """Add the timing of a finished generation, marking it as cold or warm"""
+        key = (workspace or '', persona or '')
+        now = time.time()
+        started_at = now - (timing.get('total_ms') or 0) / 1000
+        with self._lock:
+            last_activity = self._last_activity.get(key[0])
+            timing['cold'] = last_activity is None or started_at - last_activity > self.cold_after
+            self._last_activity[key[0]] = max(now, last_activity or 0)
+            timings = self._timings.get(key)
+            if timings is None:
+                timings = self._timings[key] = deque(maxlen=self.window)
+            timings.append(timing)
+
+        if timing.get('ttft_ms') is not None:
+            time_to_first_token.observe(timing['ttft_ms'] / 1000, workspace=key[0], persona=key[1],
+                                        start='cold' if timing['cold'] else 'warm')
+        if timing.get('tokens_per_second') is not None:
+            tokens_per_second.observe(timing['tokens_per_second'], workspace=key[0], persona=key[1])
+
+    def summary(self, workspace: str = None, persona: str = None) -> List[Dict[str, Any]]:
+        """
+        p50/p95 of the recent timings for each workspace and persona.
+
+        Args:
+            workspace: Only include this workspace (optional)
+            persona: Only include this persona (optional)
+        """
+        with self._lock:
+            groups = [(key, list(timings)) for key, timings in sorted(self._timings.items())
+                      if (workspace is None or key[0] == workspace) and (persona is None or key[1] == persona)]
+
+        summaries = []
+        for (group_workspace, group_persona), timings in groups:
+            summary = {"workspace": group_workspace, "persona": group_persona, "count": len(timings)}
+            for field in PERCENTILE_FIELDS:
+                values = [timing[field] for timing in timings if timing.get(field) is not None]
+                summary[field] = {"p50": _percentile(values, 0.5), "p95": _percentile(values, 0.95)}
+            # First-token latency after the model sat idle, next to the steady state
+            for start, cold in (("cold", True), ("warm", False)):
+                values = [timing['ttft_ms'] for timing in timings
+                          if timing.get('cold') is cold and timing.get('ttft_ms') is not None]
+                summary[f"ttft_ms_{start}"] = {"count": len(values), "p50": _percentile(values, 0.5),
+                                               "p95": _percentile(values, 0.95)}
+            summaries.append(summary)
+        return summaries
+
+    def clear(self):
+        """Drop every recorded timing, keeping track of when each model was last used"""
+        with self._lock:
+            self._timings = {}
+
+def format_timing(timing: Dict[str, Any]) -> str:
+    """One-line summary of a response's timing for the chat front ends"""
+    parts = [f"first token {timing['ttft_ms'] / 1000:.2f}s" if timing['ttft_ms'] is not None else None,
+             f"total {timing['total_ms'] / 1000:.2f}s",
+             f"{timing['tokens_per_second']:.1f} tokens/s" if timing['tokens_per_second'] is not None else None]
+    return " · ".join(part for part in parts if part)
+
+_shared_stats = None
+_shared_lock = threading.Lock()
+
+def get_generation_stats(config: Dict[str, Any]) -> Optional[GenerationStats]:
+    """
+    Process-wide generation timings shared by every chat client, or None
+    when generation_stats_window is 0.
+    """
+    global _shared_stats
+    window = config.get('generation_stats_window', 500)
+    if not window:
+        return None
+    with _shared_lock:
+        if _shared_stats is None:
+            _shared_stats = GenerationStats(window, config.get('generation_cold_after', 300))
+        return _shared_stats
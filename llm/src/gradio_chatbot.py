@@ -5,6 +5,8 @@ import gradio as gr
 import sys
 import os
 from chat_client import NPUChatClient
+from generation_stats import format_timing
+from stream_deadlines import StreamDeadlineExceeded
 
 class GradioChatInterface:
     def __init__(self):
@@ -25,10 +27,10 @@ class GradioChatInterface:
     def chat_response(self, message, history):
         """Handle chat response for Gradio interface"""
         if not self.chat_client:
-            return "Error: Chat client not initialized. Please check your configuration."
+            return "Error: Chat client not initialized. Please check your configuration.", ""
         
         if not message.strip():
-            return history
+            return history, ""
         
         # Add user message to history
         history.append([message, ""])
@@ -39,15 +41,19 @@ class GradioChatInterface:
         if response_stream:
             # Collect the full response
             full_response = ""
-            for chunk in response_stream:
-                full_response += chunk
+            try:
+                for chunk in response_stream:
+                    full_response += chunk
+            except StreamDeadlineExceeded as e:
+                full_response += f"\n\n⚠️ {e}, the answer is incomplete."
             
             # Update the last message in history
             history[-1][1] = full_response
         else:
             history[-1][1] = "Sorry, I couldn't process your message. Please try again."
         
-        return history
+        timing = self.chat_client.last_timing
+        return history, f"⏱️ {format_timing(timing)}" if timing else ""
     
     def clear_chat(self):
         """Clear the chat history"""
@@ -107,6 +113,8 @@ class GradioChatInterface:
                 )
                 send_btn = gr.Button("Send", variant="primary", scale=1)
             
+            timing = gr.Markdown("")
+            
             with gr.Row():
                 clear_btn = gr.Button("Clear Chat", variant="secondary")
                 gr.Markdown(
@@ -122,7 +130,7 @@ class GradioChatInterface:
             msg.submit(
                 self.chat_response,
                 inputs=[msg, chatbot],
-                outputs=[chatbot],
+                outputs=[chatbot, timing],
                 show_progress=True
             ).then(
                 lambda: "",  # Clear input
@@ -132,7 +140,7 @@ class GradioChatInterface:
             send_btn.click(
                 self.chat_response,
                 inputs=[msg, chatbot],
-                outputs=[chatbot],
+                outputs=[chatbot, timing],
                 show_progress=True
             ).then(
                 lambda: "",  # Clear input
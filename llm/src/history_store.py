@@ -0,0 +1,303 @@
+"""
+Durable SQLite store for conversation history and sessions
+"""
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import metrics
+
+flush_latency = metrics.registry.histogram(
+    'remo_history_store_flush_seconds', 'Time spent writing a batch of history to SQLite',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_by_session ON messages (session_id, id);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    persona TEXT,
+    summary TEXT NOT NULL DEFAULT '',
+    summarized_count INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+INSERT_MESSAGE = "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)"
+UPSERT_PERSONA = """
+INSERT INTO sessions (session_id, persona, created_at, updated_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (session_id) DO UPDATE SET persona = excluded.persona, updated_at = excluded.updated_at
+"""
+UPSERT_SUMMARY = """
+INSERT INTO sessions (session_id, summary, summarized_count, created_at, updated_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (session_id) DO UPDATE SET summary = excluded.summary,
+    summarized_count = excluded.summarized_count, updated_at = excluded.updated_at
+"""
+DELETE_MESSAGES = "DELETE FROM messages WHERE session_id = ?"
+RESET_SUMMARY = "UPDATE sessions SET summary = '', summarized_count = 0, updated_at = ? WHERE session_id = ?"
+DELETE_SESSION = "DELETE FROM sessions WHERE session_id = ?"
+
+class SQLiteHistoryStore:
+    def __init__(self, path: str, flush_interval: float = 0.05, batch_size: int = 500):
+        """
+        Open (or create) a history database.
+
+        The database runs in WAL mode, so readers never wait for the writer
+        and several server processes can share one file. Writes are queued
+        and committed in batches by a background thread, which keeps a chat
+        turn from waiting on the disk. Reads flush the queue first, so they
+        always see earlier writes of the same process.
+
+        Args:
+            path: Database file
+            flush_interval: Longest time a write waits in the queue, in seconds
+            batch_size: Queued writes that trigger an immediate flush
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.writes = 0
+        self.batches = 0
+        # (sql, params) in the order they were queued
+        self._pending = []
+        self._condition = threading.Condition()
+        # Held while a batch is taken from the queue and written, so batches land in order
+        self._write_lock = threading.Lock()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+
+        self._thread = threading.Thread(target=self._run, name='history-store-writer', daemon=True)
+        self._thread.start()
+
+    def append(self, session_id: str, role: str, content: str, created_at: float = None):
+        """Queue a message for writing"""
+        self._queue(INSERT_MESSAGE, (session_id, role, content or '', created_at or time.time()))
+
+    def save_persona(self, session_id: str, persona: str):
+        """Queue the persona of a session for writing, creating the session if needed"""
+        now = time.time()
+        self._queue(UPSERT_PERSONA, (session_id, persona, now, now))
+
+    def save_summary(self, session_id: str, summary: str, summarized_count: int):
+        """Queue the summary of the first summarized_count messages of a session for writing"""
+        now = time.time()
+        self._queue(UPSERT_SUMMARY, (session_id, summary, summarized_count, now, now))
+
+    def clear(self, session_id: str):
+        """Queue the removal of a session's messages and summary, keeping the session"""
+        self._queue(DELETE_MESSAGES, (session_id,))
+        self._queue(RESET_SUMMARY, (time.time(), session_id))
+
+    def delete_session(self, session_id: str):
+        """Queue the removal of a session and its messages"""
+        self._queue(DELETE_MESSAGES, (session_id,))
+        self._queue(DELETE_SESSION, (session_id,))
+
+    def load_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Persona, summary and message count of a session, or None if it was never stored"""
+        self.flush()
+        with self._reader() as connection:
+            row = connection.execute(
+                "SELECT persona, summary, summarized_count, created_at, updated_at "
+                "FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            count = connection.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+        persona, summary, summarized_count, created_at, updated_at = row
+        return {
+            "session_id": session_id,
+            "persona": persona,
+            "summary": summary,
+            "summarized_count": summarized_count,
+            "messages": count,
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+
+    def read(self, session_id: str, limit: int = 50, before: int = None) -> List[Dict[str, Any]]:
+        """
+        Read a page of a session's messages, newest page first.
+
+        Args:
+            session_id: Session to read
+            limit: Maximum number of messages
+            before: Only return messages with a smaller id (the id of the
+                oldest message of the previous page)
+
+        Returns:
+            Messages with id, role, content and created_at, oldest first
+        """
+        self.flush()
+        with self._reader() as connection:
+            if before is None:
+                rows = connection.execute(
+                    "SELECT id, role, content, created_at FROM messages WHERE session_id = ? "
+                    "ORDER BY id DESC LIMIT ?", (session_id, limit)).fetchall()
+            else:
+                rows = connection.execute(
+                    "SELECT id, role, content, created_at FROM messages WHERE session_id = ? AND id < ? "
+                    "ORDER BY id DESC LIMIT ?", (session_id, before, limit)).fetchall()
+        return [{"id": row[0], "role": row[1], "content": row[2], "created_at": row[3]}
+                for row in reversed(rows)]
+
+    def recent(self, session_id: str, count: int) -> List[Dict[str, str]]:
+        """The last `count` messages of a session, oldest first"""
+        if count <= 0:
+            return []
+        self.flush()
+        with self._reader() as connection:
+            # Walks the index from the newest end, so restoring a long session stays cheap
+            rows = connection.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? "
+                "ORDER BY id DESC LIMIT ?", (session_id, count)).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def flush(self):
+        """Write every queued change now"""
+        with self._write_lock:
+            with self._condition:
+                batch, self._pending = self._pending, []
+            if batch:
+                self._write(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        """Store counters for the API"""
+        with self._condition:
+            pending = len(self._pending)
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "pending_writes": pending,
+            "writes": self.writes,
+            "batches": self.batches
+        }
+
+    def close(self):
+        """Flush queued writes and close the database"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
+        self._writer.close()
+        with self._readers_lock:
+            for connection in self._readers:
+                connection.close()
+            self._readers = []
+
+    def _connect(self) -> sqlite3.Connection:
+        # Transactions are opened explicitly, so autocommit mode is used
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # With WAL a commit survives a process crash; only a power loss can drop the last batches
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def _reader(self):
+        # Connections are pooled, a request only holds one while it reads
+        with self._readers_lock:
+            connection = self._readers.pop() if self._readers else None
+        if connection is None:
+            connection = self._connect()
+        try:
+            yield connection
+        finally:
+            with self._readers_lock:
+                self._readers.append(connection)
+
+    def _queue(self, sql: str, params: tuple):
+        with self._condition:
+            self._pending.append((sql, params))
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._pending and not self._closed:
+                    self._condition.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"History store write error: {e}")
+                time.sleep(self.flush_interval)
+
+    def _write(self, batch: List[tuple]):
+        start_time = time.perf_counter()
+        try:
+            self._writer.execute("BEGIN IMMEDIATE")
+            # Consecutive writes of the same kind (mostly messages) go in one executemany
+            for sql, group in itertools.groupby(batch, key=lambda write: write[0]):
+                self._writer.executemany(sql, [params for _, params in group])
+            self._writer.execute("COMMIT")
+        except sqlite3.Error:
+            if self._writer.in_transaction:
+                self._writer.execute("ROLLBACK")
+            # Put the batch back so the next flush retries it
+            with self._condition:
+                self._pending[:0] = batch
+            raise
+        self.writes += len(batch)
+        self.batches += 1
+        flush_latency.observe(time.perf_counter() - start_time)
+
+HISTORY_STORES = {
+    'sqlite': SQLiteHistoryStore
+}
+
+_shared_stores = {}
+_shared_lock = threading.Lock()
+
+def get_history_store(config: Dict[str, Any], config_path: str = None) -> Optional[SQLiteHistoryStore]:
+    """
+    Process-wide history store selected by history_store in the configuration,
+    or None for "memory" (the default), where history lives only in the chat clients.
+
+    Args:
+        config: Configuration dictionary
+        config_path: Config file that a relative history_store_path is resolved against
+
+    Raises:
+        ValueError: If history_store names an unknown backend
+    """
+    backend = config.get('history_store', 'memory')
+    if backend == 'memory':
+        return None
+    if backend not in HISTORY_STORES:
+        raise ValueError(f"Unknown history_store '{backend}', expected one of: memory, {', '.join(HISTORY_STORES)}")
+
+    path = config.get('history_store_path', 'history.db')
+    if not os.path.isabs(path):
+        base_dir = os.path.dirname(os.path.abspath(config_path)) if config_path else os.getcwd()
+        path = os.path.join(base_dir, path)
+
+    with _shared_lock:
+        store = _shared_stores.get((backend, path))
+        if store is None:
+            store = HISTORY_STORES[backend](
+                path,
+                flush_interval=config.get('history_store_flush_interval', 0.05)
+            )
+            _shared_stores[(backend, path)] = store
+        return store
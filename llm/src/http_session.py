@@ -0,0 +1,125 @@
+"""
+Shared keep-alive HTTP session for AnythingLLM calls
+"""
+import socket
+import threading
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+from config_loader import load_config
+
+http_requests = metrics.registry.counter(
+    'remo_http_requests_total', 'Requests sent to the model server', ['host'])
+http_connections = metrics.registry.gauge(
+    'remo_http_connections_opened', 'Connections opened to the model server since startup', ['host'])
+
+_session = None
+_lock = threading.Lock()
+
+def create_session(pool_size: int = 10, retries: int = 2, backoff_factor: float = 0.3) -> requests.Session:
+    """
+    Create a session that keeps connections open between requests.
+
+    Connection failures are retried for every method, since nothing reached
+    the server. Read errors and 502/503/504 responses are only retried for
+    idempotent methods, so a chat POST is never sent twice.
+
+    Args:
+        pool_size: Connections kept open per host
+        retries: Retries after a failed attempt
+        backoff_factor: Base of the exponential delay between retries
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.hooks['response'].append(_record_response)
+    return session
+
+def get_session() -> requests.Session:
+    """Process-wide session, sized by http_pool_size and http_retries in the config"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                try:
+                    config = load_config()
+                except Exception:
+                    config = {}
+                _session = create_session(
+                    pool_size=config.get('http_pool_size', 10),
+                    retries=config.get('http_retries', 2)
+                )
+    return _session
+
+def abort_response(response: requests.Response):
+    """
+    Shut down the connection of a streaming response, from any thread.
+
+    A read blocked on the response wakes up with an error, and the server
+    sees the client go away, so it can stop generating. The connection is
+    dropped rather than returned to the pool.
+    """
+    connection = getattr(response.raw, 'connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            # Already closed
+            pass
+
+def set_read_timeout(response: requests.Response, seconds: float):
+    """Change the socket timeout for the next reads of a streaming response"""
+    connection = getattr(response.raw, 'connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock is not None:
+        sock.settimeout(max(seconds, 0.001))
+
+def connection_stats() -> Dict[str, Any]:
+    """Requests sent and connections opened per host, to check that connections are reused"""
+    stats = {}
+    for host, pool in _pools():
+        requests_sent = http_requests.get(host=host)
+        stats[host] = {
+            "requests": requests_sent,
+            "connections_opened": pool.num_connections,
+            "reuse_ratio": 1 - pool.num_connections / requests_sent if requests_sent else 0.0
+        }
+    return stats
+
+def _pools():
+    if _session is None:
+        return []
+    pools = []
+    for adapter in set(_session.adapters.values()):
+        pool_manager = adapter.poolmanager
+        for key in pool_manager.pools.keys():
+            pool = pool_manager.pools.get(key)
+            if pool is not None:
+                pools.append((f"{pool.host}:{pool.port}", pool))
+    return pools
+
+def _record_response(response, *args, **kwargs):
+    parts = urlsplit(response.url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    host = f"{parts.hostname}:{port}"
+    http_requests.inc(host=host)
+    for pool_host, pool in _pools():
+        if pool_host == host:
+            http_connections.set(pool.num_connections, host=host)
@@ -125,11 +125,12 @@ When responding:
         """Get the current persona configuration"""
         return self.personas.get(self.current_persona, self.personas.get('remo', {}))
     
-    def set_persona(self, persona_name: str) -> bool:
-        """Set the current persona"""
+    def set_persona(self, persona_name: str, save: bool = True) -> bool:
+        """Set the current persona, saving it as the default unless save is False"""
         if persona_name in self.personas:
             self.current_persona = persona_name
-            self._save_personas()
+            if save:
+                self._save_personas()
             return True
         return False
     
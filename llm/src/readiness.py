@@ -0,0 +1,125 @@
+"""
+Background service initialization with readiness tracking and retry backoff
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class ServiceState:
+    PENDING = 'pending'
+    LOADING = 'loading'
+    READY = 'ready'
+    FAILED = 'failed'
+
+    def __init__(self, name: str, initializer: Callable[[], None], required: bool = True,
+                 retry_base_delay: float = 2.0, retry_max_delay: float = 60.0):
+        """
+        Track the initialization of one service.
+
+        Args:
+            name: Service name reported by /ready
+            initializer: Callable that sets the service up, raising on failure
+            required: Whether the server is not ready until this service is
+            retry_base_delay: Delay before the first retry after a failure
+            retry_max_delay: Upper bound for the exponential retry delay
+        """
+        self.name = name
+        self.initializer = initializer
+        self.required = required
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.state = self.PENDING
+        self.error = None
+        self.attempts = 0
+        self.consecutive_failures = 0
+        self.next_retry_at = None
+        self.ready_since = None
+        self.last_duration = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self) -> bool:
+        """
+        Start initializing in a background thread.
+
+        Does nothing if the service is ready, already loading or still
+        backing off after a failure.
+
+        Returns:
+            True if an initialization attempt was started
+        """
+        with self._lock:
+            if self.state in (self.LOADING, self.READY):
+                return False
+            if self.state == self.FAILED and time.time() < self.next_retry_at:
+                return False
+            self.state = self.LOADING
+            self.attempts += 1
+            self._done.clear()
+
+        thread = threading.Thread(target=self._run, name=f"init-{self.name}")
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def ensure(self, timeout: float = 0) -> bool:
+        """
+        Retry a failed service if its backoff has elapsed and wait for it.
+
+        Args:
+            timeout: Seconds to wait for an attempt in progress
+
+        Returns:
+            True if the service is ready
+        """
+        self.start()
+        if self.state == self.LOADING and timeout:
+            self._done.wait(timeout)
+        return self.state == self.READY
+
+    def seconds_until_retry(self) -> float:
+        """Seconds left before the next retry is allowed"""
+        if self.state != self.FAILED:
+            return 0
+        return max(0.0, self.next_retry_at - time.time())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """State of the service for the API"""
+        return {
+            "state": self.state,
+            "required": self.required,
+            "error": self.error,
+            "attempts": self.attempts,
+            "retry_in": round(self.seconds_until_retry(), 1),
+            "ready_since": self.ready_since,
+            "init_seconds": self.last_duration
+        }
+
+    def _run(self):
+        start_time = time.perf_counter()
+        try:
+            self.initializer()
+        except (Exception, SystemExit) as e:
+            # SystemExit covers config loaders that exit on a missing file
+            with self._lock:
+                self.consecutive_failures += 1
+                delay = min(self.retry_max_delay,
+                            self.retry_base_delay * 2 ** (self.consecutive_failures - 1))
+                self.state = self.FAILED
+                self.error = str(e) or e.__class__.__name__
+                self.next_retry_at = time.time() + delay
+            logger.warning(f"{self.name} initialization failed, retrying in {delay:.0f}s: {self.error}")
+        else:
+            with self._lock:
+                self.state = self.READY
+                self.error = None
+                self.consecutive_failures = 0
+                self.next_retry_at = None
+                self.ready_since = time.time()
+            logger.info(f"{self.name} service initialized successfully")
+        finally:
+            self.last_duration = time.perf_counter() - start_time
+            self._done.set()
@@ -0,0 +1,158 @@
+"""
+Exact-match cache for LLM responses
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import metrics
+
+cache_requests = metrics.registry.counter(
+    'remo_llm_cache_requests_total', 'LLM response cache lookups', ['tier', 'result'])
+
+WHITESPACE = re.compile(r'\s+')
+TRAILING_PUNCTUATION = re.compile(r'[\s.!?,;:]+$')
+# Prompts whose answer goes stale within minutes, cached for response_cache_time_sensitive_ttl only
+TIME_SENSITIVE = re.compile(
+    r"\b(time|date|day|today|tonight|tomorrow|yesterday|now|right now|currently|current|latest|"
+    r"weather|news|this (?:morning|afternoon|evening|week|month|year))\b")
+
+def normalize_message(message: str) -> str:
+    """Lowercase a prompt and drop differences in spacing and trailing punctuation"""
+    message = WHITESPACE.sub(' ', message.strip().lower())
+    return TRAILING_PUNCTUATION.sub('', message)
+
+def is_time_sensitive(message: str) -> bool:
+    """Whether a prompt asks about the time, the date or other things that change quickly"""
+    return TIME_SENSITIVE.search(normalize_message(message)) is not None
+
+def history_digest(history: List[Dict[str, str]], window: int) -> str:
+    """
+    Digest of the last messages of a conversation.
+
+    The system prompt is left out, the persona is part of the cache key instead.
+
+    Args:
+        history: Conversation history as role/content dictionaries
+        window: Number of most recent messages to include
+    """
+    messages = [entry for entry in history if entry.get('role') != 'system']
+    recent = messages[-window:] if window > 0 else []
+    encoded = json.dumps([(entry.get('role'), entry.get('content')) for entry in recent])
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, ttl_seconds: float = 3600,
+                 history_window: int = 4):
+        """
+        Initialize the response cache.
+
+        Args:
+            max_bytes: Upper bound on the size of the cached responses (least recently used are evicted)
+            ttl_seconds: Age after which a cached response is no longer served
+            history_window: Number of recent messages that must match for a hit
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.history_window = history_window
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (response, expires_at, size), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, workspace: str, persona: str, message: str,
+                 history: List[Dict[str, str]]) -> str:
+        """Cache key for a prompt sent after the given history"""
+        parts = [workspace or '', persona or '', normalize_message(message),
+                 history_digest(history, self.history_window)]
+        return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                cache_requests.inc(tier='exact', result='miss')
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            cache_requests.inc(tier='exact', result='hit')
+            return entry[0]
+
+    def put(self, key: str, response: str, ttl_seconds: float = None):
+        """
+        Store a response, evicting the least recently used ones to stay within max_bytes.
+
+        Args:
+            key: Key from make_key
+            response: Complete response
+            ttl_seconds: Lifetime of this entry (default: the cache's ttl_seconds)
+        """
+        size = len(key) + len(response.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, time.time() + ttl_seconds, size)
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for the API"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions
+            }
+
+    def _remove(self, key: str):
+        response, expires_at, size = self._entries.pop(key)
+        self.size_bytes -= size
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_shared_cache(config: Dict[str, Any]) -> Optional[ResponseCache]:
+    """
+    Process-wide cache used by every chat client, or None unless
+    response_cache is enabled in the configuration.
+    """
+    global _shared_cache
+    if not config.get('response_cache', False):
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(
+                max_bytes=config.get('response_cache_max_bytes', 8 * 1024 * 1024),
+                ttl_seconds=config.get('response_cache_ttl', 3600),
+                history_window=config.get('response_cache_history_window', 4)
+            )
+        return _shared_cache
@@ -0,0 +1,248 @@
+"""
+Similarity-based cache for LLM responses, so paraphrased prompts reuse an answer
+"""
+import hashlib
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import metrics
+from response_cache import cache_requests, history_digest, normalize_message
+
+lookup_latency = metrics.registry.histogram(
+    'remo_llm_cache_lookup_seconds', 'Time spent looking up a prompt in the response cache', ['tier'],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+
+CONTRACTIONS = {
+    "what's": "what is", "whats": "what is", "it's": "it is", "i'm": "i am",
+    "don't": "do not", "can't": "cannot", "won't": "will not", "there's": "there is",
+    "how's": "how is", "where's": "where is", "who's": "who is", "let's": "let us"
+}
+
+# Filler words that change between paraphrases without changing the request
+STOP_WORDS = frozenset([
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'of', 'to', 'for', 'please',
+    'can', 'could', 'would', 'will', 'you', 'do', 'does', 'hey', 'remo', 'what',
+    'tell', 'me', 'show'
+])
+
+NUMBER = re.compile(r'\d+(?:[.:]\d+)*')
+
+def content_words(text: str) -> List[str]:
+    """Normalized words of a prompt with contractions expanded and filler words removed"""
+    words = ' '.join(CONTRACTIONS.get(word, word) for word in normalize_message(text).split()).split()
+    return [word for word in words if word not in STOP_WORDS] or words
+
+class HashingVectorizer:
+    def __init__(self, dimensions: int = 4096, ngram_range: Tuple[int, int] = (2, 4)):
+        """
+        Embed text as L2-normalized hashed character n-gram and word counts.
+
+        No vocabulary is learned, so any text can be embedded without training
+        or network access.
+
+        Args:
+            dimensions: Width of the vectors
+            ngram_range: Smallest and largest character n-gram
+        """
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+
+    def features(self, text: str) -> List[str]:
+        """Character n-grams of the content words, plus the words themselves"""
+        words = content_words(text)
+        features = [f"w:{word}" for word in words]
+        padded = f" {' '.join(words)} "
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Returns:
+            float32 matrix with one unit-length row per text
+        """
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            # crc32 is stable across processes, unlike hash()
+            indices = [zlib.crc32(feature.encode('utf-8')) % self.dimensions
+                       for feature in self.features(text)]
+            if indices:
+                np.add.at(vectors[row], indices, 1.0)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.85, max_entries: int = 2000, ttl_seconds: float = 3600,
+                 history_window: int = 4, dimensions: int = 4096):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a cached prompt to count as a match
+            max_entries: Maximum number of cached prompts (least recently used are evicted)
+            ttl_seconds: Age after which a cached response is no longer served
+            history_window: Number of recent messages that must match for a hit
+            dimensions: Width of the prompt vectors
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.history_window = history_window
+        self.vectorizer = HashingVectorizer(dimensions)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lookup_time = 0.0
+        # Row i of the matrices belongs to entry i: [context, response, expires_at, last_used]
+        self._matrix = np.zeros((min(64, max_entries), dimensions), dtype=np.float32)
+        self._contexts = np.zeros(self._matrix.shape[0], dtype=np.int64)
+        self._expires = np.zeros(self._matrix.shape[0], dtype=np.float64)
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def context_key(self, workspace: str, persona: str, message: str,
+                    history: List[Dict[str, str]]) -> int:
+        """
+        Identifier of the conversation state a prompt is asked in.
+
+        Only prompts with the same context are compared. The numbers in the
+        prompt are part of it, since "5 minutes" and "10 minutes" are close
+        as text but need different answers.
+        """
+        numbers = ' '.join(NUMBER.findall(message))
+        parts = [workspace or '', persona or '', numbers, history_digest(history, self.history_window)]
+        digest = hashlib.sha1('\x1f'.join(parts).encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'little', signed=True)
+
+    def get(self, message: str, context: int) -> Optional[str]:
+        """Response cached for the most similar prompt in the same context, or None"""
+        return self.get_many([message], [context])[0]
+
+    def get_many(self, messages: Sequence[str], contexts: Sequence[int]) -> List[Optional[str]]:
+        """
+        Look up a batch of prompts with a single matrix product.
+
+        Args:
+            messages: Prompts to look up
+            contexts: Context key of each prompt
+
+        Returns:
+            Cached response or None for each prompt
+        """
+        start_time = time.perf_counter()
+        queries = self.vectorizer.transform(messages)
+        results = []
+        with self._lock:
+            count = len(self._entries)
+            if count:
+                scores = queries @ self._matrix[:count].T
+                # Rows cached for another context or expired never match
+                now = time.time()
+                usable = ((self._contexts[:count][None, :] == np.asarray(contexts, dtype=np.int64)[:, None])
+                          & (self._expires[:count] >= now)[None, :])
+                scores[~usable] = -1.0
+                best_rows = np.argmax(scores, axis=1)
+            for i in range(len(messages)):
+                if count and scores[i, best_rows[i]] >= self.threshold:
+                    entry = self._entries[best_rows[i]]
+                    entry[3] = time.time()
+                    results.append(entry[1])
+                    self.hits += 1
+                    cache_requests.inc(tier='semantic', result='hit')
+                else:
+                    results.append(None)
+                    self.misses += 1
+                    cache_requests.inc(tier='semantic', result='miss')
+            elapsed = time.perf_counter() - start_time
+            self.lookup_time += elapsed
+        lookup_latency.observe(elapsed, tier='semantic')
+        return results
+
+    def put(self, message: str, context: int, response: str, ttl_seconds: float = None):
+        """Cache a response for a prompt, for ttl_seconds (default: the cache's ttl_seconds)"""
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        vector = self.vectorizer.transform([message])[0]
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict_least_recently_used()
+            row = len(self._entries)
+            if row == self._matrix.shape[0]:
+                self._grow()
+            self._matrix[row] = vector
+            self._contexts[row] = context
+            now = time.time()
+            self._expires[row] = now + ttl_seconds
+            self._entries.append([context, response, now + ttl_seconds, now])
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._entries = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for the API"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "average_lookup_ms": 1000 * self.lookup_time / lookups if lookups else 0.0
+            }
+
+    def _grow(self):
+        capacity = min(self.max_entries, self._matrix.shape[0] * 2)
+        matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+        matrix[:self._matrix.shape[0]] = self._matrix
+        contexts = np.zeros(capacity, dtype=np.int64)
+        contexts[:self._contexts.shape[0]] = self._contexts
+        expires = np.zeros(capacity, dtype=np.float64)
+        expires[:self._expires.shape[0]] = self._expires
+        self._matrix, self._contexts, self._expires = matrix, contexts, expires
+
+    def _evict_least_recently_used(self):
+        # Move the last row into the evicted slot to keep the matrix dense
+        victim = min(range(len(self._entries)), key=lambda i: self._entries[i][3])
+        last = len(self._entries) - 1
+        self._matrix[victim] = self._matrix[last]
+        self._contexts[victim] = self._contexts[last]
+        self._expires[victim] = self._expires[last]
+        self._entries[victim] = self._entries[last]
+        self._entries.pop()
+        self.evictions += 1
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_shared_semantic_cache(config: Dict[str, Any]) -> Optional[SemanticCache]:
+    """
+    Process-wide semantic cache used by every chat client, or None unless
+    semantic_cache is enabled in the configuration.
+    """
+    global _shared_cache
+    if not config.get('semantic_cache', False):
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = SemanticCache(
+                threshold=config.get('semantic_cache_threshold', 0.85),
+                max_entries=config.get('semantic_cache_max_entries', 2000),
+                ttl_seconds=config.get('response_cache_ttl', 3600),
+                history_window=config.get('response_cache_history_window', 4)
+            )
+        return _shared_cache
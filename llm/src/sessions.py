@@ -0,0 +1,175 @@
+"""
+Per-session chat state for the unified API
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_SESSION_ID = 'default'
+
+class ChatSession:
+    def __init__(self, session_id: str, chat_client):
+        """A client session with its own chat client, history and persona"""
+        self.session_id = session_id
+        self.chat_client = chat_client
+        self.created_at = time.time()
+        self.last_used = self.created_at
+
+    def history_size(self) -> int:
+        """Approximate memory held by the session history, in characters"""
+        return sum(len(entry.get('content') or '') for entry in self.chat_client.conversation_history)
+
+    def history_tokens(self) -> int:
+        """Estimated size of the session history, in tokens"""
+        history = self.chat_client.conversation_history
+        return history.tokens if hasattr(history, 'tokens') else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary of the session for the API"""
+        return {
+            "session_id": self.session_id,
+            "persona": self.chat_client.get_current_persona(),
+            "messages": len(self.chat_client.conversation_history),
+            "history_chars": self.history_size(),
+            "history_tokens": self.history_tokens(),
+            "created_at": self.created_at,
+            "last_used": self.last_used
+        }
+
+class SessionRegistry:
+    def __init__(self, client_factory: Callable[[str], Any], max_sessions: int = 100,
+                 ttl_seconds: float = 3600, max_history_chars: int = 2000000):
+        """
+        Initialize the session registry.
+
+        Args:
+            client_factory: Callable taking a session id and returning a new NPUChatClient
+            max_sessions: Maximum number of live sessions (least recently used are evicted)
+            ttl_seconds: Idle time after which a session is evicted
+            max_history_chars: Cap on the combined history size of all sessions
+        """
+        self.client_factory = client_factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_history_chars = max_history_chars
+        self.evictions = 0
+        # Ordered from least to most recently used
+        self._sessions = OrderedDict()
+        # Never evicted or removed
+        self._pinned = set()
+        # Only guards the mapping; chat turns run outside of it
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str = DEFAULT_SESSION_ID) -> ChatSession:
+        """Get the session for an id, creating it if needed"""
+        with self._lock:
+            session = self._touch(session_id)
+            if session is not None:
+                return session
+
+        # Build the client outside the lock, it reads config and persona files
+        new_session = ChatSession(session_id, self.client_factory(session_id))
+
+        with self._lock:
+            session = self._touch(session_id)
+            if session is not None:
+                # Another request created it first
+                return session
+            self._sessions[session_id] = new_session
+            self._evict()
+        return new_session
+
+    def add(self, session_id: str, chat_client, pinned: bool = False) -> ChatSession:
+        """
+        Register an existing chat client under a session id.
+
+        Args:
+            session_id: Session id
+            chat_client: Chat client of the session
+            pinned: Keep the session for the life of the registry, for
+                    sessions other code holds on to, like the default one
+        """
+        session = ChatSession(session_id, chat_client)
+        with self._lock:
+            if pinned:
+                self._pinned.add(session_id)
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            self._evict()
+        return session
+
+    def remove(self, session_id: str) -> bool:
+        """Drop a session, pinned sessions are kept"""
+        with self._lock:
+            if session_id in self._pinned:
+                return False
+            return self._sessions.pop(session_id, None) is not None
+
+    def is_pinned(self, session_id: str) -> bool:
+        """Whether a session is kept for the life of the registry"""
+        return session_id in self._pinned
+
+    def enforce_limits(self):
+        """Evict expired sessions and enforce the size caps"""
+        with self._lock:
+            self._evict()
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """Summaries of all live sessions"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [session.to_dict() for session in sessions]
+
+    def stats(self) -> Dict[str, Any]:
+        """Registry statistics"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "active_sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "history_chars": sum(session.history_size() for session in sessions),
+            "max_history_chars": self.max_history_chars,
+            "evictions": self.evictions
+        }
+
+    def _touch(self, session_id: str) -> Optional[ChatSession]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.time()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def _evict(self):
+        # Expired sessions sit at the front since the order follows last use
+        cutoff = time.time() - self.ttl_seconds
+        oldest = self._oldest_evictable(keep_newest=False)
+        while oldest is not None and oldest.last_used < cutoff:
+            self._pop(oldest)
+            oldest = self._oldest_evictable(keep_newest=False)
+
+        # The caps never evict the most recently used session, it may be the one being returned
+        oldest = self._oldest_evictable()
+        while len(self._sessions) > self.max_sessions and oldest is not None:
+            self._pop(oldest)
+            oldest = self._oldest_evictable()
+
+        total_chars = sum(session.history_size() for session in self._sessions.values())
+        while total_chars > self.max_history_chars and oldest is not None:
+            total_chars -= self._pop(oldest).history_size()
+            oldest = self._oldest_evictable()
+
+    def _oldest_evictable(self, keep_newest: bool = True) -> Optional[ChatSession]:
+        sessions = list(self._sessions.values())
+        if keep_newest:
+            sessions = sessions[:-1]
+        for session in sessions:
+            if session.session_id not in self._pinned:
+                return session
+        return None
+
+    def _pop(self, session: ChatSession) -> ChatSession:
+        del self._sessions[session.session_id]
+        self.evictions += 1
+        return session
@@ -0,0 +1,148 @@
+"""
+Connect, first-token and chunk-idle deadlines for streamed generations
+"""
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+import metrics
+from endpoints import EndpointError
+from generation_stats import get_generation_stats
+from http_session import set_read_timeout
+
+stream_deadlines_missed = metrics.registry.counter(
+    'remo_llm_stream_deadlines_missed_total', 'Streamed generations stopped by a missed deadline', ['deadline'])
+
+CONNECT = 'connect'
+FIRST_TOKEN = 'first_token'
+CHUNK_IDLE = 'chunk_idle'
+
+MESSAGES = {
+    CONNECT: "Could not connect to AnythingLLM within {timeout:g} s",
+    FIRST_TOKEN: "No first token within {timeout:g} s",
+    CHUNK_IDLE: "No new text for {timeout:g} s"
+}
+
+class StreamDeadlineExceeded(EndpointError):
+    def __init__(self, deadline: str, timeout: float, partial_text: str = ''):
+        """
+        A streamed generation missed one of its deadlines.
+
+        Args:
+            deadline: "connect", "first_token" or "chunk_idle"
+            timeout: The deadline in seconds
+            partial_text: Text received before the stream was stopped
+        """
+        super().__init__(MESSAGES[deadline].format(timeout=timeout))
+        self.deadline = deadline
+        self.timeout = timeout
+        self.partial_text = partial_text
+
+class StreamDeadlines:
+    def __init__(self, connect_timeout: float = 5, first_token_timeout: float = 30, chunk_idle_timeout: float = 10):
+        """
+        Deadlines of one attempt at a streamed generation, started when the request is sent.
+
+        Args:
+            connect_timeout: Seconds to open the connection to AnythingLLM
+            first_token_timeout: Seconds from sending the request to the first text
+            chunk_idle_timeout: Seconds allowed between text chunks after the first
+        """
+        self.connect_timeout = connect_timeout
+        self.first_token_timeout = first_token_timeout
+        self.chunk_idle_timeout = chunk_idle_timeout
+        self.start_time = time.monotonic()
+        self.last_text_time = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'StreamDeadlines':
+        """
+        Deadlines from the configuration.
+
+        A model that sat idle longer than generation_cold_after (or has not
+        run in this process) may have to be loaded before it answers, so
+        its first token gets stream_timeout when that is longer.
+        """
+        first_token_timeout = config.get('first_token_timeout', 30)
+        stats = get_generation_stats(config)
+        if stats is not None:
+            idle = stats.idle_seconds(config['workspace_slug'])
+            if idle is None or idle > config.get('generation_cold_after', 300):
+                first_token_timeout = max(first_token_timeout, config.get('stream_timeout', 60))
+        return cls(config.get('connect_timeout', 5), first_token_timeout, config.get('chunk_idle_timeout', 10))
+
+    def request_timeout(self) -> Tuple[float, float]:
+        """(connect, read) timeout for requests, the read part bounding the wait for the response headers"""
+        return self.connect_timeout, self.first_token_timeout
+
+    def text_received(self):
+        """Note that text arrived, which restarts the chunk-idle deadline"""
+        self.last_text_time = time.monotonic()
+
+    def current(self) -> Tuple[str, float, float]:
+        """The deadline that applies now, as (name, timeout, seconds left)"""
+        if self.last_text_time is None:
+            return FIRST_TOKEN, self.first_token_timeout, self.start_time + self.first_token_timeout - time.monotonic()
+        return CHUNK_IDLE, self.chunk_idle_timeout, self.last_text_time + self.chunk_idle_timeout - time.monotonic()
+
+    def remaining(self) -> float:
+        """Seconds left before the current deadline"""
+        return self.current()[2]
+
+    def exceeded(self, deadline: str = None, partial_text: str = '') -> StreamDeadlineExceeded:
+        """Count a missed deadline (the current one by default) and build its error"""
+        if deadline == CONNECT:
+            timeout = self.connect_timeout
+        else:
+            deadline, timeout, _ = self.current()
+        stream_deadlines_missed.inc(deadline=deadline)
+        return StreamDeadlineExceeded(deadline, timeout, partial_text)
+
+class DeadlineStream:
+    def __init__(self, response: requests.Response, deadlines: StreamDeadlines):
+        """
+        Body chunks of a streamed response, each read with the time left
+        before the current deadline as the socket timeout.
+
+        A server that goes quiet is caught by the socket timeout, one that
+        keeps sending bytes without any text by the check before each read.
+
+        Args:
+            response: Streamed response from AnythingLLM
+            deadlines: Deadlines of the attempt that sent the request
+        """
+        self.response = response
+        self.deadlines = deadlines
+        self._chunks = response.iter_content(chunk_size=None)
+        self._buffered = []
+
+    def read_first(self) -> Optional[bytes]:
+        """Read the first chunk ahead of iteration, None for an empty body"""
+        for chunk in self._read():
+            self._buffered.append(chunk)
+            return chunk
+        return None
+
+    def __iter__(self) -> Iterator[bytes]:
+        while self._buffered:
+            yield self._buffered.pop(0)
+        yield from self._read()
+
+    def _read(self) -> Iterator[bytes]:
+        while True:
+            remaining = self.deadlines.remaining()
+            if remaining <= 0:
+                raise self.deadlines.exceeded()
+            set_read_timeout(self.response, remaining)
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                return
+            except requests.exceptions.ConnectionError as e:
+                # requests wraps read timeouts in the middle of a body in ConnectionError
+                if e.args and isinstance(e.args[0], ReadTimeoutError):
+                    raise self.deadlines.exceeded() from e
+                raise
+            yield chunk
@@ -0,0 +1,160 @@
+"""
+Incremental parser for AnythingLLM streaming responses (SSE or NDJSON)
+"""
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# A sentence ends at ., ! or ? (plus closing quotes/brackets) followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+')
+WORD_BOUNDARY = re.compile(r'\S+\s*')
+
+class StreamParser:
+    """
+    Turns raw response bytes into JSON events as they arrive.
+
+    Handles Server-Sent Events ("data: {...}" lines, with multi-line data
+    joined until the blank line ending the event) and newline-delimited
+    JSON. Lines are split on bytes, so a multi-byte character cut by a read
+    is never decoded early, and partial lines are kept until the rest
+    arrives. All events completed by one read are decoded with a single
+    json.loads call, which costs far less than one call per event.
+    """
+
+    def __init__(self):
+        self._buffer = b''
+        self._data_lines = []
+        self.bytes_parsed = 0
+        self.events_parsed = 0
+
+    def feed(self, data: bytes) -> List[Tuple[Dict[str, Any], bool]]:
+        """
+        Parse the next piece of the body.
+
+        Args:
+            data: Bytes as received, not necessarily ending on a line break
+
+        Returns:
+            List of (event, is_sse) for every complete event in the data so far
+        """
+        self.bytes_parsed += len(data)
+        if self._buffer:
+            data = self._buffer + data
+        lines = data.split(b'\n')
+        self._buffer = lines.pop()
+        payloads = []
+        kinds = []
+        data_lines = self._data_lines
+        # Hot loop, kept free of method calls since there is one event per token
+        for line in lines:
+            if line[-1:] == b'\r':
+                line = line[:-1]
+            if not line:
+                # Blank line ends an SSE event
+                if data_lines:
+                    payloads.append(data_lines[0] if len(data_lines) == 1 else b'\n'.join(data_lines))
+                    kinds.append(True)
+                    data_lines.clear()
+            elif line[:6] == b'data: ' and not data_lines:
+                # Single-line SSE event, the common case
+                data_lines.append(line[6:])
+            else:
+                self._parse_line(line, payloads, kinds)
+        return self._decode(payloads, kinds)
+
+    def close(self) -> List[Tuple[Dict[str, Any], bool]]:
+        """Parse whatever is left once the body has ended"""
+        payloads = []
+        kinds = []
+        if self._buffer:
+            self._parse_line(self._buffer, payloads, kinds)
+            self._buffer = b''
+        self._end_event(payloads, kinds)
+        return self._decode(payloads, kinds)
+
+    def _parse_line(self, line: bytes, payloads: List[bytes], kinds: List[bool]):
+        if line.endswith(b'\r'):
+            line = line[:-1]
+        if not line:
+            self._end_event(payloads, kinds)
+        elif line.startswith(b'data:'):
+            value = line[5:]
+            self._data_lines.append(value[1:] if value.startswith(b' ') else value)
+        elif line.startswith(b'{'):
+            # NDJSON, or a plain JSON body
+            self._end_event(payloads, kinds)
+            payloads.append(line)
+            kinds.append(False)
+        # SSE comments (":"), event/id/retry fields and anything else are ignored
+
+    def _end_event(self, payloads: List[bytes], kinds: List[bool]):
+        data_lines = self._data_lines
+        if data_lines:
+            payloads.append(data_lines[0] if len(data_lines) == 1 else b'\n'.join(data_lines))
+            kinds.append(True)
+            data_lines.clear()
+
+    def _decode(self, payloads: List[bytes], kinds: List[bool]) -> List[Tuple[Dict[str, Any], bool]]:
+        if not payloads:
+            return []
+        try:
+            decoded = json.loads((b'[' + b','.join(payloads) + b']').decode('utf-8'))
+            if len(decoded) != len(payloads):
+                raise ValueError("payload is not a single JSON value")
+        except ValueError:
+            # A malformed payload spoils the batch, decode one by one and skip it
+            decoded = []
+            for payload in payloads:
+                try:
+                    decoded.append(json.loads(payload.decode('utf-8')))
+                except ValueError:
+                    decoded.append(None)
+        events = [(event, is_sse) for event, is_sse in zip(decoded, kinds) if isinstance(event, dict)]
+        self.events_parsed += len(events)
+        return events
+
+def iter_events(chunks: Iterable[bytes]) -> Iterator[Tuple[Dict[str, Any], bool]]:
+    """Parse an iterable of body chunks, yielding (event, is_sse) as events complete"""
+    parser = StreamParser()
+    for data in chunks:
+        yield from parser.feed(data)
+    yield from parser.close()
+
+def event_text(event: Dict[str, Any]) -> Optional[str]:
+    """Text carried by a streaming event, from its "text" or "textResponse" field"""
+    text = event.get('text')
+    if text is None:
+        text = event.get('textResponse')
+    return text
+
+def pseudo_stream(text: str, granularity: str = 'word') -> Iterator[str]:
+    """
+    Split a complete response into chunks for consumers that expect a stream.
+
+    Args:
+        text: Complete response
+        granularity: "word", "sentence" or "none" (the whole text as one chunk)
+
+    Yields:
+        Chunks that join back into text
+    """
+    if granularity == 'none' or not text:
+        if text:
+            yield text
+        return
+
+    if granularity == 'sentence':
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(text):
+            yield text[start:match.end()]
+            start = match.end()
+        if start < len(text):
+            yield text[start:]
+        return
+
+    # Leading whitespace would otherwise be dropped by the word pattern
+    leading = len(text) - len(text.lstrip())
+    if leading:
+        yield text[:leading]
+    for match in WORD_BOUNDARY.finditer(text, leading):
+        yield match.group()
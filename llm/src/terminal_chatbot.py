@@ -4,6 +4,8 @@ Terminal-based chatbot interface for NPU-accelerated AnythingLLM
 import sys
 import os
 from chat_client import NPUChatClient
+from generation_stats import format_timing, get_generation_stats
+from stream_deadlines import StreamDeadlineExceeded
 
 def print_banner():
     """Print welcome banner"""
@@ -23,6 +25,7 @@ def print_help():
     print("  clear           - Clear conversation history")
     print("  help            - Show this help message")
     print("  history         - Show conversation history")
+    print("  stats           - Show response speed (time to first token, tokens/s)")
     print("\n💡 Tips:")
     print("  - The chatbot uses NPU acceleration for faster responses")
     print("  - Responses are streamed in real-time")
@@ -44,6 +47,26 @@ def show_history(chat_client):
         print(f"{i}. {role}: {content}")
     print("-" * 40)
 
+def show_stats(chat_client):
+    """Show rolling response speed percentiles"""
+    stats = get_generation_stats(chat_client.config)
+    summaries = stats.summary() if stats is not None else []
+    if not summaries:
+        print("No responses timed yet.")
+        return
+    
+    print("\n⏱️  Response Speed (p50 / p95):")
+    print("-" * 40)
+    for summary in summaries:
+        print(f"{summary['workspace']} / {summary['persona']} ({summary['count']} responses)")
+        for field, label, scale, unit in (("ttft_ms", "first token", 1000, "s"),
+                                          ("total_ms", "total", 1000, "s"),
+                                          ("tokens_per_second", "speed", 1, " tokens/s")):
+            p50, p95 = summary[field]['p50'], summary[field]['p95']
+            if p50 is not None:
+                print(f"  {label:<12} {p50 / scale:.2f}{unit} / {p95 / scale:.2f}{unit}")
+    print("-" * 40)
+
 def main():
     """Main chatbot loop"""
     print_banner()
@@ -78,6 +101,9 @@ def main():
             elif user_input.lower() == 'history':
                 show_history(chat_client)
                 continue
+            elif user_input.lower() == 'stats':
+                show_stats(chat_client)
+                continue
             elif not user_input:
                 continue
             
@@ -88,7 +114,10 @@ def main():
             if response_stream:
                 for chunk in response_stream:
                     print(chunk, end="", flush=True)
-                print("\n")  # New line after response
+                print()
+                if chat_client.last_timing:
+                    print(f"   ⏱️  {format_timing(chat_client.last_timing)}")
+                print()  # New line after response
             else:
                 print("Sorry, I couldn't process your message. Please try again.")
                 print()
@@ -96,6 +125,9 @@ def main():
         except KeyboardInterrupt:
             print("\n\n👋 Goodbye! Thanks for chatting!")
             break
+        except StreamDeadlineExceeded as e:
+            print(f"\n⚠️  {e}, the answer is incomplete.")
+            print()
         except Exception as e:
             print(f"\n❌ An error occurred: {e}")
             print("Please try again or type 'quit' to exit.")
@@ -0,0 +1,140 @@
+"""
+Bounded transcription queue with admission control
+"""
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+import metrics
+
+queue_depth = metrics.registry.gauge(
+    'remo_transcription_queue_depth', 'Transcriptions waiting for a worker')
+in_flight = metrics.registry.gauge(
+    'remo_transcription_in_flight', 'Transcriptions currently running')
+queue_wait = metrics.registry.histogram(
+    'remo_transcription_queue_wait_seconds', 'Time a transcription waited for a worker')
+rejected = metrics.registry.counter(
+    'remo_transcription_rejected_total', 'Transcriptions rejected because the queue was full')
+
+class TranscriptionQueueFull(Exception):
+    def __init__(self, retry_after: int):
+        """
+        Raised when a transcription cannot be queued.
+
+        Args:
+            retry_after: Suggested seconds before retrying
+        """
+        super().__init__(f"Transcription queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+class TranscriptionQueue:
+    def __init__(self, workers: int = 1, max_queue: int = 4):
+        """
+        Run transcriptions on a fixed set of worker threads.
+
+        Whisper inference is CPU bound, so running one per request thread only
+        makes every request slower. Work beyond the queue size is rejected
+        instead of piling up.
+
+        Args:
+            workers: Number of transcriptions that run at the same time
+            max_queue: Number of transcriptions allowed to wait for a worker
+        """
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        # Queue(0) would be unbounded, so admission is checked by hand
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        # Moving average of the run time, used for Retry-After
+        self._average_run_time = None
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"transcribe-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Queue a transcription.
+
+        A caller is admitted when a worker is idle or the queue has room.
+
+        Returns:
+            Future holding the result of fn
+
+        Raises:
+            TranscriptionQueueFull: If every worker is busy and the queue is full
+        """
+        with self._lock:
+            if self._waiting + self._running >= self.workers + self.max_queue:
+                rejected.inc()
+                raise TranscriptionQueueFull(self._retry_after())
+            self._waiting += 1
+            queue_depth.set(self._waiting)
+
+        future = Future()
+        self._queue.put((future, fn, args, kwargs, time.perf_counter()))
+        return future
+
+    def is_full(self) -> bool:
+        """Whether a new transcription would be rejected right now"""
+        with self._lock:
+            return self._waiting + self._running >= self.workers + self.max_queue
+
+    def retry_after(self) -> int:
+        """Suggested seconds before retrying a rejected transcription"""
+        with self._lock:
+            return self._retry_after()
+
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Queue a transcription and wait for its result"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load of the queue"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "waiting": self._waiting,
+                "running": self._running,
+                "average_run_time": self._average_run_time
+            }
+
+    def _retry_after(self) -> int:
+        # Time for the work ahead of a new caller to drain, at least a second
+        average = self._average_run_time or 1.0
+        backlog = self._waiting + self._running
+        return max(1, math.ceil(average * backlog / self.workers))
+
+    def _worker(self):
+        while True:
+            future, fn, args, kwargs, queued_at = self._queue.get()
+            started_at = time.perf_counter()
+            queue_wait.observe(started_at - queued_at)
+            with self._lock:
+                self._waiting -= 1
+                self._running += 1
+                queue_depth.set(self._waiting)
+                in_flight.set(self._running)
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+
+            run_time = time.perf_counter() - started_at
+            with self._lock:
+                self._running -= 1
+                in_flight.set(self._running)
+                if self._average_run_time is None:
+                    self._average_run_time = run_time
+                else:
+                    self._average_run_time = 0.8 * self._average_run_time + 0.2 * run_time
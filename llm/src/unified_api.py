@@ -3,22 +3,49 @@ Unified API server for LLM and Whisper integration
 """
 
 import os
+import io
 import sys
 import json
+import time
+import queue
+import threading
 import tempfile
 import logging
-from flask import Flask, request, jsonify, send_from_directory
+from flask import (Flask, Request, request, jsonify, send_from_directory, Response, stream_with_context, g,
+                   copy_current_request_context)
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import base64
 
+# WebSocket support for /voice-session is optional
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
 # Add paths for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'openai-whisper'))
 
 from chat_client import NPUChatClient
-from whisper_service import WhisperService
-from audio_utils import convert_audio_to_wav, convert_wav_to_base64
+from config_loader import load_config, DEFAULT_CONFIG_PATH
+from sessions import SessionRegistry, DEFAULT_SESSION_ID
+from readiness import ServiceState
+import metrics
+from voice_session import VoiceSession
+from transcription_queue import TranscriptionQueue, TranscriptionQueueFull
+from response_cache import get_shared_cache
+from semantic_cache import get_shared_semantic_cache
+from http_session import get_session, connection_stats
+from history_store import get_history_store
+from endpoints import get_endpoint_pool
+from batch import normalize_items, run_batch_ndjson
+from generation_stats import get_generation_stats
+from stream_deadlines import StreamDeadlineExceeded
+from warmup import ModelWarmer
+from whisper_service import WhisperService, SAMPLE_RATE
+from audio_utils import (convert_audio_to_wav, convert_wav_to_base64, needs_seekable_input,
+                         decode_raw_audio, raw_audio_params, SUPPORTED_RAW_FORMATS)
 
 # Import TTS functionality
 import sys
@@ -30,46 +57,274 @@ from persona_tts import PersonaTTSManager
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class InMemoryUploadRequest(Request):
+    """Request that keeps multipart uploads in memory instead of spooling them to disk."""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
+# Uploads are held in memory, so bound their size
+app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
 CORS(app)  # Enable CORS for frontend integration
+sock = Sock(app) if Sock is not None else None
+
+# Latency metrics exposed by /metrics
+request_count = metrics.registry.counter(
+    'remo_requests_total', 'Requests handled', ['endpoint', 'status'])
+request_latency = metrics.registry.histogram(
+    'remo_request_duration_seconds', 'Time until the response is returned', ['endpoint'])
+stage_latency = metrics.registry.histogram(
+    'remo_stage_duration_seconds', 'Time spent in each processing stage', ['stage', 'endpoint', 'persona'])
+audio_duration = metrics.registry.counter(
+    'remo_audio_duration_seconds_total', 'Seconds of audio transcribed', ['endpoint'])
 
 # Initialize services
 chat_client = None
+session_registry = None
+model_warmer = None
 whisper_service = None
+transcription_queue = None
 tts_manager = None
 
-def init_services():
-    """Initialize chat, whisper, and TTS services."""
-    global chat_client, whisper_service, tts_manager
+def sse_event(event, data):
+    """Format a single Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    """Wrap an event generator in a streaming text/event-stream response."""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+def wants_event_stream(data=None):
+    """Check whether the client asked for a Server-Sent Events response."""
+    if data:
+        value = data.get('sse')
+        if isinstance(value, str):
+            value = value.lower() == 'true'
+        if value:
+            return True
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+def save_upload(audio_file):
+    """Save an uploaded audio file to a temporary file and return its path."""
+    filename = secure_filename(audio_file.filename)
+    with stage_latency.time(stage='upload_save', endpoint=request.endpoint, persona=''):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{filename}") as temp_file:
+            audio_file.save(temp_file.name)
+            return temp_file.name
+
+def transcribe_file(audio_file_path):
+    """Decode and transcribe an audio file, recording per-stage latency."""
+    with stage_latency.time(stage='audio_decode', endpoint=request.endpoint, persona=''):
+        audio = whisper_service.load_audio_file(audio_file_path)
+    return transcribe_samples(audio)
+
+def transcribe_upload(audio_file):
+    """
+    Transcribe an uploaded audio file.
     
-    try:
-        # Initialize whisper service first (doesn't require external server)
-        whisper_service = WhisperService("base")
-        whisper_service.load_model()
-        logger.info("Whisper service initialized successfully")
-        
-        # Initialize TTS service
-        try:
-            tts_manager = PersonaTTSManager()
-            logger.info("TTS service initialized successfully")
-        except Exception as tts_error:
-            logger.warning(f"TTS service initialization failed: {tts_error}")
-            tts_manager = None
-        
-        # Try to initialize chat client (may fail if AnythingLLM is not running)
+    The upload is piped through ffmpeg and decoded in memory. Only containers
+    that ffmpeg cannot read from a pipe go through a temporary file.
+    """
+    if needs_seekable_input(audio_file.filename):
+        temp_file_path = save_upload(audio_file)
         try:
-            config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
-            chat_client = NPUChatClient(config_path)
-            logger.info("Chat client initialized successfully")
-        except Exception as chat_error:
-            logger.warning(f"Chat client initialization failed (AnythingLLM may not be running): {chat_error}")
-            chat_client = None
-        
-    except Exception as e:
-        logger.error(f"Failed to initialize services: {e}")
-        # Don't raise the exception, allow the server to start with limited functionality
-        whisper_service = None
-        tts_manager = None
+            return transcribe_file(temp_file_path)
+        finally:
+            # Clean up the temporary file
+            if os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
+    
+    with stage_latency.time(stage='audio_decode', endpoint=request.endpoint, persona=''):
+        audio = whisper_service.load_audio_stream(audio_file.stream)
+    return transcribe_samples(audio)
+
+def transcribe_samples(audio):
+    """Transcribe decoded 16 kHz samples, recording latency and audio duration."""
+    endpoint = request.endpoint
+    audio_duration.inc(len(audio) / SAMPLE_RATE, endpoint=endpoint)
+    return run_transcription(endpoint, whisper_service.transcribe_audio, audio)
+
+def run_transcription(endpoint, transcribe, *args):
+    """
+    Run a transcription on the shared transcription queue.
+    
+    Raises:
+        TranscriptionQueueFull: If the queue has no room
+    """
+    def timed_transcribe():
+        with stage_latency.time(stage='transcribe', endpoint=endpoint, persona=''):
+            return transcribe(*args)
+    
+    return transcription_queue.run(timed_transcribe)
+
+def queue_full_response(error):
+    """429 response asking the client to retry once the transcription queue drains."""
+    return jsonify({
+        "error": str(error),
+        "retry_after": error.retry_after
+    }), 429, {'Retry-After': str(error.retry_after)}
+
+def deadline_error(error):
+    """Details of a generation stopped by a missed deadline, with the text received before it."""
+    return {
+        "error": str(error),
+        "deadline": error.deadline,
+        "timeout": error.timeout,
+        "partial_response": error.partial_text
+    }
+
+def deadline_response(error):
+    """504 response for a generation that missed its connect, first-token or chunk-idle deadline."""
+    return jsonify(deadline_error(error)), 504
+
+def send_chat_message(session_client, message, stream=True, cancelled=None):
+    """
+    Send a message through a session's chat client, recording LLM latency.
+    
+    A streamed generation stops when the cancelled event is set, when
+    /chat/cancel is called for the session, or when the returned generator
+    is closed (Flask closes it once the HTTP client has gone away).
+    """
+    labels = {"endpoint": request.endpoint, "persona": session_client.get_current_persona()}
+    start_time = time.perf_counter()
+    if not stream:
+        response = session_client.send_message(message, False)
+        stage_latency.observe(time.perf_counter() - start_time, stage='llm_total', **labels)
+        return response
+    return timed_chunks(session_client.send_message(message, True, cancelled), start_time, labels)
+
+def timed_chunks(response_stream, start_time, labels):
+    """Pass a response stream through, recording time to first chunk and total time."""
+    first_chunk = True
+    try:
+        for chunk in response_stream or []:
+            if first_chunk:
+                stage_latency.observe(time.perf_counter() - start_time, stage='llm_first_token', **labels)
+                first_chunk = False
+            yield chunk
+    finally:
+        # Closing early reaches the chat client, which stops the upstream generation
+        if hasattr(response_stream, 'close'):
+            response_stream.close()
+    stage_latency.observe(time.perf_counter() - start_time, stage='llm_total', **labels)
+
+def speak_response(text, persona):
+    """Speak a response in the background, recording TTS latency."""
+    endpoint = request.endpoint
+    start_time = time.perf_counter()
+    
+    def on_spoken(success, spoken_text, persona_name):
+        stage_latency.observe(time.perf_counter() - start_time, stage='tts_synthesis',
+                              endpoint=endpoint, persona=persona or '')
+    
+    return tts_manager.speak_persona_response_async(text, persona, on_spoken)
+
+def get_session_id():
+    """Get the client-supplied session id for the current request."""
+    data = request.get_json(silent=True) or {}
+    return (request.headers.get('X-Session-ID')
+            or data.get('session_id')
+            or request.form.get('session_id')
+            or request.args.get('session_id')
+            or DEFAULT_SESSION_ID)
+
+def get_session_client():
+    """Get the chat client holding the current session's history and persona."""
+    return session_registry.get(get_session_id()).chat_client
+
+def init_whisper():
+    """Load the Whisper model and start the transcription workers."""
+    global whisper_service, transcription_queue
+    service = WhisperService("base")
+    service.load_model()
+    
+    if transcription_queue is None:
+        config = load_config()
+        transcription_queue = TranscriptionQueue(
+            workers=config.get('transcription_workers', 1),
+            max_queue=config.get('transcription_queue_size', 4)
+        )
+    whisper_service = service
+
+def init_tts():
+    """Detect eSpeak and set up persona voices."""
+    global tts_manager
+    tts_manager = PersonaTTSManager()
+
+def init_chat():
+    """Set up the chat client, check that AnythingLLM serves the workspace and warm the model up."""
+    global chat_client, session_registry, model_warmer
+    client = NPUChatClient(session_id=DEFAULT_SESSION_ID)
+    client.preflight()
+    
+    registry = SessionRegistry(
+        lambda session_id: NPUChatClient(session_id=session_id),
+        max_sessions=client.config.get('max_sessions', 100),
+        ttl_seconds=client.config.get('session_ttl', 3600),
+        max_history_chars=client.config.get('session_max_history_chars', 2000000)
+    )
+    # Pinned: chat_client, the warmer and persona.yaml saves rely on this client
+    registry.add(DEFAULT_SESSION_ID, client, pinned=True)
+    session_registry = registry
+    chat_client = client
+    
+    if model_warmer is None:
+        model_warmer = ModelWarmer(client)
+        model_warmer.start()
+
+# Each service initializes on its own thread and retries with backoff when it fails
+service_states = {
+    "whisper": ServiceState("whisper", init_whisper),
+    "tts": ServiceState("tts", init_tts, required=False),
+    "chat": ServiceState("chat", init_chat)
+}
+
+# How long a request waits for a service that is still initializing
+SERVICE_WAIT_TIMEOUT = 30
+
+def init_services():
+    """Start initializing chat, whisper, and TTS services in parallel in the background."""
+    for state in service_states.values():
+        state.start()
+
+def ensure_service(name):
+    """
+    Make sure a service is ready before handling a request.
+    
+    Waits for an initialization that is already running and retries a failed
+    service once its backoff delay has passed, without blocking on the retry
+    of a service that keeps failing.
+    """
+    state = service_states[name]
+    if state.state == ServiceState.FAILED:
+        return state.ensure()
+    return state.ensure(SERVICE_WAIT_TIMEOUT)
+
+@app.before_request
+def start_request_timer():
+    g.request_start_time = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or 'unknown'
+    request_count.inc(endpoint=endpoint, status=response.status_code)
+    if 'request_start_time' in g:
+        request_latency.observe(time.perf_counter() - g.request_start_time, endpoint=endpoint)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metrics in the Prometheus text exposition format."""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -80,17 +335,28 @@ def health_check():
             "chat": chat_client is not None,
             "whisper": whisper_service is not None,
             "tts": tts_manager is not None
-        }
+        },
+        "transcription_queue": transcription_queue.stats() if transcription_queue is not None else None,
+        "http_connections": connection_stats(),
+        "llm_endpoints": get_endpoint_pool(chat_client.config).stats() if chat_client is not None else None,
+        "warmup": model_warmer.stats() if model_warmer is not None else None
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint reporting the initialization state of each service."""
+    ready = all(state.state == ServiceState.READY
+                for state in service_states.values() if state.required)
+    return jsonify({
+        "ready": ready,
+        "services": {name: state.to_dict() for name, state in service_states.items()}
+    }), 200 if ready else 503
+
 @app.route('/config', methods=['GET'])
 def get_config():
     """Get configuration including API keys."""
     try:
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
-        import yaml
-        with open(config_path, 'r') as file:
-            config = yaml.safe_load(file)
+        config = load_config()
         
         # Return only safe config values (no sensitive data)
         return jsonify({
@@ -114,6 +380,10 @@ def chat():
     Expected JSON data:
     - message: Text message to send
     - stream: Whether to stream the response (optional, default: true)
+    - sse: Return chunks as Server-Sent Events while they are generated
+      (optional, also enabled by "Accept: text/event-stream")
+    - session_id: Conversation to use (optional, also read from the
+      X-Session-ID header, default: "default")
     """
     try:
         data = request.get_json()
@@ -124,54 +394,216 @@ def chat():
         stream = data.get('stream', True)
         
         if chat_client is None:
-            init_services()
+            ensure_service('chat')
         
         if chat_client is None:
             return jsonify({"error": "Chat service not available. Please ensure AnythingLLM is running."}), 503
         
+        session_client = get_session_client()
+        
+        if stream and wants_event_stream(data):
+            # Forward chunks to the client as they arrive
+            return sse_response(stream_chat_events(session_client, message))
+        
         if stream:
             # Stream the response
+            cancelled = threading.Event()
             response_chunks = []
-            for chunk in chat_client.send_message(message, True):
+            for chunk in send_chat_message(session_client, message, cancelled=cancelled):
                 response_chunks.append(chunk)
             
             full_response = ''.join(response_chunks)
             
+            if cancelled.is_set():
+                return jsonify({
+                    "success": False,
+                    "cancelled": True,
+                    "message": full_response,
+                    "streamed": True,
+                    "timing": session_client.last_timing
+                })
+            
             # Speak the response if TTS is available
             if tts_manager is not None:
                 try:
-                    current_persona = chat_client.get_current_persona() if chat_client else "remo"
-                    tts_manager.speak_persona_response_async(full_response, current_persona)
+                    current_persona = session_client.get_current_persona()
+                    speak_response(full_response, current_persona)
                 except Exception as tts_error:
                     logger.warning(f"TTS error: {tts_error}")
             
             return jsonify({
                 "success": True,
                 "message": full_response,
-                "streamed": True
+                "streamed": True,
+                "timing": session_client.last_timing
             })
         else:
             # Get complete response
-            response = chat_client.send_message(message, False)
+            response = send_chat_message(session_client, message, stream=False)
             
             # Speak the response if TTS is available
             if tts_manager is not None:
                 try:
-                    current_persona = chat_client.get_current_persona() if chat_client else "remo"
-                    tts_manager.speak_persona_response_async(response, current_persona)
+                    current_persona = session_client.get_current_persona()
+                    speak_response(response, current_persona)
                 except Exception as tts_error:
                     logger.warning(f"TTS error: {tts_error}")
             
             return jsonify({
                 "success": True,
                 "message": response,
-                "streamed": False
+                "streamed": False,
+                "timing": session_client.last_timing
             })
     
+    except StreamDeadlineExceeded as e:
+        return deadline_response(e)
+    
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/chat/cancel', methods=['POST'])
+def chat_cancel():
+    """
+    Stop the generations running for a session (barge-in).
+    
+    The upstream request to AnythingLLM is closed so the NPU is free for
+    the next turn. The partial answer stays in the history, marked as
+    interrupted, and the /chat request that was streaming it returns
+    with "cancelled": true.
+    
+    Expected JSON data:
+    - session_id: Conversation to cancel (optional, also read from the
+      X-Session-ID header, default: "default")
+    """
+    try:
+        if session_registry is None:
+            return jsonify({"success": True, "cancelled": 0})
+        
+        cancelled = get_session_client().cancel()
+        return jsonify({"success": True, "cancelled": cancelled})
+    
+    except Exception as e:
+        logger.error(f"Error cancelling chat: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Run many independent prompts, streaming results as NDJSON.
+    
+    Each prompt gets its own conversation and does not touch any session's
+    history. One "result" line is written per prompt as it finishes (in
+    completion order, with its index), then a "summary" line with
+    throughput and latency percentiles.
+    
+    Expected JSON data:
+    - prompts: List of strings or {"id": ..., "message": ...} objects
+    - concurrency: Prompts in flight (optional, default: 4, capped by
+      batch_max_concurrency)
+    - persona: Persona to answer with (optional)
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        prompts = data.get('prompts')
+        if not isinstance(prompts, list) or not prompts:
+            return jsonify({"error": "No prompts provided"}), 400
+        
+        config = load_config()
+        max_items = config.get('batch_max_items', 1000)
+        if len(prompts) > max_items:
+            return jsonify({"error": f"Too many prompts ({len(prompts)}), the limit is {max_items}"}), 413
+        
+        try:
+            normalize_items(prompts)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if chat_client is None:
+            ensure_service('chat')
+        
+        if chat_client is None:
+            return jsonify({"error": "Chat service not available. Please ensure AnythingLLM is running."}), 503
+        
+        concurrency = max(1, min(int(data.get('concurrency', 4)), config.get('batch_max_concurrency', 8)))
+        return Response(
+            stream_with_context(run_batch_ndjson(prompts, concurrency, data.get('persona'))),
+            mimetype='application/x-ndjson',
+            headers={'X-Accel-Buffering': 'no'}
+        )
+    
+    except Exception as e:
+        logger.error(f"Error in batch chat endpoint: {e}")
+        return jsonify({"error": str(e)}), 500
+
+def stream_chat_events(session_client, message):
+    """
+    Generate SSE events for a streamed chat turn.
+    
+    Emits a "token" event per chunk and a final "done" event carrying the
+    full text and timing stats, a "cancelled" event with the partial text
+    after /chat/cancel, or an "error" event if nothing came back (with the
+    partial text when the generation missed a deadline).
+    """
+    start_time = time.perf_counter()
+    first_chunk_time = None
+    response_chunks = []
+    cancelled = threading.Event()
+    response_stream = None
+    
+    try:
+        response_stream = send_chat_message(session_client, message, cancelled=cancelled)
+        for chunk in response_stream:
+            if first_chunk_time is None:
+                first_chunk_time = time.perf_counter()
+            response_chunks.append(chunk)
+            yield sse_event('token', {"text": chunk})
+    except StreamDeadlineExceeded as e:
+        logger.warning(f"Chat response stopped: {e}")
+        yield sse_event('error', {**deadline_error(e), "timing": session_client.last_timing})
+        return
+    except Exception as e:
+        logger.error(f"Error streaming chat response: {e}")
+        yield sse_event('error', {"error": str(e)})
+        return
+    finally:
+        # Runs on client disconnect too, stopping the generation upstream
+        if response_stream is not None:
+            response_stream.close()
+    
+    full_response = ''.join(response_chunks)
+    total_time = time.perf_counter() - start_time
+    
+    if cancelled.is_set():
+        yield sse_event('cancelled', {"partial_response": full_response, "timing": session_client.last_timing})
+        return
+    
+    if not response_chunks:
+        yield sse_event('error', {"error": "No response from chat service"})
+        return
+    
+    # Speak the response if TTS is available
+    if tts_manager is not None:
+        try:
+            current_persona = session_client.get_current_persona()
+            speak_response(full_response, current_persona)
+        except Exception as tts_error:
+            logger.warning(f"TTS error: {tts_error}")
+    
+    yield sse_event('done', {
+        "success": True,
+        "message": full_response,
+        "streamed": True,
+        "stats": {
+            "time_to_first_token": first_chunk_time - start_time,
+            "total_time": total_time,
+            "chunks": len(response_chunks),
+            "characters": len(full_response)
+        },
+        "timing": session_client.last_timing
+    })
+
 @app.route('/transcribe', methods=['POST'])
 def transcribe():
     """
@@ -189,28 +621,24 @@ def transcribe():
             return jsonify({"error": "No audio file selected"}), 400
         
         if whisper_service is None:
-            init_services()
+            ensure_service('whisper')
+        
+        if whisper_service is None:
+            return jsonify({"error": "Whisper service not available."}), 503
         
-        # Save the uploaded file temporarily
         filename = secure_filename(audio_file.filename)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{filename}") as temp_file:
-            audio_file.save(temp_file.name)
-            temp_file_path = temp_file.name
         
-        try:
-            # Transcribe the audio
-            transcribed_text = whisper_service.transcribe_audio_file(temp_file_path)
-            
-            return jsonify({
-                "success": True,
-                "text": transcribed_text,
-                "filename": filename
-            })
+        # Transcribe the audio, decoding the upload in memory
+        transcribed_text = transcribe_upload(audio_file)
         
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+        return jsonify({
+            "success": True,
+            "text": transcribed_text,
+            "filename": filename
+        })
+    
+    except TranscriptionQueueFull as e:
+        return queue_full_response(e)
     
     except Exception as e:
         logger.error(f"Error in transcribe endpoint: {e}")
@@ -221,32 +649,70 @@ def transcribe_data():
     """
     Transcribe raw audio data to text.
     
-    Expected JSON data:
-    - audio_data: Base64 encoded audio data
+    Expected body, either:
+    - Binary audio (Content-Type: application/octet-stream or audio/wav).
+      Raw PCM is described by the X-Audio-Format (default: pcm_s16le),
+      X-Sample-Rate (default: 16000) and X-Channels (default: 1) headers.
+    - JSON with audio_data: Base64 encoded audio data (legacy)
     """
     try:
-        data = request.get_json()
-        if not data or 'audio_data' not in data:
-            return jsonify({"error": "No audio data provided"}), 400
+        if request.mimetype == 'application/json':
+            data = request.get_json()
+            if not data or 'audio_data' not in data:
+                return jsonify({"error": "No audio data provided"}), 400
+        else:
+            try:
+                audio_format, sample_rate, channels = raw_audio_params(request.mimetype, request.headers)
+            except ValueError as e:
+                return jsonify({"error": str(e), "supported_formats": SUPPORTED_RAW_FORMATS}), 415
+            data = None
         
         if whisper_service is None:
-            init_services()
+            ensure_service('whisper')
         
-        # Decode base64 audio data
-        audio_data = base64.b64decode(data['audio_data'])
+        if whisper_service is None:
+            return jsonify({"error": "Whisper service not available."}), 503
         
-        # Transcribe the audio
-        transcribed_text = whisper_service.transcribe_audio_data(audio_data)
+        if data is not None:
+            # Decode base64 audio data
+            audio_data = base64.b64decode(data['audio_data'])
+            
+            # Transcribe the audio
+            transcribed_text = run_transcription(request.endpoint, whisper_service.transcribe_audio_data, audio_data)
+        else:
+            audio_data = request.get_data(cache=False)
+            if not audio_data:
+                return jsonify({"error": "No audio data provided"}), 400
+            
+            with stage_latency.time(stage='audio_decode', endpoint=request.endpoint, persona=''):
+                try:
+                    audio = decode_raw_audio(audio_data, audio_format, sample_rate, channels, SAMPLE_RATE)
+                except ValueError as e:
+                    return jsonify({"error": str(e), "supported_formats": SUPPORTED_RAW_FORMATS}), 400
+            
+            transcribed_text = transcribe_samples(audio)
         
         return jsonify({
             "success": True,
             "text": transcribed_text
         })
     
+    except TranscriptionQueueFull as e:
+        return queue_full_response(e)
+    
     except Exception as e:
         logger.error(f"Error in transcribe-data endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/transcribe-data/formats', methods=['GET'])
+def transcribe_data_formats():
+    """List the binary audio formats accepted by /transcribe-data."""
+    return jsonify({
+        "formats": SUPPORTED_RAW_FORMATS,
+        "sample_rate": SAMPLE_RATE,
+        "headers": ["X-Audio-Format", "X-Sample-Rate", "X-Channels"]
+    })
+
 @app.route('/speak-and-chat', methods=['POST'])
 def speak_and_chat():
     """
@@ -255,6 +721,8 @@ def speak_and_chat():
     Expected form data:
     - audio: Audio file
     - stream: Whether to stream LLM response (optional, default: true)
+    - sse: Pipeline the turn and stream events while it runs, until the
+      answer has been spoken (optional, also enabled by "Accept: text/event-stream")
     """
     try:
         if 'audio' not in request.files:
@@ -266,8 +734,11 @@ def speak_and_chat():
         
         stream = request.form.get('stream', 'true').lower() == 'true'
         
-        if chat_client is None or whisper_service is None:
-            init_services()
+        if chat_client is None:
+            ensure_service('chat')
+        
+        if whisper_service is None:
+            ensure_service('whisper')
         
         if chat_client is None:
             return jsonify({"error": "Chat service not available. Please ensure AnythingLLM is running."}), 503
@@ -275,78 +746,361 @@ def speak_and_chat():
         if whisper_service is None:
             return jsonify({"error": "Whisper service not available."}), 503
         
-        # Save the uploaded file temporarily
-        filename = secure_filename(audio_file.filename)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{filename}") as temp_file:
-            audio_file.save(temp_file.name)
-            temp_file_path = temp_file.name
+        session_client = get_session_client()
         
-        try:
-            # Step 1: Transcribe audio
-            transcribed_text = whisper_service.transcribe_audio_file(temp_file_path)
+        if stream and wants_event_stream(request.form):
+            # Reject before the stream starts so the client still gets a 429
+            if transcription_queue.is_full():
+                raise TranscriptionQueueFull(transcription_queue.retry_after())
+            return sse_response(stream_voice_turn_events(session_client, audio_file))
+        
+        # Step 1: Transcribe audio
+        transcribed_text = transcribe_upload(audio_file)
+        
+        if not transcribed_text.strip():
+            return jsonify({"error": "No speech detected in audio"}), 400
+        
+        # Step 2: Send to LLM
+        if stream:
+            # Stream the response
+            response_chunks = []
+            for chunk in send_chat_message(session_client, transcribed_text):
+                response_chunks.append(chunk)
             
-            if not transcribed_text.strip():
-                return jsonify({"error": "No speech detected in audio"}), 400
+            full_response = ''.join(response_chunks)
             
-            # Step 2: Send to LLM
-            if stream:
-                # Stream the response
-                response_chunks = []
-                for chunk in chat_client.send_message(transcribed_text, True):
-                    response_chunks.append(chunk)
-                
-                full_response = ''.join(response_chunks)
-                
-                # Step 3: Speak the response if TTS is available
-                if tts_manager is not None:
-                    try:
-                        current_persona = chat_client.get_current_persona() if chat_client else "remo"
-                        tts_manager.speak_persona_response_async(full_response, current_persona)
-                    except Exception as tts_error:
-                        logger.warning(f"TTS error in speak-and-chat: {tts_error}")
-                
-                return jsonify({
-                    "success": True,
-                    "transcribed_text": transcribed_text,
-                    "llm_response": full_response,
-                    "streamed": True
-                })
-            else:
-                # Get complete response
-                llm_response = chat_client.send_message(transcribed_text, False)
-                
-                # Step 3: Speak the response if TTS is available
-                if tts_manager is not None:
-                    try:
-                        current_persona = chat_client.get_current_persona() if chat_client else "remo"
-                        tts_manager.speak_persona_response_async(llm_response, current_persona)
-                    except Exception as tts_error:
-                        logger.warning(f"TTS error in speak-and-chat: {tts_error}")
-                
-                return jsonify({
-                    "success": True,
-                    "transcribed_text": transcribed_text,
-                    "llm_response": llm_response,
-                    "streamed": False
-                })
-        
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+            # Step 3: Speak the response if TTS is available
+            if tts_manager is not None:
+                try:
+                    current_persona = session_client.get_current_persona()
+                    speak_response(full_response, current_persona)
+                except Exception as tts_error:
+                    logger.warning(f"TTS error in speak-and-chat: {tts_error}")
+            
+            return jsonify({
+                "success": True,
+                "transcribed_text": transcribed_text,
+                "llm_response": full_response,
+                "streamed": True
+            })
+        else:
+            # Get complete response
+            llm_response = send_chat_message(session_client, transcribed_text, stream=False)
+            
+            # Step 3: Speak the response if TTS is available
+            if tts_manager is not None:
+                try:
+                    current_persona = session_client.get_current_persona()
+                    speak_response(llm_response, current_persona)
+                except Exception as tts_error:
+                    logger.warning(f"TTS error in speak-and-chat: {tts_error}")
+            
+            return jsonify({
+                "success": True,
+                "transcribed_text": transcribed_text,
+                "llm_response": llm_response,
+                "streamed": False
+            })
+    
+    except TranscriptionQueueFull as e:
+        return queue_full_response(e)
+    
+    except StreamDeadlineExceeded as e:
+        return deadline_response(e)
     
     except Exception as e:
         logger.error(f"Error in speak-and-chat endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
+def stream_voice_turn_events(session_client, audio_file):
+    """Generate SSE events for a pipelined voice turn from an uploaded file."""
+    events = voice_turn_events(session_client, lambda: transcribe_upload(audio_file), wait_for_speech=True)
+    try:
+        for event, data in events:
+            yield sse_event(event, data)
+    finally:
+        # Runs the turn's cleanup now when the client disconnects
+        events.close()
+
+def voice_turn_events(session_client, transcribe, speak=True, cancelled=None, wait_for_speech=False,
+                      on_sentence_queue=None):
+    """
+    Run a pipelined voice turn, yielding (event, data) pairs.
+    
+    Transcription, LLM generation and TTS overlap: every sentence is handed
+    to TTS as soon as the LLM completes it. Emits "transcript", "token",
+    "audio_start", "audio_end" and a final "done" event (or "error", or
+    "cancelled" once the cancelled event is set).
+    
+    Sentences are usually still being spoken at "done", so its
+    sentences_queued stat counts sentences handed to TTS, and without
+    wait_for_speech the later "audio_start"/"audio_end" events are not
+    sent. If the turn stops early (cancelled, failed, or closed by a
+    client that went away), its queued speech is cancelled.
+    
+    Args:
+        session_client: Chat client of the session
+        transcribe: Callable returning the transcribed text
+        speak: Whether to speak the response
+        cancelled: Optional threading.Event that stops the turn
+        wait_for_speech: Keep yielding "audio_start"/"audio_end" events after
+            "done" until the last sentence has been spoken
+        on_sentence_queue: Optional callback called with the turn's
+            SentenceSpeechQueue, so it can be cancelled from another thread
+    """
+    start_time = time.perf_counter()
+    endpoint = request.endpoint
+    current_persona = session_client.get_current_persona()
+    speech_events = queue.Queue()
+    sentence_queue = None
+    response_stream = None
+    finished = False
+    
+    def on_sentence_start(index, sentence):
+        speech_events.put(('audio_start', {
+            "index": index,
+            "sentence": sentence,
+            "elapsed": time.perf_counter() - start_time
+        }))
+    
+    def on_sentence_end(index, sentence, queue_wait, speak_time):
+        stage_latency.observe(queue_wait, stage='tts_queue_wait', endpoint=endpoint, persona=current_persona)
+        stage_latency.observe(speak_time, stage='tts_synthesis', endpoint=endpoint, persona=current_persona)
+        speech_events.put(('audio_end', {
+            "index": index,
+            "elapsed": time.perf_counter() - start_time
+        }))
+    
+    def drain_speech_events():
+        while True:
+            try:
+                yield speech_events.get_nowait()
+            except queue.Empty:
+                return
+    
+    def is_cancelled():
+        return cancelled is not None and cancelled.is_set()
+    
+    try:
+        # Step 1: Transcribe audio
+        transcribed_text = transcribe()
+        transcribe_time = time.perf_counter() - start_time
+        
+        if not transcribed_text.strip():
+            yield 'error', {"error": "No speech detected in audio"}
+            return
+        
+        yield 'transcript', {"text": transcribed_text, "elapsed": transcribe_time}
+        
+        # Step 2: Stream the LLM answer, speaking each sentence as it completes
+        if speak and tts_manager is not None and tts_manager.enabled:
+            sentence_queue = tts_manager.create_sentence_queue(
+                current_persona, on_sentence_start, on_sentence_end)
+            if on_sentence_queue is not None:
+                on_sentence_queue(sentence_queue)
+        
+        first_chunk_time = None
+        response_chunks = []
+        response_stream = send_chat_message(session_client, transcribed_text, cancelled=cancelled)
+        for chunk in response_stream:
+            if is_cancelled():
+                break
+            if first_chunk_time is None:
+                first_chunk_time = time.perf_counter() - start_time
+            response_chunks.append(chunk)
+            yield 'token', {"text": chunk}
+            if sentence_queue is not None:
+                sentence_queue.feed(chunk)
+            yield from drain_speech_events()
+        
+        full_response = ''.join(response_chunks)
+        
+        if is_cancelled():
+            yield 'cancelled', {"transcribed_text": transcribed_text, "partial_response": full_response}
+            return
+        
+        if sentence_queue is not None:
+            sentence_queue.close()
+        yield from drain_speech_events()
+        
+        yield 'done', {
+            "success": True,
+            "transcribed_text": transcribed_text,
+            "llm_response": full_response,
+            "streamed": True,
+            "stats": {
+                "transcribe_time": transcribe_time,
+                "time_to_first_token": first_chunk_time,
+                "total_time": time.perf_counter() - start_time,
+                "sentences_queued": sentence_queue.sentences_queued if sentence_queue else 0
+            }
+        }
+        
+        if wait_for_speech and sentence_queue is not None:
+            while not sentence_queue.is_finished() or not speech_events.empty():
+                if is_cancelled():
+                    yield 'cancelled', {"transcribed_text": transcribed_text, "partial_response": full_response}
+                    return
+                try:
+                    yield speech_events.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+        finished = True
+    
+    except TranscriptionQueueFull as e:
+        yield 'error', {"error": str(e), "retry_after": e.retry_after}
+    
+    except StreamDeadlineExceeded as e:
+        logger.warning(f"Voice turn response stopped: {e}")
+        yield 'error', {**deadline_error(e), "transcribed_text": transcribed_text}
+    
+    except Exception as e:
+        logger.error(f"Error in pipelined voice turn: {e}")
+        yield 'error', {"error": str(e)}
+    
+    finally:
+        if response_stream is not None:
+            response_stream.close()
+        if sentence_queue is not None and not finished:
+            sentence_queue.cancel()
+
+def voice_session(ws):
+    """
+    Full-duplex voice session over a WebSocket.
+    
+    Client messages:
+    - Binary frames: 16-bit little-endian PCM audio
+    - {"type": "start", ...}: Configure the connection (session_id,
+      sample_rate, channels, tts, auto_commit, silence_seconds,
+      silence_threshold, partial_interval)
+    - {"type": "commit"}: End of utterance, run the voice turn
+    - {"type": "text", "text": ...}: Run a turn with typed text instead
+    - {"type": "cancel"}: Drop buffered audio and stop the running turn
+    - {"type": "ping"}
+    
+    Server events are JSON objects with a "type" of "ready",
+    "partial_transcript", "transcript", "token", "audio_start",
+    "audio_end", "done", "cancelled", "error" or "pong".
+    """
+    if whisper_service is None:
+        ensure_service('whisper')
+    
+    if chat_client is None:
+        ensure_service('chat')
+    
+    config = load_config()
+    session = VoiceSession(
+        ws,
+        get_session_id(),
+        partial_interval=config.get('voice_partial_interval', 1.0),
+        max_utterance_seconds=config.get('voice_max_utterance_seconds', 30.0)
+    )
+    
+    if chat_client is None or whisper_service is None:
+        session.send('error', {"error": "Chat or Whisper service not available."})
+        return
+    
+    def run_partial(audio):
+        try:
+            text = transcribe_samples(audio)
+            session.send('partial_transcript', {"text": text, "audio_seconds": len(audio) / SAMPLE_RATE})
+        except TranscriptionQueueFull:
+            # Partials are best effort, skip this one while the server is busy
+            pass
+        except Exception as e:
+            logger.warning(f"Partial transcription failed: {e}")
+    
+    def run_turn(transcribe):
+        session_client = session_registry.get(session.session_id).chat_client
+        
+        def track_speech(sentence_queue):
+            session.sentence_queue = sentence_queue
+        
+        events = voice_turn_events(session_client, transcribe, session.tts,
+                                   session.cancelled, wait_for_speech=True,
+                                   on_sentence_queue=track_speech)
+        for event, data in events:
+            if not session.send(event, data):
+                session.cancelled.set()
+    
+    def start_turn(transcribe):
+        if session.turn_running():
+            session.send('error', {"error": "A turn is already running, send cancel first"})
+            return
+        session.start_turn(copy_current_request_context(lambda: run_turn(transcribe)))
+    
+    def commit():
+        if not session.audio_buffer:
+            session.send('error', {"error": "No audio buffered"})
+            return
+        if session.turn_running():
+            session.send('error', {"error": "A turn is already running, send cancel first"})
+            return
+        audio = session.take_audio(SAMPLE_RATE)
+        start_turn(lambda: transcribe_samples(audio))
+    
+    session.send('ready', session.to_dict())
+    
+    try:
+        while not session.closed:
+            message = ws.receive()
+            
+            if isinstance(message, (bytes, bytearray)):
+                if session.append_audio(message):
+                    commit()
+                elif session.partial_due():
+                    audio = session.snapshot_audio(SAMPLE_RATE)
+                    session.start_partial(copy_current_request_context(lambda: run_partial(audio)))
+                continue
+            
+            try:
+                data = json.loads(message)
+                message_type = data.get('type')
+            except (TypeError, ValueError, AttributeError):
+                session.send('error', {"error": "Messages must be binary audio or JSON objects"})
+                continue
+            
+            if message_type == 'start':
+                try:
+                    session.configure(data)
+                    session.reset_audio()
+                except (TypeError, ValueError) as e:
+                    session.send('error', {"error": str(e)})
+                    continue
+                session.send('ready', session.to_dict())
+            elif message_type == 'commit':
+                commit()
+            elif message_type == 'text':
+                text = data.get('text', '')
+                start_turn(lambda: text)
+            elif message_type == 'cancel':
+                session.reset_audio()
+                # Only this session's speech stops, the TTS manager is shared
+                session.cancel_turn()
+                # Stop the generation upstream instead of waiting for its next chunk
+                session_registry.get(session.session_id).chat_client.cancel()
+            elif message_type == 'ping':
+                session.send('pong', {"turns": session.turns, "buffered_seconds": session.buffered_seconds})
+            else:
+                session.send('error', {"error": f"Unknown message type: {message_type}"})
+    
+    finally:
+        session.close()
+
+if sock is not None:
+    sock.route('/voice-session')(voice_session)
+
 @app.route('/clear-history', methods=['POST'])
 def clear_history():
     """Clear conversation history."""
     try:
         if chat_client is None:
-            init_services()
+            ensure_service('chat')
+        
+        if chat_client is None:
+            return jsonify({"error": "Chat service not available"}), 503
         
-        chat_client.clear_history()
+        get_session_client().clear_history()
         return jsonify({"success": True, "message": "History cleared"})
     
     except Exception as e:
@@ -355,30 +1109,149 @@ def clear_history():
 
 @app.route('/history', methods=['GET'])
 def get_history():
-    """Get conversation history."""
+    """
+    Get conversation history.
+    
+    Without parameters, returns the recent messages, after a summary (or
+    extract) of the compacted ones. The summary is for display only:
+    AnythingLLM answers from its own thread history and never sees it.
+    
+    Query parameters (optional):
+    - limit: Page size; returns the newest page of the conversation
+    - before: next_before value from the previous page
+    """
     try:
         if chat_client is None:
-            init_services()
+            ensure_service('chat')
         
-        history = chat_client.get_history()
+        if chat_client is None:
+            return jsonify({"error": "Chat service not available"}), 503
+        
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            if limit <= 0:
+                return jsonify({"error": "limit must be positive"}), 400
+            page = get_session_client().get_history_page(limit, request.args.get('before', type=int))
+            return jsonify({"success": True, **page})
+        
+        history = get_session_client().get_history()
         return jsonify({"success": True, "history": history})
     
     except Exception as e:
         logger.error(f"Error getting history: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/sessions', methods=['GET'])
+def list_sessions():
+    """List active chat sessions."""
+    try:
+        if session_registry is None:
+            return jsonify({"error": "Chat service not available"}), 503
+        
+        session_registry.enforce_limits()
+        store = get_history_store(load_config(), DEFAULT_CONFIG_PATH)
+        return jsonify({
+            "success": True,
+            "sessions": session_registry.list_sessions(),
+            "stats": session_registry.stats(),
+            "history_store": store.stats() if store is not None else {"backend": "memory"}
+        })
+    
+    except Exception as e:
+        logger.error(f"Error listing sessions: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """End a chat session and drop its history."""
+    try:
+        if session_registry is None:
+            return jsonify({"error": "Chat service not available"}), 503
+        
+        if session_registry.is_pinned(session_id):
+            return jsonify({"error": f"Session '{session_id}' cannot be ended, use /clear-history to reset it"}), 400
+        
+        store = get_history_store(load_config(), DEFAULT_CONFIG_PATH)
+        removed = session_registry.remove(session_id)
+        stored = store is not None and store.load_session(session_id) is not None
+        if store is not None:
+            store.delete_session(session_id)
+        
+        if removed or stored:
+            return jsonify({"success": True, "message": f"Session '{session_id}' ended"})
+        else:
+            return jsonify({"error": f"Session '{session_id}' not found"}), 404
+    
+    except Exception as e:
+        logger.error(f"Error deleting session: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/cache', methods=['GET', 'DELETE'])
+def response_cache_stats():
+    """Get exact and semantic response cache counters, or clear both caches with DELETE."""
+    try:
+        config = load_config()
+        tiers = {
+            "exact": get_shared_cache(config),
+            "semantic": get_shared_semantic_cache(config)
+        }
+        
+        if request.method == 'DELETE':
+            for cache in tiers.values():
+                if cache is not None:
+                    cache.clear()
+        
+        return jsonify({
+            "success": True,
+            "enabled": any(cache is not None for cache in tiers.values()),
+            "tiers": {name: cache.stats() if cache is not None else None for name, cache in tiers.items()}
+        })
+    
+    except Exception as e:
+        logger.error(f"Error getting cache stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/stats/generation', methods=['GET', 'DELETE'])
+def generation_stats():
+    """
+    Get rolling p50/p95 generation timings per workspace and persona, or reset them with DELETE.
+    
+    Query parameters:
+    - workspace: Only include this workspace (optional)
+    - persona: Only include this persona (optional)
+    """
+    try:
+        stats = get_generation_stats(load_config())
+        if stats is None:
+            return jsonify({"success": True, "enabled": False, "stats": []})
+        
+        if request.method == 'DELETE':
+            stats.clear()
+        
+        return jsonify({
+            "success": True,
+            "enabled": True,
+            "window": stats.window,
+            "stats": stats.summary(request.args.get('workspace'), request.args.get('persona'))
+        })
+    
+    except Exception as e:
+        logger.error(f"Error getting generation stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/personas', methods=['GET'])
 def get_personas():
     """Get available personas."""
     try:
         if chat_client is None:
-            init_services()
+            ensure_service('chat')
         
         if chat_client is None:
             return jsonify({"error": "Chat service not available"}), 503
         
-        personas = chat_client.get_available_personas()
-        current_persona = chat_client.get_current_persona()
+        session_client = get_session_client()
+        personas = session_client.get_available_personas()
+        current_persona = session_client.get_current_persona()
         
         return jsonify({
             "success": True,
@@ -392,15 +1265,23 @@ def get_personas():
 
 @app.route('/personas/<persona_name>', methods=['POST'])
 def set_persona(persona_name):
-    """Set the current persona."""
+    """
+    Set the current persona of the session.
+    
+    Only the default session's choice is saved to persona.yaml, which sets
+    the persona of new sessions and of the CLI and Gradio front ends.
+    """
     try:
         if chat_client is None:
-            init_services()
+            ensure_service('chat')
         
         if chat_client is None:
             return jsonify({"error": "Chat service not available"}), 503
         
-        if chat_client.set_persona(persona_name):
+        session_client = get_session_client()
+        if session_client.set_persona(persona_name, save=get_session_id() == DEFAULT_SESSION_ID):
+            if model_warmer is not None:
+                model_warmer.request('persona')
             return jsonify({
                 "success": True,
                 "message": f"Persona changed to {persona_name}",
@@ -418,13 +1299,14 @@ def get_current_persona():
     """Get the current persona."""
     try:
         if chat_client is None:
-            init_services()
+            ensure_service('chat')
         
         if chat_client is None:
             return jsonify({"error": "Chat service not available"}), 503
         
-        current_persona = chat_client.get_current_persona()
-        persona_info = chat_client.persona_manager.get_current_persona()
+        session_client = get_session_client()
+        current_persona = session_client.get_current_persona()
+        persona_info = session_client.persona_manager.get_current_persona()
         
         return jsonify({
             "success": True,
@@ -657,11 +1539,8 @@ def process_listening_audio():
             return jsonify({"error": "No audio file selected"}), 400
         
         # Get the listen API key from config
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
         try:
-            import yaml
-            with open(config_path, 'r') as file:
-                config = yaml.safe_load(file)
+            config = load_config()
             listen_api_key = config.get('listen_api_key', 'A3W1B5T-1DQMWGX-P0XHR4V-7030128')
         except Exception as e:
             logger.warning(f"Could not load listen_api_key from config: {e}")
@@ -670,37 +1549,29 @@ def process_listening_audio():
         api_key = request.form.get('api_key', listen_api_key)
         
         if whisper_service is None:
-            init_services()
+            ensure_service('whisper')
         
         if whisper_service is None:
             return jsonify({"error": "Whisper service not available."}), 503
         
-        # Save the uploaded file temporarily
-        filename = secure_filename(audio_file.filename)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{filename}") as temp_file:
-            audio_file.save(temp_file.name)
-            temp_file_path = temp_file.name
+        # Step 1: Transcribe audio
+        transcribed_text = transcribe_upload(audio_file)
         
-        try:
-            # Step 1: Transcribe audio
-            transcribed_text = whisper_service.transcribe_audio_file(temp_file_path)
-            
-            if not transcribed_text.strip():
-                return jsonify({"success": True, "notifications": []})
-            
-            # Step 2: Process with LLM to generate notifications
+        if not transcribed_text.strip():
+            return jsonify({"success": True, "notifications": []})
+        
+        # Step 2: Process with LLM to generate notifications
+        with stage_latency.time(stage='llm_total', endpoint=request.endpoint, persona='notifications'):
             notifications = process_with_llm_for_notifications(transcribed_text, api_key)
-            
-            return jsonify({
-                "success": True,
-                "transcribed_text": transcribed_text,
-                "notifications": notifications
-            })
         
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+        return jsonify({
+            "success": True,
+            "transcribed_text": transcribed_text,
+            "notifications": notifications
+        })
+    
+    except TranscriptionQueueFull as e:
+        return queue_full_response(e)
     
     except Exception as e:
         logger.error(f"Error in listening process endpoint: {e}")
@@ -738,9 +1609,7 @@ def process_with_llm_for_notifications(transcribed_text, api_key):
         - Follow-up actions
         - Important insights from the conversation"""
         
-        import requests
-        
-        response = requests.post(
+        response = get_session().post(
             "https://api.anythingllm.com/v1/chat",
             headers={
                 "Content-Type": "application/json",
@@ -808,17 +1677,26 @@ if __name__ == '__main__':
         print("Starting Remo AI Unified API Server...")
         print("=" * 50)
         
-        # Initialize services on startup
-        print("Initializing services...")
+        # Initialize services in the background so the server can start right away
+        print("Initializing services in the background...")
         init_services()
         
-        print("Services initialized")
         print("Starting server on http://localhost:8000")
         print("Available endpoints:")
         print("   - GET  /health - Health check")
-        print("   - POST /chat - Send text message")
+        print("   - GET  /ready - Service initialization state")
+        print("   - GET  /metrics - Prometheus metrics")
+        print("   - POST /chat - Send text message (SSE with Accept: text/event-stream)")
+        print("   - POST /chat/cancel - Stop the session's running generation")
+        print("   - POST /chat/batch - Run many prompts concurrently (NDJSON results as they finish)")
         print("   - POST /transcribe - Transcribe audio file")
-        print("   - POST /speak-and-chat - Complete voice workflow")
+        print("   - POST /transcribe-data - Transcribe raw PCM/WAV body (formats: GET /transcribe-data/formats)")
+        print("   - POST /speak-and-chat - Complete voice workflow (pipelined SSE with Accept: text/event-stream)")
+        if sock is not None:
+            print("   - WS   /voice-session - Full-duplex voice session (PCM frames in, transcript/token/audio events out)")
+        print("   - GET  /sessions - List chat sessions (select one with X-Session-ID)")
+        print("   - GET  /cache - Response cache hit/miss counters (DELETE to clear)")
+        print("   - GET  /stats/generation - Time to first token and tokens/s percentiles (DELETE to reset)")
         print("   - GET  /personas - Get available personas")
         print("   - POST /personas/<name> - Set persona")
         print("   - GET  /personas/current - Get current persona")
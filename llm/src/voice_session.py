@@ -0,0 +1,205 @@
+"""
+Per-connection state for full-duplex WebSocket voice sessions
+"""
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from audio_utils import decode_raw_audio
+
+logger = logging.getLogger(__name__)
+
+class VoiceSession:
+    def __init__(self, ws, session_id: str, sample_rate: int = 16000, channels: int = 1,
+                 partial_interval: float = 1.0, max_utterance_seconds: float = 30.0):
+        """
+        Hold the audio buffer and running work of one voice connection.
+
+        Args:
+            ws: WebSocket connection to send events on
+            session_id: Chat session the connection talks to
+            sample_rate: Sample rate of the incoming 16-bit PCM frames
+            channels: Interleaved channels of the incoming frames
+            partial_interval: Seconds of new audio between partial transcripts (0 disables them)
+            max_utterance_seconds: Buffered audio is committed automatically at this length
+        """
+        self.ws = ws
+        self.session_id = session_id
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.partial_interval = partial_interval
+        self.max_utterance_seconds = max_utterance_seconds
+        self.tts = True
+        self.auto_commit = False
+        self.silence_seconds = 0.8
+        self.silence_threshold = 0.01
+        self.audio_buffer = bytearray()
+        self.turns = 0
+        self.cancelled = threading.Event()
+        self.sentence_queue = None
+        self.closed = False
+        self._bytes_since_partial = 0
+        self._heard_speech = False
+        self._silent_bytes = 0
+        self._send_lock = threading.Lock()
+        self._partial_thread = None
+        self._turn_thread = None
+
+    @property
+    def bytes_per_second(self) -> int:
+        return self.sample_rate * self.channels * 2
+
+    @property
+    def buffered_seconds(self) -> float:
+        return len(self.audio_buffer) / self.bytes_per_second
+
+    def configure(self, options: Dict[str, Any]):
+        """
+        Apply the options of a "start" message.
+
+        Args:
+            options: Message fields (session_id, sample_rate, channels, tts,
+                     auto_commit, silence_seconds, silence_threshold, partial_interval)
+        """
+        self.session_id = str(options.get('session_id') or self.session_id)
+        self.sample_rate = int(options.get('sample_rate', self.sample_rate))
+        self.channels = int(options.get('channels', self.channels))
+        if self.sample_rate <= 0 or self.channels <= 0:
+            raise ValueError("sample_rate and channels must be positive")
+        self.tts = bool(options.get('tts', self.tts))
+        self.auto_commit = bool(options.get('auto_commit', self.auto_commit))
+        self.silence_seconds = float(options.get('silence_seconds', self.silence_seconds))
+        self.silence_threshold = float(options.get('silence_threshold', self.silence_threshold))
+        self.partial_interval = float(options.get('partial_interval', self.partial_interval))
+
+    def send(self, event: str, data: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Send a JSON event to the client.
+
+        Worker threads and the receive loop share the connection, so sends
+        are serialized.
+
+        Returns:
+            False if the connection is gone
+        """
+        if self.closed:
+            return False
+        message = json.dumps({"type": event, **(data or {})})
+        try:
+            with self._send_lock:
+                self.ws.send(message)
+            return True
+        except Exception as e:
+            logger.info(f"Voice session {self.session_id} closed while sending: {e}")
+            self.closed = True
+            return False
+
+    def append_audio(self, frame: bytes) -> bool:
+        """
+        Buffer an audio frame.
+
+        Args:
+            frame: 16-bit little-endian PCM in the configured format
+
+        Returns:
+            True if the utterance should be committed now, either because
+            auto_commit detected trailing silence or the buffer is full
+        """
+        self.audio_buffer.extend(frame)
+        self._bytes_since_partial += len(frame)
+
+        if self.buffered_seconds >= self.max_utterance_seconds:
+            return True
+
+        if not self.auto_commit or len(frame) < 2:
+            return False
+
+        samples = np.frombuffer(frame, dtype='<i2', count=len(frame) // 2)
+        rms = np.sqrt(np.mean(np.square(samples, dtype=np.float32))) / 32768.0
+        if rms >= self.silence_threshold:
+            self._heard_speech = True
+            self._silent_bytes = 0
+            return False
+
+        self._silent_bytes += len(frame)
+        return self._heard_speech and self._silent_bytes >= self.silence_seconds * self.bytes_per_second
+
+    def partial_due(self) -> bool:
+        """Whether enough new audio arrived for another partial transcript"""
+        return (self.partial_interval > 0
+                and self._bytes_since_partial >= self.partial_interval * self.bytes_per_second
+                and not self.is_busy(self._partial_thread)
+                and not self.turn_running())
+
+    def snapshot_audio(self, target_rate: int = 16000) -> np.ndarray:
+        """Decode the buffered audio so far without consuming it"""
+        self._bytes_since_partial = 0
+        return decode_raw_audio(bytes(self.audio_buffer), 'pcm_s16le',
+                                self.sample_rate, self.channels, target_rate)
+
+    def take_audio(self, target_rate: int = 16000) -> np.ndarray:
+        """Decode and clear the buffered utterance"""
+        audio_data = bytes(self.audio_buffer)
+        self.reset_audio()
+        return decode_raw_audio(audio_data, 'pcm_s16le', self.sample_rate, self.channels, target_rate)
+
+    def reset_audio(self):
+        """Drop the buffered utterance and voice activity state"""
+        self.audio_buffer = bytearray()
+        self._bytes_since_partial = 0
+        self._heard_speech = False
+        self._silent_bytes = 0
+
+    def turn_running(self) -> bool:
+        return self.is_busy(self._turn_thread)
+
+    def start_partial(self, target: Callable[[], None]):
+        """Run a partial transcription in the background"""
+        self._partial_thread = self._start_thread(target, 'partial')
+
+    def start_turn(self, target: Callable[[], None]):
+        """Run a turn (transcription, LLM and TTS) in the background"""
+        self.cancelled.clear()
+        self.sentence_queue = None
+        self.turns += 1
+        self._turn_thread = self._start_thread(target, f'turn-{self.turns}')
+
+    def cancel_turn(self):
+        """Stop the running turn and drop the speech it queued, leaving other sessions' speech alone"""
+        self.cancelled.set()
+        sentence_queue = self.sentence_queue
+        if sentence_queue is not None:
+            sentence_queue.cancel()
+
+    def close(self, timeout: float = 5.0):
+        """Cancel the running turn and wait briefly for workers to finish"""
+        self.cancel_turn()
+        self.closed = True
+        for thread in (self._turn_thread, self._partial_thread):
+            if thread is not None:
+                thread.join(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """State of the connection for the "ready" event"""
+        return {
+            "session_id": self.session_id,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "tts": self.tts,
+            "auto_commit": self.auto_commit,
+            "partial_interval": self.partial_interval,
+            "max_utterance_seconds": self.max_utterance_seconds
+        }
+
+    @staticmethod
+    def is_busy(thread: Optional[threading.Thread]) -> bool:
+        return thread is not None and thread.is_alive()
+
+    def _start_thread(self, target: Callable[[], None], name: str) -> threading.Thread:
+        thread = threading.Thread(target=target, name=f"voice-{self.session_id}-{name}")
+        thread.daemon = True
+        thread.start()
+        return thread
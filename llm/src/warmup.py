@@ -0,0 +1,176 @@
+"""
+Model warm-up at startup and on switches, and low-rate keep-alive pings while idle
+"""
+import datetime
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import metrics
+from generation_stats import get_generation_stats
+
+logger = logging.getLogger(__name__)
+
+warmups = metrics.registry.counter(
+    'remo_llm_warmups_total', 'Warm-up and keep-alive generations sent to AnythingLLM', ['reason', 'result'])
+
+# How often the warmer looks at the idle time and the configured workspace
+CHECK_INTERVAL = 10.0
+
+def parse_quiet_hours(spec: str) -> Optional[Tuple[datetime.time, datetime.time]]:
+    """
+    Parse quiet hours such as "23:00-07:00" (the range may wrap past midnight).
+
+    Returns:
+        Tuple of (start, end), or None for an empty spec
+
+    Raises:
+        ValueError: If the spec is not in HH:MM-HH:MM form
+    """
+    if not spec:
+        return None
+    try:
+        start, end = (datetime.datetime.strptime(part.strip(), '%H:%M').time() for part in spec.split('-'))
+    except ValueError:
+        raise ValueError(f"Invalid quiet hours '{spec}', expected HH:MM-HH:MM")
+    return start, end
+
+def in_quiet_hours(spec: str, now: datetime.datetime = None) -> bool:
+    """Whether the local time falls inside the quiet hours"""
+    quiet_hours = parse_quiet_hours(spec)
+    if quiet_hours is None:
+        return False
+    start, end = quiet_hours
+    current = (now or datetime.datetime.now()).time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end
+
+class ModelWarmer:
+    def __init__(self, chat_client, history_size: int = 20):
+        """
+        Keep the AnythingLLM model loaded so the first chat after a pause is fast.
+
+        A tiny generation is sent at startup, when the configured workspace
+        changes and when a persona is switched. The warm-up is skipped when
+        the model ran recently enough to still be warm
+        (generation_cold_after). While the assistant is idle, a keep-alive
+        generation goes out every keepalive_interval seconds, except
+        during keepalive_quiet_hours.
+
+        The policy is read from the live configuration on every check, so
+        config.yaml changes apply without a restart.
+
+        Args:
+            chat_client: NPUChatClient used to send the warm-up requests
+            history_size: Number of recent warm-ups reported by stats()
+        """
+        self.chat_client = chat_client
+        self.workspace = None
+        self.last_attempt = None
+        self.history = deque(maxlen=history_size)
+        # Warm-up reasons requested by the API, handled in order by the thread
+        self._requests = []
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        """Start the background thread and warm the model up right away"""
+        self.request('startup')
+        self._thread = threading.Thread(target=self._run, name='model-warmer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def request(self, reason: str):
+        """Ask for a warm-up in the background (for example after a persona switch)"""
+        with self._condition:
+            if reason not in self._requests:
+                self._requests.append(reason)
+            self._condition.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """Warm-up policy and recent warm-ups for the API"""
+        config = self.chat_client.config
+        quiet_hours = config.get('keepalive_quiet_hours', '')
+        try:
+            quiet_now = in_quiet_hours(quiet_hours)
+        except ValueError:
+            quiet_now = False
+        return {
+            "warmup": config.get('warmup', True),
+            "keepalive_interval": config.get('keepalive_interval', 240),
+            "quiet_hours": quiet_hours or None,
+            "quiet_now": quiet_now,
+            "workspace": self.workspace,
+            "recent": list(self.history)
+        }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._requests and not self._stopped:
+                    self._condition.wait(CHECK_INTERVAL)
+                if self._stopped:
+                    return
+                reasons, self._requests = self._requests, []
+            try:
+                self._check(reasons)
+            except Exception as e:
+                logger.warning(f"Model warm-up error: {e}")
+
+    def _check(self, reasons: List[str]):
+        config = self.chat_client.config
+        workspace = config['workspace_slug']
+        if self.workspace is not None and workspace != self.workspace:
+            reasons.append('workspace')
+
+        if reasons:
+            if not config.get('warmup', True):
+                return
+            stats = get_generation_stats(config)
+            idle = stats.idle_seconds(workspace) if stats is not None else None
+            if idle is not None and idle <= config.get('generation_cold_after', 300):
+                # The model answered recently, so it is still loaded
+                self.workspace = workspace
+                for reason in reasons:
+                    warmups.inc(reason=reason, result='skipped')
+                return
+            self._warm_up(reasons[0], workspace)
+        elif self._keepalive_due(config, workspace):
+            self._warm_up('keepalive', workspace)
+
+    def _keepalive_due(self, config: Dict[str, Any], workspace: str) -> bool:
+        interval = config.get('keepalive_interval', 240)
+        if not interval or in_quiet_hours(config.get('keepalive_quiet_hours', '')):
+            return False
+        # Failed attempts count too, so an unreachable server is not pinged every check
+        if self.last_attempt is not None and time.time() - self.last_attempt < interval:
+            return False
+        stats = get_generation_stats(config)
+        idle = stats.idle_seconds(workspace) if stats is not None else None
+        return idle is None or idle >= interval
+
+    def _warm_up(self, reason: str, workspace: str):
+        self.last_attempt = time.time()
+        self.workspace = workspace
+        timings = self.chat_client.warm_up(self.chat_client.config.get('warmup_prompt', 'Reply with OK.'))
+        warmups.inc(reason=reason, result='success' if timings else 'failure')
+        self.history.append({
+            "reason": reason,
+            "workspace": workspace,
+            "at": self.last_attempt,
+            "timings": timings
+        })
+        for timing in timings:
+            logger.info(f"Warm-up ({reason}) of {timing['endpoint']}: first token in {timing['ttft_ms']} ms "
+                        f"({'cold' if timing.get('cold') else 'warm'})")
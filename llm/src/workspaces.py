@@ -4,13 +4,14 @@ Workspace management utilities for AnythingLLM
 import requests
 import yaml
 import sys
+from config_loader import load_config as load_shared_config
+from http_session import get_session
 from typing import List, Dict, Any
 
 def load_config() -> Dict[str, Any]:
     """Load configuration from config.yaml"""
     try:
-        with open('config.yaml', 'r') as file:
-            return yaml.safe_load(file)
+        return load_shared_config()
     except FileNotFoundError:
         print("Error: config.yaml not found. Please create it with your API key and settings.")
         sys.exit(1)
@@ -28,7 +29,7 @@ def get_workspaces() -> List[Dict[str, Any]]:
     }
     
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{config['model_server_base_url']}/workspaces",
             headers=headers,
             timeout=10
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test script for the exact and semantic response caches
+Runs offline, no AnythingLLM server needed
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from response_cache import ResponseCache, history_digest, is_time_sensitive, normalize_message
+from semantic_cache import SemanticCache
+
+HISTORY = [
+    {"role": "system", "content": "You are Remo."},
+    {"role": "user", "content": "Hi"},
+    {"role": "assistant", "content": "Hello!"},
+]
+
+def test_key_normalization():
+    """Case, spacing and trailing punctuation do not change the key"""
+    cache = ResponseCache()
+    key = cache.make_key('remo', 'remo', 'What is  the time?', HISTORY)
+    assert cache.make_key('remo', 'remo', 'what is the time', HISTORY) == key
+    assert normalize_message('  Hello,   World!! ') == 'hello, world'
+
+def test_key_context():
+    """Workspace, persona, prompt and recent history are all part of the key"""
+    cache = ResponseCache(history_window=2)
+    key = cache.make_key('remo', 'remo', 'hello', HISTORY)
+    assert cache.make_key('other', 'remo', 'hello', HISTORY) != key
+    assert cache.make_key('remo', 'creative', 'hello', HISTORY) != key
+    assert cache.make_key('remo', 'remo', 'goodbye', HISTORY) != key
+    assert cache.make_key('remo', 'remo', 'hello', HISTORY + [{"role": "user", "content": "more"}]) != key
+    # The system prompt is left out, the persona stands for it
+    assert cache.make_key('remo', 'remo', 'hello', HISTORY[1:]) == key
+
+def test_history_window():
+    """Only the last history_window messages are compared"""
+    older = [{"role": "user", "content": "first"}, {"role": "assistant", "content": "one"}]
+    assert history_digest(older + HISTORY[1:], 2) == history_digest(HISTORY[1:], 2)
+    assert history_digest(older + HISTORY[1:], 4) != history_digest(HISTORY[1:], 4)
+    assert history_digest(HISTORY, 0) == history_digest([], 0)
+
+def test_ttl():
+    """Entries expire after the cache TTL, or after their own TTL"""
+    cache = ResponseCache(ttl_seconds=0.1)
+    cache.put('a', 'answer a')
+    cache.put('b', 'answer b', ttl_seconds=10)
+    assert cache.get('a') == 'answer a'
+    time.sleep(0.15)
+    assert cache.get('a') is None
+    assert cache.get('b') == 'answer b'
+    assert cache.stats()['entries'] == 1
+
+def test_lru_eviction():
+    """The least recently used entries go first once max_bytes is reached"""
+    cache = ResponseCache(max_bytes=30)
+    cache.put('k1', 'x' * 8)
+    cache.put('k2', 'x' * 8)
+    cache.put('k3', 'x' * 8)
+    assert cache.get('k1') is not None
+    cache.put('k4', 'x' * 8)
+    assert cache.get('k2') is None
+    assert cache.get('k1') is not None and cache.get('k3') is not None and cache.get('k4') is not None
+    assert cache.size_bytes <= cache.max_bytes
+    assert cache.evictions == 1
+
+def test_oversized_and_replaced():
+    """A response larger than the cache is not stored, a new answer replaces the old one"""
+    cache = ResponseCache(max_bytes=20)
+    cache.put('big', 'x' * 50)
+    assert cache.get('big') is None and cache.size_bytes == 0
+    cache.put('k', 'old')
+    cache.put('k', 'new')
+    assert cache.get('k') == 'new'
+    assert cache.size_bytes == len('k') + len('new')
+
+def test_time_sensitive():
+    """Prompts about the time, date, weather or news are time-sensitive"""
+    for prompt in ("What time is it?", "what's the date today", "Weather tomorrow", "latest news"):
+        assert is_time_sensitive(prompt), prompt
+    for prompt in ("Who wrote Hamlet?", "Tell me a joke", "Timeline of Rome"):
+        assert not is_time_sensitive(prompt), prompt
+
+def test_semantic_paraphrase():
+    """A paraphrase in the same context reuses the answer, other contexts do not"""
+    cache = SemanticCache(threshold=0.85)
+    context = cache.context_key('remo', 'remo', "what's on my schedule", HISTORY)
+    cache.put("what's on my schedule", context, "Two meetings")
+    assert cache.get("What is my schedule?", context) == "Two meetings"
+    assert cache.get("Tell me a joke", context) is None
+    other = cache.context_key('remo', 'creative', "what's on my schedule", HISTORY)
+    assert cache.get("what's on my schedule", other) is None
+
+def test_semantic_numbers():
+    """Prompts with different numbers never share an answer"""
+    cache = SemanticCache()
+    five = cache.context_key('remo', 'remo', 'set a timer for 5 minutes', HISTORY)
+    ten = cache.context_key('remo', 'remo', 'set a timer for 10 minutes', HISTORY)
+    assert five != ten
+    cache.put('set a timer for 5 minutes', five, 'Timer set for 5 minutes')
+    assert cache.get('set a timer for 10 minutes', ten) is None
+
+def test_semantic_ttl():
+    """Semantic entries expire after the cache TTL, or after their own TTL"""
+    cache = SemanticCache(ttl_seconds=0.1)
+    cache.put('what time is it', 1, 'Noon')
+    cache.put('who wrote hamlet', 1, 'Shakespeare', ttl_seconds=10)
+    time.sleep(0.15)
+    assert cache.get('what time is it', 1) is None
+    assert cache.get('who wrote hamlet', 1) == 'Shakespeare'
+
+def test_semantic_eviction():
+    """The least recently used prompt is evicted at max_entries, the rest still match"""
+    cache = SemanticCache(max_entries=3)
+    prompts = ['play some jazz', 'turn off the lights', 'call my mother', 'order a pizza']
+    for prompt in prompts[:3]:
+        cache.put(prompt, 1, prompt.upper())
+        time.sleep(0.01)
+    assert cache.get('play some jazz', 1) == 'PLAY SOME JAZZ'
+    cache.put(prompts[3], 1, prompts[3].upper())
+    assert cache.get('turn off the lights', 1) is None
+    for prompt in (prompts[0], prompts[2], prompts[3]):
+        assert cache.get(prompt, 1) == prompt.upper(), prompt
+    assert cache.stats()['entries'] == 3 and cache.evictions == 1
+
+def test_semantic_growth_and_batch():
+    """The matrix grows past its first size and get_many answers each prompt"""
+    cache = SemanticCache(max_entries=200)
+    prompts = [f'reminder number {i} about item {chr(97 + i % 26)}' for i in range(100)]
+    contexts = [cache.context_key('remo', 'remo', prompt, []) for prompt in prompts]
+    for prompt, context in zip(prompts, contexts):
+        cache.put(prompt, context, prompt.upper())
+    assert cache.get_many(prompts, contexts) == [prompt.upper() for prompt in prompts]
+
+TESTS = [
+    test_key_normalization,
+    test_key_context,
+    test_history_window,
+    test_ttl,
+    test_lru_eviction,
+    test_oversized_and_replaced,
+    test_time_sensitive,
+    test_semantic_paraphrase,
+    test_semantic_numbers,
+    test_semantic_ttl,
+    test_semantic_eviction,
+    test_semantic_growth_and_batch,
+]
+
+if __name__ == "__main__":
+    print("🧪 Testing the response caches")
+    print("=" * 50)
+    failed = 0
+    for number, test in enumerate(TESTS, 1):
+        try:
+            test()
+            print(f"✅ {number}. {test.__doc__.strip()}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {number}. {test.__doc__.strip()}: {e}")
+    print("=" * 50)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for the chat session registry
+Runs offline with stand-in chat clients, no AnythingLLM server needed
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from sessions import DEFAULT_SESSION_ID, SessionRegistry
+
+class FakeClient:
+    """Chat client stand-in with just what the registry reads"""
+
+    def __init__(self, session_id=None, history_chars=0):
+        self.session_id = session_id
+        self.conversation_history = [{"role": "user", "content": "x" * history_chars}] if history_chars else []
+
+    def get_current_persona(self):
+        return 'remo'
+
+def session_ids(registry):
+    return [session['session_id'] for session in registry.list_sessions()]
+
+def test_get_reuses_sessions():
+    """get() builds one client per session id and returns it again after"""
+    created = []
+    registry = SessionRegistry(lambda session_id: created.append(session_id) or FakeClient(session_id))
+    alice = registry.get('alice')
+    assert alice.chat_client.session_id == 'alice'
+    assert registry.get('alice') is alice
+    registry.get('bob')
+    assert created == ['alice', 'bob']
+
+def test_lru_eviction():
+    """Past max_sessions, the least recently used session is evicted"""
+    registry = SessionRegistry(FakeClient, max_sessions=3)
+    for session_id in ('a', 'b', 'c'):
+        registry.get(session_id)
+    registry.get('a')
+    registry.get('d')
+    assert session_ids(registry) == ['c', 'a', 'd']
+    assert registry.stats()['evictions'] == 1
+
+def test_ttl_eviction():
+    """Sessions idle longer than the TTL are evicted"""
+    registry = SessionRegistry(FakeClient, ttl_seconds=0.1)
+    registry.get('old')
+    time.sleep(0.15)
+    registry.get('new')
+    assert session_ids(registry) == ['new']
+    time.sleep(0.15)
+    registry.enforce_limits()
+    assert session_ids(registry) == []
+
+def test_history_cap():
+    """Past max_history_chars, the oldest sessions go, never the one just used"""
+    registry = SessionRegistry(lambda session_id: FakeClient(session_id, 40), max_history_chars=100)
+    registry.get('a')
+    registry.get('b')
+    assert session_ids(registry) == ['a', 'b']
+    registry.get('c')
+    assert session_ids(registry) == ['b', 'c']
+    assert registry.stats()['history_chars'] == 80
+    large = SessionRegistry(lambda session_id: FakeClient(session_id, 500), max_history_chars=100)
+    large.get('huge')
+    assert session_ids(large) == ['huge']
+
+def test_pinned_default_session():
+    """The pinned default session survives the caps and the TTL, and cannot be removed"""
+    default_client = FakeClient(DEFAULT_SESSION_ID, 60)
+    registry = SessionRegistry(lambda session_id: FakeClient(session_id, 30), max_sessions=2,
+                               ttl_seconds=0.1, max_history_chars=100)
+    registry.add(DEFAULT_SESSION_ID, default_client, pinned=True)
+    registry.get('a')
+    registry.get('b')
+    assert session_ids(registry) == [DEFAULT_SESSION_ID, 'b']
+    time.sleep(0.15)
+    registry.enforce_limits()
+    assert session_ids(registry) == [DEFAULT_SESSION_ID]
+    assert not registry.remove(DEFAULT_SESSION_ID)
+    assert registry.is_pinned(DEFAULT_SESSION_ID)
+    assert registry.get(DEFAULT_SESSION_ID).chat_client is default_client
+
+def test_remove():
+    """remove() drops a session, which get() then builds again"""
+    registry = SessionRegistry(FakeClient)
+    first = registry.get('a')
+    assert registry.remove('a')
+    assert not registry.remove('a')
+    assert registry.get('a') is not first
+
+def test_session_summary():
+    """Session summaries count messages and history size"""
+    registry = SessionRegistry(lambda session_id: FakeClient(session_id, 12))
+    summary = registry.get('a').to_dict()
+    assert summary['session_id'] == 'a'
+    assert summary['persona'] == 'remo'
+    assert summary['messages'] == 1
+    assert summary['history_chars'] == 12
+
+TESTS = [
+    test_get_reuses_sessions,
+    test_lru_eviction,
+    test_ttl_eviction,
+    test_history_cap,
+    test_pinned_default_session,
+    test_remove,
+    test_session_summary,
+]
+
+if __name__ == "__main__":
+    print("🧪 Testing the session registry")
+    print("=" * 50)
+    failed = 0
+    for number, test in enumerate(TESTS, 1):
+        try:
+            test()
+            print(f"✅ {number}. {test.__doc__.strip()}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {number}. {test.__doc__.strip()}: {e}")
+    print("=" * 50)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for the AnythingLLM stream parser
+Runs offline: feeds response bodies to StreamParser split in every way
+"""
+
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from stream_parser import StreamParser, event_text, iter_events, pseudo_stream
+
+def sse_body(texts):
+    """SSE body with one textResponseChunk event per text"""
+    return b''.join(b'data: ' + json.dumps({"type": "textResponseChunk", "textResponse": text}).encode('utf-8') + b'\n\n'
+                    for text in texts)
+
+def parse_in_pieces(body, size):
+    """Events of a body fed to the parser size bytes at a time"""
+    return list(iter_events(body[i:i + size] for i in range(0, len(body), size)))
+
+def test_split_chunks():
+    """Events are the same whatever the body is split into"""
+    texts = ["Hello", " there", ", how", " are you?"]
+    body = sse_body(texts)
+    for size in range(1, len(body) + 1):
+        events = parse_in_pieces(body, size)
+        assert [event_text(event) for event, _ in events] == texts, f"split every {size} bytes"
+        assert all(is_sse for _, is_sse in events)
+
+def test_multibyte_characters():
+    """A UTF-8 character cut by a read is decoded once it is complete"""
+    texts = ["Café ", "naïve ", "日本語 ", "🎉"]
+    body = sse_body(texts)
+    for size in (1, 2, 3, 5):
+        assert [event_text(event) for event, _ in parse_in_pieces(body, size)] == texts
+
+def test_multiline_data():
+    """Data lines of one SSE event are joined until the blank line"""
+    body = b'data: {"textResponse":\ndata: "joined"}\n\ndata: {"textResponse": "next"}\n\n'
+    for size in (1, 4, len(body)):
+        assert [event_text(event) for event, _ in parse_in_pieces(body, size)] == ["joined", "next"]
+
+def test_ndjson_and_plain_json():
+    """NDJSON lines and a JSON body without a final newline are not SSE"""
+    body = b'{"textResponse": "one"}\n{"textResponse": "two"}\n{"textResponse": "three"}'
+    events = parse_in_pieces(body, 7)
+    assert [event_text(event) for event, _ in events] == ["one", "two", "three"]
+    assert not any(is_sse for _, is_sse in events)
+
+def test_crlf_and_ignored_fields():
+    """CRLF endings work, comments and event/id fields are skipped"""
+    body = b': keep-alive\r\nevent: message\r\nid: 1\r\ndata: {"textResponse": "ok"}\r\n\r\n'
+    assert [event_text(event) for event, _ in parse_in_pieces(body, 3)] == ["ok"]
+
+def test_event_without_blank_line():
+    """An SSE event cut off by the end of the body is still returned by close()"""
+    parser = StreamParser()
+    assert parser.feed(b'data: {"textResponse": "last"}') == []
+    assert [event_text(event) for event, _ in parser.close()] == ["last"]
+
+def test_malformed_payload():
+    """A malformed payload is skipped without losing the events around it"""
+    body = b'data: {"textResponse": "a"}\n\ndata: {broken\n\ndata: [1, 2]\n\ndata: {"textResponse": "b"}\n\n'
+    parser = StreamParser()
+    events = parser.feed(body) + parser.close()
+    assert [event_text(event) for event, _ in events] == ["a", "b"]
+    assert parser.events_parsed == 2
+    assert parser.bytes_parsed == len(body)
+
+def test_event_text():
+    """Text comes from the text field, then from textResponse"""
+    assert event_text({"text": "a", "textResponse": "b"}) == "a"
+    assert event_text({"textResponse": "b"}) == "b"
+    assert event_text({"type": "finalizeResponseStream"}) is None
+
+def test_pseudo_stream():
+    """Pseudo-streamed chunks join back into the text"""
+    text = "  First sentence. Second one!  Third?"
+    for granularity in ("word", "sentence", "none"):
+        assert ''.join(pseudo_stream(text, granularity)) == text
+    assert list(pseudo_stream(text, "sentence")) == ["  First sentence. ", "Second one!  ", "Third?"]
+    assert list(pseudo_stream("", "word")) == []
+
+TESTS = [
+    test_split_chunks,
+    test_multibyte_characters,
+    test_multiline_data,
+    test_ndjson_and_plain_json,
+    test_crlf_and_ignored_fields,
+    test_event_without_blank_line,
+    test_malformed_payload,
+    test_event_text,
+    test_pseudo_stream,
+]
+
+if __name__ == "__main__":
+    print("🧪 Testing the stream parser")
+    print("=" * 50)
+    failed = 0
+    for number, test in enumerate(TESTS, 1):
+        try:
+            test()
+            print(f"✅ {number}. {test.__doc__.strip()}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {number}. {test.__doc__.strip()}: {e}")
+    print("=" * 50)
+    sys.exit(1 if failed else 0)
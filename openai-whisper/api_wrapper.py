@@ -13,7 +13,8 @@ import json
 
 # Add the parent directory to the path to import whisper_service
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from openai_whisper.whisper_service import WhisperService
+from openai_whisper.whisper_service import WhisperService, SAMPLE_RATE
+from openai_whisper.audio_utils import decode_raw_audio, raw_audio_params, SUPPORTED_RAW_FORMATS
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -89,23 +90,45 @@ def transcribe_audio_data():
     """
     Transcribe raw audio data to text.
     
-    Expected JSON data:
-    - audio_data: Base64 encoded audio data
+    Expected body, either:
+    - Binary audio (Content-Type: application/octet-stream or audio/wav).
+      Raw PCM is described by the X-Audio-Format (default: pcm_s16le),
+      X-Sample-Rate (default: 16000) and X-Channels (default: 1) headers.
+    - JSON with audio_data: Base64 encoded audio data (legacy)
     """
     try:
-        data = request.get_json()
-        if not data or 'audio_data' not in data:
-            return jsonify({"error": "No audio data provided"}), 400
-        
-        # Decode base64 audio data
-        import base64
-        audio_data = base64.b64decode(data['audio_data'])
+        if request.mimetype == 'application/json':
+            data = request.get_json()
+            if not data or 'audio_data' not in data:
+                return jsonify({"error": "No audio data provided"}), 400
+            
+            # Decode base64 audio data
+            import base64
+            audio_data = base64.b64decode(data['audio_data'])
+            audio = None
+        else:
+            audio_data = request.get_data(cache=False)
+            if not audio_data:
+                return jsonify({"error": "No audio data provided"}), 400
+            
+            try:
+                audio_format, sample_rate, channels = raw_audio_params(request.mimetype, request.headers)
+            except ValueError as e:
+                return jsonify({"error": str(e), "supported_formats": SUPPORTED_RAW_FORMATS}), 415
+            
+            try:
+                audio = decode_raw_audio(audio_data, audio_format, sample_rate, channels, SAMPLE_RATE)
+            except ValueError as e:
+                return jsonify({"error": str(e), "supported_formats": SUPPORTED_RAW_FORMATS}), 400
         
         # Transcribe the audio
         if whisper_service is None:
             init_whisper_service()
         
-        transcribed_text = whisper_service.transcribe_audio_data(audio_data)
+        if audio is None:
+            transcribed_text = whisper_service.transcribe_audio_data(audio_data)
+        else:
+            transcribed_text = whisper_service.transcribe_audio(audio)
         
         return jsonify({
             "success": True,
@@ -116,6 +139,15 @@ def transcribe_audio_data():
         logger.error(f"Error in transcribe-data endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/transcribe-data/formats', methods=['GET'])
+def transcribe_data_formats():
+    """List the binary audio formats accepted by /transcribe-data."""
+    return jsonify({
+        "formats": SUPPORTED_RAW_FORMATS,
+        "sample_rate": SAMPLE_RATE,
+        "headers": ["X-Audio-Format", "X-Sample-Rate", "X-Channels"]
+    })
+
 @app.route('/start-recording', methods=['POST'])
 def start_recording():
     """Start recording audio from microphone."""
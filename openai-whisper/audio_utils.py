@@ -7,7 +7,206 @@ import pyaudio
 import numpy as np
 import base64
 import io
-from typing import Tuple, Optional
+import os
+import subprocess
+import threading
+from typing import BinaryIO, Tuple, Optional
+
+# Containers that may keep their index at the end of the file, which ffmpeg
+# cannot reach when reading from a pipe
+SEEKABLE_INPUT_EXTENSIONS = ('.m4a', '.mp4', '.mov', '.3gp')
+
+# Binary upload formats accepted by the /transcribe-data endpoints
+SUPPORTED_RAW_FORMATS = {
+    'pcm_s16le': 'Raw 16-bit little-endian PCM, described by X-Sample-Rate and X-Channels headers',
+    'wav': '16-bit PCM WAV file (Content-Type: audio/wav)'
+}
+
+WAV_MIMETYPES = ('audio/wav', 'audio/x-wav', 'audio/wave')
+
+def raw_audio_params(mimetype: str, headers) -> Tuple[str, int, int]:
+    """
+    Work out the format of a binary upload from its request headers.
+    
+    Args:
+        mimetype: Content type of the request without parameters
+        headers: Request headers (X-Audio-Format, X-Sample-Rate, X-Channels)
+    
+    Returns:
+        Tuple of (audio_format, sample_rate, channels)
+    """
+    if mimetype in WAV_MIMETYPES:
+        audio_format = 'wav'
+    else:
+        audio_format = headers.get('X-Audio-Format', 'pcm_s16le').lower()
+    if audio_format not in SUPPORTED_RAW_FORMATS:
+        raise ValueError(f"Unsupported audio format: {audio_format}. "
+                         f"Supported formats: {', '.join(SUPPORTED_RAW_FORMATS)}")
+    
+    try:
+        sample_rate = int(headers.get('X-Sample-Rate', 16000))
+        channels = int(headers.get('X-Channels', 1))
+    except ValueError:
+        raise ValueError("X-Sample-Rate and X-Channels must be integers")
+    if sample_rate <= 0 or channels <= 0:
+        raise ValueError("X-Sample-Rate and X-Channels must be positive")
+    
+    return audio_format, sample_rate, channels
+
+def read_wav_header(wav_data: bytes) -> Tuple[int, int, int, int, int]:
+    """
+    Locate the sample data of a WAV file without copying it.
+    
+    Args:
+        wav_data: WAV formatted audio data
+    
+    Returns:
+        Tuple of (sample_rate, channels, sample_width, data_offset, data_length)
+    """
+    view = memoryview(wav_data)
+    if len(view) < 12 or bytes(view[0:4]) != b'RIFF' or bytes(view[8:12]) != b'WAVE':
+        raise ValueError("Not a RIFF/WAVE file")
+    
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size = int.from_bytes(view[offset + 4:offset + 8], 'little')
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            audio_format = int.from_bytes(view[body:body + 2], 'little')
+            channels = int.from_bytes(view[body + 2:body + 4], 'little')
+            sample_rate = int.from_bytes(view[body + 4:body + 8], 'little')
+            sample_width = int.from_bytes(view[body + 14:body + 16], 'little') // 8
+            fmt = (audio_format, channels, sample_rate, sample_width)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV data chunk found before fmt chunk")
+            audio_format, channels, sample_rate, sample_width = fmt
+            # 1 is integer PCM, 0xFFFE is WAVE_FORMAT_EXTENSIBLE
+            if audio_format not in (1, 0xFFFE):
+                raise ValueError(f"Unsupported WAV encoding: {audio_format}")
+            data_length = min(chunk_size, len(view) - body)
+            return sample_rate, channels, sample_width, body, data_length
+        # Chunks are padded to an even size
+        offset = body + chunk_size + (chunk_size & 1)
+    
+    raise ValueError("WAV file has no data chunk")
+
+def decode_raw_audio(audio_data: bytes, audio_format: str = 'pcm_s16le',
+                     sample_rate: int = 16000, channels: int = 1,
+                     target_rate: int = 16000) -> np.ndarray:
+    """
+    Convert raw PCM or WAV bytes to mono float32 samples for Whisper.
+    
+    The int16 samples are read in place with np.frombuffer, so the only copy
+    made is the conversion to float32 (plus downmixing/resampling if needed).
+    
+    Args:
+        audio_data: Request body
+        audio_format: One of SUPPORTED_RAW_FORMATS
+        sample_rate: Sample rate of raw PCM (read from the header for WAV)
+        channels: Interleaved channels of raw PCM (read from the header for WAV)
+        target_rate: Sample rate to return
+    
+    Returns:
+        Mono float32 samples in the range [-1, 1]
+    """
+    offset = 0
+    length = len(audio_data)
+    if audio_format == 'wav':
+        sample_rate, channels, sample_width, offset, length = read_wav_header(audio_data)
+        if sample_width != 2:
+            raise ValueError(f"Only 16-bit WAV is supported, got {sample_width * 8}-bit")
+    elif audio_format != 'pcm_s16le':
+        raise ValueError(f"Unsupported audio format: {audio_format}")
+    
+    if channels < 1:
+        raise ValueError("Channel count must be at least 1")
+    
+    frame_count = length // (2 * channels)
+    samples = np.frombuffer(audio_data, dtype='<i2', count=frame_count * channels, offset=offset)
+    if channels > 1:
+        audio = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    else:
+        audio = samples.astype(np.float32)
+    audio *= 1.0 / 32768.0
+    
+    return resample_audio(audio, sample_rate, target_rate)
+
+def needs_seekable_input(filename: str) -> bool:
+    """
+    Check whether an audio file must be decoded from disk rather than a pipe.
+    
+    Args:
+        filename: Name of the uploaded file
+    
+    Returns:
+        True if the container format needs a seekable input
+    """
+    return os.path.splitext(filename or '')[1].lower() in SEEKABLE_INPUT_EXTENSIONS
+
+def decode_audio_stream(stream: BinaryIO, sample_rate: int = 16000,
+                        chunk_size: int = 65536) -> np.ndarray:
+    """
+    Decode an audio byte stream in memory by piping it through ffmpeg.
+    
+    The stream is written to ffmpeg's stdin while mono 16-bit PCM is read
+    from its stdout, so no temporary files are involved.
+    
+    Args:
+        stream: Readable binary stream with audio in any ffmpeg-supported format
+        sample_rate: Output sample rate (default: 16000)
+        chunk_size: Bytes copied to ffmpeg per write
+    
+    Returns:
+        Mono float32 samples in the range [-1, 1]
+    """
+    cmd = [
+        'ffmpeg',
+        '-loglevel', 'error',
+        '-threads', '0',
+        '-i', 'pipe:0',
+        '-f', 's16le',
+        '-ac', '1',
+        '-acodec', 'pcm_s16le',
+        '-ar', str(sample_rate),
+        'pipe:1'
+    ]
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    
+    def feed_input():
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                process.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            # ffmpeg stopped reading, its exit status reports why
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+    
+    # Feed stdin from another thread so a full stdout pipe can't deadlock us
+    writer = threading.Thread(target=feed_input)
+    writer.daemon = True
+    writer.start()
+    
+    pcm_data = process.stdout.read()
+    error_output = process.stderr.read()
+    process.wait()
+    writer.join()
+    
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to decode audio: {error_output.decode('utf-8', errors='ignore').strip()}")
+    
+    audio = np.frombuffer(pcm_data, np.int16).astype(np.float32)
+    audio *= 1.0 / 32768.0
+    return audio
 
 def convert_audio_to_wav(audio_data: bytes, sample_rate: int = 16000, 
                         channels: int = 1, sample_width: int = 2) -> bytes:
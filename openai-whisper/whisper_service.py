@@ -11,11 +11,15 @@ import threading
 import time
 from typing import Optional, Callable
 import logging
+from audio_utils import decode_audio_stream
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sample rate of the audio Whisper works on
+SAMPLE_RATE = 16000
+
 class WhisperService:
     def __init__(self, model_size: str = "base"):
         """
@@ -48,6 +52,51 @@ class WhisperService:
         Args:
             audio_file_path: Path to the audio file
             
+        Returns:
+            Transcribed text
+        """
+        logger.info(f"Transcribing audio file: {audio_file_path}")
+        return self.transcribe_audio(self.load_audio_file(audio_file_path))
+    
+    def load_audio_file(self, audio_file_path: str):
+        """
+        Decode an audio file to the 16 kHz mono float32 samples Whisper expects.
+        
+        Args:
+            audio_file_path: Path to the audio file
+            
+        Returns:
+            Audio samples as a NumPy array
+        """
+        try:
+            return whisper.load_audio(audio_file_path)
+        except Exception as e:
+            logger.error(f"Failed to decode audio: {e}")
+            raise
+    
+    def load_audio_stream(self, stream):
+        """
+        Decode an audio byte stream in memory, without temporary files.
+        
+        Args:
+            stream: Readable binary stream, such as an upload
+            
+        Returns:
+            Audio samples as a NumPy array
+        """
+        try:
+            return decode_audio_stream(stream, SAMPLE_RATE)
+        except Exception as e:
+            logger.error(f"Failed to decode audio stream: {e}")
+            raise
+    
+    def transcribe_audio(self, audio) -> str:
+        """
+        Transcribe decoded audio samples.
+        
+        Args:
+            audio: 16 kHz mono float32 samples as a NumPy array
+            
         Returns:
             Transcribed text
         """
@@ -55,8 +104,7 @@ class WhisperService:
             self.load_model()
         
         try:
-            logger.info(f"Transcribing audio file: {audio_file_path}")
-            result = self.model.transcribe(audio_file_path)
+            result = self.model.transcribe(audio)
             transcribed_text = result["text"].strip()
             logger.info(f"Transcription completed: {transcribed_text[:50]}...")
             return transcribed_text
@@ -4,13 +4,149 @@ Adapts voice characteristics based on AI persona
 """
 
 import logging
-from typing import Dict, Any, Optional
+import queue
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional
 from tts_service import TTSService
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# A sentence ends at terminal punctuation, optionally closed by a quote or
+# bracket, that is followed by whitespace
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*(?=\s)')
+
+def split_sentences(text: str) -> tuple:
+    """
+    Split text into complete sentences and the unfinished remainder
+    
+    Args:
+        text: Text that may end mid-sentence
+        
+    Returns:
+        Tuple of (list of complete sentences, remaining text)
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, text[start:]
+
+class SentenceSpeechQueue:
+    """Speaks streamed text one sentence at a time, in order, on a worker thread"""
+    
+    def __init__(self, manager: 'PersonaTTSManager', persona_name: str = None,
+                 on_sentence_start: Optional[callable] = None,
+                 on_sentence_end: Optional[callable] = None):
+        """
+        Initialize the sentence queue
+        
+        Args:
+            manager: PersonaTTSManager used to speak each sentence
+            persona_name: Persona voice to use
+            on_sentence_start: Optional callback called with (index, sentence)
+                right before a sentence is spoken
+            on_sentence_end: Optional callback called with (index, sentence,
+                queue_wait, speak_time) in seconds once a sentence is spoken
+        """
+        self.manager = manager
+        self.persona_name = persona_name
+        self.on_sentence_start = on_sentence_start
+        self.on_sentence_end = on_sentence_end
+        self.sentences_queued = 0
+        self._buffer = ""
+        self._queue = queue.Queue()
+        self._cancelled = False
+        self._speaking = False
+        self._thread = threading.Thread(target=self._speak_worker)
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def feed(self, text: str) -> List[str]:
+        """
+        Add streamed text and queue any sentences it completes
+        
+        Args:
+            text: Next chunk of text
+            
+        Returns:
+            Sentences queued by this call
+        """
+        sentences, self._buffer = split_sentences(self._buffer + text)
+        for sentence in sentences:
+            self._enqueue(sentence)
+        return sentences
+    
+    def close(self) -> List[str]:
+        """
+        Queue whatever text is left and stop the worker once it is spoken
+        
+        Returns:
+            Sentences queued by this call
+        """
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        sentences = [remainder] if remainder else []
+        for sentence in sentences:
+            self._enqueue(sentence)
+        self._queue.put(None)
+        return sentences
+    
+    def cancel(self):
+        """
+        Drop queued sentences and stop this queue's current sentence
+        
+        The speech engine is only stopped while one of this queue's
+        sentences is being spoken, so other queues keep talking.
+        """
+        self._cancelled = True
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._queue.put(None)
+        if self._speaking:
+            self.manager.stop_speaking()
+    
+    def is_finished(self) -> bool:
+        """Check whether the worker has stopped after close() or cancel()"""
+        return not self._thread.is_alive()
+    
+    def _enqueue(self, sentence: str):
+        self._queue.put((self.sentences_queued, sentence, time.perf_counter()))
+        self.sentences_queued += 1
+    
+    def _speak_worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None or self._cancelled:
+                break
+            index, sentence, queued_at = item
+            started_at = time.perf_counter()
+            if self.on_sentence_start:
+                try:
+                    self.on_sentence_start(index, sentence)
+                except Exception as e:
+                    logger.warning(f"Sentence start callback failed: {e}")
+            self._speaking = True
+            try:
+                self.manager.speak_persona_response(sentence, self.persona_name, blocking=True)
+            finally:
+                self._speaking = False
+            if self.on_sentence_end:
+                try:
+                    self.on_sentence_end(index, sentence, started_at - queued_at,
+                                         time.perf_counter() - started_at)
+                except Exception as e:
+                    logger.warning(f"Sentence end callback failed: {e}")
+
 class PersonaTTSManager:
     def __init__(self):
         """Initialize persona-specific TTS manager"""
@@ -130,6 +266,23 @@ class PersonaTTSManager:
         thread.start()
         return True
     
+    def create_sentence_queue(self, persona_name: str = None,
+                              on_sentence_start: Optional[callable] = None,
+                              on_sentence_end: Optional[callable] = None) -> SentenceSpeechQueue:
+        """
+        Create a queue that starts speaking streamed text sentence by sentence
+        
+        Args:
+            persona_name: Persona to use
+            on_sentence_start: Optional callback called with (index, sentence)
+            on_sentence_end: Optional callback called with (index, sentence,
+                queue_wait, speak_time)
+            
+        Returns:
+            SentenceSpeechQueue to feed text chunks into
+        """
+        return SentenceSpeechQueue(self, persona_name, on_sentence_start, on_sentence_end)
+    
     def _clean_text_for_speech(self, text: str) -> str:
         """
         Clean text to make it more suitable for speech synthesis